@@ -0,0 +1,146 @@
+"""地址分類（縣市 → 鄉鎮市區 → 路街）
+
+台灣的地址由大到小書寫，例如「台北市信義區信義路五段7號」可拆成
+縣市「台北市」、區「信義區」、路段「信義路五段」。新增、更新、刪除時同步維護一棵
+前綴樹，每個節點記錄底下的聯絡人數與姓名，查詢某個分類的人數只需沿路徑走到節點
+（最多三層，與通訊錄大小無關），不必像子字串搜尋一樣掃描所有地址，
+也不會把「大安路」誤認為「大安區」。
+"""
+import re
+import unicodedata
+from typing import List, Dict, Tuple, Iterable, Optional
+
+# 無法辨識縣市的地址（例如外國地址）都歸在這個分類
+UNPARSED = "其他"
+# 有縣市與路段但沒有寫鄉鎮市區的地址（例如「屏東市民生路」），路段歸在這個分類下
+NO_DISTRICT = "（未分區）"
+
+_ADDRESS_PATTERN = re.compile(
+    r"\d{0,6}"                                          # 郵遞區號
+    r"(?P<city>[^\d市縣]{1,3}?[市縣])"
+    # 先找「區」，避免「前鎮區」被切成「前鎮」
+    r"(?P<district>[^\d路街]{1,3}?區|[^\d路街]{1,3}?[鄉鎮市])?"
+    r"(?:[^\d路街道里村]{1,3}[里村])?"                    # 村里不列入分類
+    r"(?P<street>[^\d路街]{1,6}?(?:路|街|大道)(?:[一二三四五六七八九十\d]{1,2}段)?)?"
+)
+
+
+def normalize_address(address: str) -> str:
+    """忽略空白、全半形與大小寫，並將「臺」統一為「台」"""
+    return "".join(unicodedata.normalize("NFKC", address).lower().split()).replace("臺", "台")
+
+
+def parse_address(address: str) -> Tuple[str, ...]:
+    """拆成 (縣市, 鄉鎮市區, 路段)，缺少的層級省略；無法辨識時回傳 (UNPARSED,)
+
+    只缺鄉鎮市區時保留路段，鄉鎮市區以 NO_DISTRICT 代替。
+    """
+    match = _ADDRESS_PATTERN.match(normalize_address(address))
+    if match is None:
+        return (UNPARSED,)
+    city, district, street = match.group("city", "district", "street")
+    if street is not None:
+        return city, district or NO_DISTRICT, street
+    if district is not None:
+        return city, district
+    return (city,)
+
+
+class _Node:
+    __slots__ = ("keys", "children")
+
+    def __init__(self):
+        self.keys = set()
+        self.children: Dict[str, "_Node"] = {}
+
+
+class AddressFacets:
+    """以地址層級建立的前綴樹，每個節點保存底下所有聯絡人的姓名
+
+    人數即節點的姓名集合大小，查詢為 O(層數)；取出某個分類的聯絡人為 O(k log k)，
+    k 為該分類的人數。姓名依加入順序編號，取出時依此排序以保持新增順序。
+    """
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self._root = _Node()
+        self._paths: Dict[str, Tuple[str, ...]] = {}
+        self._order: Dict[str, int] = {}
+        self._next_order = 0
+
+    def __len__(self) -> int:
+        return len(self._paths)
+
+    def add(self, key: str, address: str):
+        """加入或更新一位聯絡人；更新時保留原本的順序"""
+        if key in self._paths:
+            self._detach(key)
+        else:
+            self._order[key] = self._next_order
+            self._next_order += 1
+        path = parse_address(address)
+        self._paths[key] = path
+        node = self._root
+        node.keys.add(key)
+        for part in path:
+            node = node.children.setdefault(part, _Node())
+            node.keys.add(key)
+
+    def add_many(self, items: Iterable[Tuple[str, str]]):
+        for key, address in items:
+            self.add(key, address)
+
+    def update(self, key: str, address: str):
+        self.add(key, address)
+
+    def remove(self, key: str):
+        if key in self._paths:
+            self._detach(key)
+            del self._paths[key]
+            del self._order[key]
+
+    def _detach(self, key: str):
+        """從舊路徑上的節點移除姓名，並刪除變空的節點"""
+        node = self._root
+        node.keys.discard(key)
+        for part in self._paths[key]:
+            child = node.children[part]
+            child.keys.discard(key)
+            if not child.keys:
+                del node.children[part]
+                return
+            node = child
+
+    def _find(self, path: Iterable[str]) -> Optional[_Node]:
+        node = self._root
+        for part in path:
+            node = node.children.get(part)
+            if node is None:
+                return None
+        return node
+
+    def count(self, path: Iterable[str] = ()) -> int:
+        node = self._find(path)
+        return len(node.keys) if node is not None else 0
+
+    def children(self, path: Iterable[str] = ()) -> List[Tuple[str, int]]:
+        """下一層的分類與人數，依人數由多到少（人數相同時依名稱）；「其他」與「未分區」排在最後"""
+        node = self._find(path)
+        if node is None:
+            return []
+        return sorted(((part, len(child.keys)) for part, child in node.children.items()),
+                      key=lambda item: (item[0] in (UNPARSED, NO_DISTRICT), -item[1], item[0]))
+
+    def keys(self, path: Iterable[str] = ()) -> List[str]:
+        """分類中所有聯絡人的姓名，依加入順序"""
+        node = self._find(path)
+        if node is None:
+            return []
+        return sorted(node.keys, key=self._order.__getitem__)
+
+    def contains(self, key: str, path: Tuple[str, ...]) -> bool:
+        """聯絡人是否屬於該分類，O(層數)"""
+        own = self._paths.get(key)
+        return own is not None and own[:len(path)] == tuple(path)
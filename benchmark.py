@@ -0,0 +1,283 @@
+"""通訊錄效能測試
+
+以固定亂數種子產生擬真的台灣聯絡人資料，在不同資料量下量測 AddressBook 各操作的
+耗時與記憶體，並輸出 JSON 結果檔，方便比較不同版本之間的差異。
+
+用法：
+    python benchmark.py                                  # 1k、10k、100k
+    python benchmark.py --sizes 1000 1000000 --backend sqlite
+    python benchmark.py --sizes 1000000 --backend sharded --shards 8
+    python benchmark.py --output new.json --compare old.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Callable, Dict, List
+
+from models import AddressBook, Contact
+from storage import create_storage
+from shard_storage import SHARDS_ENV
+
+SURNAMES = "陳林黃張李王吳劉蔡楊許鄭謝洪郭邱曾廖賴徐周葉蘇莊呂江何蕭羅高潘簡朱鍾游彭詹胡施沈余盧梁趙顏柯翁魏孫戴"
+GIVEN_CHARS = "家志明俊傑建宏文華雅婷怡君淑芬美玲惠如佳欣宗翰承恩冠宇詩涵子軒品妤柏翰宜庭心怡振豪嘉玲信宏"
+CITIES = {
+    "台北市": ["中正區", "大同區", "中山區", "松山區", "大安區", "萬華區", "信義區", "士林區", "北投區", "內湖區", "南港區", "文山區"],
+    "新北市": ["板橋區", "三重區", "中和區", "永和區", "新莊區", "新店區", "土城區", "蘆洲區", "汐止區", "樹林區"],
+    "桃園市": ["桃園區", "中壢區", "平鎮區", "八德區", "楊梅區", "蘆竹區", "龜山區"],
+    "台中市": ["中區", "東區", "南區", "西區", "北區", "西屯區", "南屯區", "北屯區", "豐原區", "大里區"],
+    "台南市": ["中西區", "東區", "南區", "北區", "安平區", "安南區", "永康區", "仁德區"],
+    "高雄市": ["新興區", "前金區", "苓雅區", "鹽埕區", "鼓山區", "左營區", "三民區", "前鎮區", "鳳山區"],
+}
+ROADS = ["中山路", "中正路", "民生路", "民權路", "信義路", "和平東路", "復興南路", "忠孝東路", "光復路", "建國路", "文化路", "成功路"]
+EMAIL_DOMAINS = ["gmail.com", "yahoo.com.tw", "hinet.net", "pchome.tw", "mail.tw"]
+
+SEARCH_CASES = [
+    ("姓名", "陳"),
+    ("電話", "0912"),
+    ("電子郵件", "gmail"),
+    ("地址", "大安區"),
+    ("全欄位", "台北"),
+    ("全欄位", "不存在的字串"),
+]
+
+
+def generate_contacts(count: int, seed: int = 42) -> List[Dict]:
+    """產生 count 位姓名不重複、符合 Contact 欄位長度限制的聯絡人"""
+    rng = random.Random(seed)
+    contacts = []
+    names = set()
+    cities = list(CITIES)
+    while len(contacts) < count:
+        name = rng.choice(SURNAMES) + "".join(rng.choice(GIVEN_CHARS) for _ in range(2))
+        if name in names:
+            # 同名時加上編號，仍在 10 字以內
+            name = f"{name}{len(contacts)}"[:Contact.MAX_NAME_LENGTH]
+            if name in names:
+                continue
+        names.add(name)
+        phone = f"09{rng.randint(10, 99)}-{rng.randint(0, 999):03d}-{rng.randint(0, 999):03d}"
+        local = "".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(3, 7)))
+        email = f"{local}@{rng.choice(EMAIL_DOMAINS)}"[:Contact.MAX_EMAIL_LENGTH]
+        city = rng.choice(cities)
+        address = f"{city}{rng.choice(CITIES[city])}{rng.choice(ROADS)}{rng.randint(1, 500)}號"
+        if rng.random() < 0.3:
+            address += f"{rng.randint(1, 20)}樓"
+        contacts.append({"name": name, "phone": phone, "email": email, "address": address[:Contact.MAX_ADDRESS_LENGTH]})
+    return contacts
+
+
+def timed(func: Callable, repeat: int = 1) -> Dict:
+    """執行 repeat 次，回傳每次耗時（秒）的統計"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return {
+        "repeat": repeat,
+        "mean_s": statistics.mean(samples),
+        "min_s": min(samples),
+        "max_s": max(samples),
+    }
+
+
+def timed_with_memory(func: Callable, repeat: int, memory: bool) -> Dict:
+    """timed 之後再以 tracemalloc 另外執行一次量測記憶體，tracemalloc 的負擔不會算進耗時
+
+    func 每次呼叫都應是一次完整的操作（例如新增不同的聯絡人），共會被呼叫 repeat + 1 次。
+    """
+    result = timed(func, repeat)
+    if memory:
+        result.update(measure_memory(func))
+    return result
+
+
+def measure_memory(func: Callable) -> Dict:
+    """以 tracemalloc 量測執行期間的記憶體，回傳結束時仍保留與峰值的位元組數"""
+    tracemalloc.start()
+    try:
+        result = func()
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del result
+    return {"retained_bytes": current, "peak_bytes": peak}
+
+
+# 各後端的資料檔名稱（其餘為 contacts.json）
+BACKEND_FILENAMES = {"sqlite": "contacts.db", "binary": "contacts.bin", "sharded": "contacts.shards"}
+
+
+def bench_size(size: int, backend: str, ops: int, memory: bool, seed: int, columnar: bool = False) -> Dict:
+    workdir = tempfile.mkdtemp(prefix="addressbook-bench-")
+    try:
+        # 新增、更新、刪除各多準備一筆給記憶體量測使用
+        data = generate_contacts(size + ops + 1, seed)
+        initial, extra = data[:size], data[size:]
+        filename = os.path.join(workdir, BACKEND_FILENAMES.get(backend, "contacts.json"))
+
+        # 建立初始資料檔
+        seed_book = AddressBook(storage=create_storage(backend, filename))
+        seed_book.bulk_add(initial)
+        seed_book.close()
+
+        def open_book() -> AddressBook:
+            return AddressBook(storage=create_storage(backend, filename), columnar=columnar)
+
+        results: Dict[str, Dict] = {}
+        results["load_contacts"] = timed(lambda: open_book().close(), repeat=3)
+        if memory:
+            results["load_contacts"].update(measure_memory(open_book))
+
+        book = open_book()
+        results["save_contacts"] = timed_with_memory(book.save_contacts, 3, memory)
+
+        rng = random.Random(seed)
+        extra_iter = iter(extra)
+        results["add_contact"] = timed_with_memory(lambda: book.add_contact(**next(extra_iter)), ops, memory)
+        names = [contact.name for contact in rng.sample(book.contacts, ops + 1)]
+        name_iter = iter(names)
+        results["update_contact"] = timed_with_memory(
+            lambda: book.update_contact(next(name_iter), phone=f"09{rng.randint(10000000, 99999999)}"),
+            ops, memory
+        )
+        name_iter = iter(names)
+        results["delete_contact"] = timed_with_memory(lambda: book.delete_contact(next(name_iter)), ops, memory)
+        # 背景寫入模式下異動只會排程，另外量測把它們寫入磁碟所需的時間
+        results["flush"] = timed(book.flush)
+
+        if not book.storage.search_pushdown:
+            # 搜尋索引在第一次搜尋時才建立，單獨列出，避免算進第一種搜尋的平均耗時；
+            # 記憶體以另一個尚未建立索引的通訊錄量測，retained_bytes 約為索引的大小
+            results["index_build"] = timed(book.build_index)
+            if memory:
+                fresh = open_book()
+                results["index_build"].update(measure_memory(fresh.build_index))
+                fresh.close()
+
+        for search_type, query in SEARCH_CASES:
+            key = f"search_contacts[{search_type}:{query}]"
+            results[key] = timed_with_memory(lambda: book.search_contacts(query, search_type), 5, memory)
+            results[key]["matches"] = len(book.search_contacts(query, search_type))
+        book.close()
+        return results
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+# 命令列模式（main.py query ...）從啟動到結束的目標時間（秒），供 shell script 與 cron 使用
+CLI_STARTUP_TARGET_S = 0.2
+
+
+def bench_cli_startup(size: int, seed: int, repeat: int = 5) -> Dict:
+    """以子程序執行 main.py query，量測包含直譯器啟動在內的總耗時"""
+    workdir = tempfile.mkdtemp(prefix="addressbook-bench-")
+    try:
+        filename = os.path.join(workdir, "contacts.json")
+        book = AddressBook(storage=create_storage("json", filename))
+        book.bulk_add(generate_contacts(size, seed))
+        book.close()
+        main_py = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+        command = [sys.executable, main_py, "query", "陳", "--type", "姓名", "--file", filename]
+        result = timed(lambda: subprocess.run(command, stdout=subprocess.DEVNULL, check=True), repeat=repeat)
+        result["size"] = size
+        result["target_s"] = CLI_STARTUP_TARGET_S
+        result["meets_target"] = result["mean_s"] <= CLI_STARTUP_TARGET_S
+        return result
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)), check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(current: Dict, baseline: Dict):
+    """列出與先前結果相比的平均耗時倍率（> 1 表示變慢）"""
+    for size, operations in current["results"].items():
+        old_operations = baseline.get("results", {}).get(size)
+        if not old_operations:
+            continue
+        print(f"\n== {size} 位聯絡人（相對於 {baseline.get('revision', '?')}）==")
+        for name, stats in operations.items():
+            old = old_operations.get(name)
+            if old and old["mean_s"] > 0:
+                print(f"{name:40s} {stats['mean_s'] / old['mean_s']:6.2f}x")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="通訊錄效能測試")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000],
+                        help="資料量（可加入 1000000）")
+    parser.add_argument("--backend", choices=["json", "journal", "sqlite", "binary", "sharded"], default="json")
+    parser.add_argument("--shards", type=int, help="sharded 後端的分片數（預設 8）")
+    parser.add_argument("--ops", type=int, default=20, help="新增、更新、刪除各執行幾次")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--no-memory", action="store_true", help="略過記憶體量測（tracemalloc 會拖慢載入）")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--compare", help="與先前的結果檔比較")
+    parser.add_argument("--cli-size", type=int, default=1000, help="量測命令列啟動時間使用的資料量（0 表示略過）")
+    parser.add_argument("--columnar", action="store_true", help="以 NumPy 欄式掃描取代 n-gram 索引（需要 NumPy）")
+    args = parser.parse_args(argv)
+    if args.shards:
+        # 分片數只在建立新的分片目錄時使用，每個資料量都會建立新的目錄
+        os.environ[SHARDS_ENV] = str(args.shards)
+
+    report = {
+        "revision": git_revision(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "backend": args.backend,
+        "ops": args.ops,
+        "seed": args.seed,
+        "columnar": args.columnar,
+        "shards": args.shards,
+        "cpu_count": os.cpu_count(),
+        "results": {},
+    }
+    for size in args.sizes:
+        print(f"測試 {size} 位聯絡人...", flush=True)
+        results = bench_size(size, args.backend, args.ops, not args.no_memory, args.seed, args.columnar)
+        report["results"][str(size)] = results
+        for name, stats in results.items():
+            line = f"  {name:40s} {stats['mean_s'] * 1000:10.3f} ms"
+            if "peak_bytes" in stats:
+                line += f"  峰值 {stats['peak_bytes'] / 1024:10.1f} KiB"
+            print(line)
+
+    if args.cli_size:
+        print(f"測試命令列啟動時間（{args.cli_size} 位聯絡人）...", flush=True)
+        startup = bench_cli_startup(args.cli_size, args.seed)
+        report["cli_startup"] = startup
+        status = "符合" if startup["meets_target"] else "未達"
+        print(f"  main.py query {startup['mean_s'] * 1000:10.3f} ms（目標 {CLI_STARTUP_TARGET_S * 1000:.0f} ms，{status}）")
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\n結果已寫入 {args.output}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            compare(report, json.load(f))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,223 @@
+"""通訊錄命令列工具（不需要 PyQt6）
+
+    python main.py query 陳 --type 姓名
+    python main.py query "name:張 address:台北 -email:example.com" --type 進階查詢 --explain
+    python main.py add 王小明 0912345678 ming@mail.tw 台北市信義區
+    python main.py delete 王小明
+    python main.py export contacts.csv
+    python main.py import contacts.vcf
+    python main.py dedup
+    python main.py merge 王小明 王曉明 "Ming Wang"
+    python main.py facets 台北市
+"""
+import argparse
+import json
+import sys
+from models import AddressBook
+from storage import create_storage
+from contact_io import read_contacts, write_contacts, READERS, WRITERS, FIELDS
+from dedup import DEFAULT_MIN_SCORE
+
+SEARCH_TYPES = list(AddressBook.SEARCH_FIELDS) + [AddressBook.FUZZY_SEARCH_TYPE, AddressBook.QUERY_SEARCH_TYPE]
+
+
+def add_storage_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--backend", choices=["json", "journal", "sqlite", "binary", "sharded"],
+                        help="儲存後端（預設讀取 ADDRESSBOOK_BACKEND，否則為 json）")
+    parser.add_argument("--file", help="資料檔路徑（預設讀取 ADDRESSBOOK_FILE）")
+
+
+def open_address_book(args) -> AddressBook:
+    return AddressBook(storage=create_storage(args.backend, args.file))
+
+
+def cmd_import(args) -> int:
+    """匯入聯絡人：一次檢查所有資料，最後只儲存一次"""
+    address_book = open_address_book(args)
+    try:
+        added, errors = address_book.bulk_add(read_contacts(args.source, args.format))
+    finally:
+        address_book.close()
+
+    for row_number, message in errors:
+        print(f"第 {row_number} 筆：{message}", file=sys.stderr)
+    print(f"成功匯入 {added} 位聯絡人，{len(errors)} 筆失敗")
+    return 1 if errors else 0
+
+
+def print_contacts(contacts, fmt: str):
+    """tsv：每行一位聯絡人、欄位以 tab 分隔，方便 cut/awk 處理；json：每行一個 JSON 物件"""
+    for contact in contacts:
+        if fmt == "json":
+            print(json.dumps(contact.to_dict(), ensure_ascii=False))
+        else:
+            print("\t".join(getattr(contact, field) for field in FIELDS))
+
+
+def cmd_query(args) -> int:
+    """搜尋聯絡人；沒有結果時回傳 1，方便在 shell 中判斷"""
+    address_book = open_address_book(args)
+    try:
+        if args.explain:
+            if args.type != AddressBook.QUERY_SEARCH_TYPE:
+                raise ValueError(f"--explain 只適用於 --type {AddressBook.QUERY_SEARCH_TYPE}")
+            # 執行計畫輸出到 stderr，不影響 stdout 的查詢結果
+            print(address_book.explain(args.text, use_index=False), file=sys.stderr)
+        # 只查詢一次，直接掃描比建立搜尋索引快
+        contacts = address_book.scan_contacts(args.text, args.type)
+        print_contacts(contacts, args.format)
+    finally:
+        address_book.close()
+    return 0 if contacts else 1
+
+
+def cmd_add(args) -> int:
+    address_book = open_address_book(args)
+    try:
+        success, message = address_book.add_contact(args.name, args.phone, args.email, args.address)
+    finally:
+        address_book.close()
+    print(message, file=sys.stdout if success else sys.stderr)
+    return 0 if success else 1
+
+
+def cmd_delete(args) -> int:
+    address_book = open_address_book(args)
+    try:
+        success, message = address_book.delete_contact(args.name)
+    finally:
+        address_book.close()
+    print(message, file=sys.stdout if success else sys.stderr)
+    return 0 if success else 1
+
+
+def cmd_export(args) -> int:
+    """匯出聯絡人，可用 --query 只匯出搜尋結果"""
+    address_book = open_address_book(args)
+    try:
+        # 逐批產生並寫出，大型通訊錄匯出時不會再複製一份所有聯絡人
+        count = write_contacts(address_book.iter_contacts(args.query or "", args.type),
+                               args.destination, args.format)
+    finally:
+        address_book.close()
+    if args.destination != "-":
+        print(f"已匯出 {count} 位聯絡人到 {args.destination}")
+    return 0
+
+
+def cmd_dedup(args) -> int:
+    """列出可能重複的聯絡人群組；沒有找到時回傳 1"""
+    address_book = open_address_book(args)
+    try:
+        clusters = address_book.find_duplicates(args.min_score)
+    finally:
+        address_book.close()
+    for cluster in clusters:
+        if args.format == "json":
+            print(json.dumps(cluster.to_dict(), ensure_ascii=False))
+        else:
+            # 分數、群組中的姓名、分數最高的一對的理由，以 tab 分隔
+            _, _, _, reasons = cluster.pairs[0]
+            print(f"{cluster.score:.2f}\t{'、'.join(cluster.names)}\t{'、'.join(reasons)}")
+    return 0 if clusters else 1
+
+
+def cmd_merge(args) -> int:
+    address_book = open_address_book(args)
+    try:
+        success, message = address_book.merge_contacts(args.keep, args.others, args.phone, args.email, args.address)
+    finally:
+        address_book.close()
+    print(message, file=sys.stdout if success else sys.stderr)
+    return 0 if success else 1
+
+
+def cmd_facets(args) -> int:
+    """列出地址分類的下一層與人數（分類、人數以 tab 分隔）；分類不存在時回傳 1"""
+    address_book = open_address_book(args)
+    try:
+        path = tuple(args.path)
+        facets = address_book.address_facets(path)
+        total = address_book.facet_count(path)
+    finally:
+        address_book.close()
+    for part, count in facets:
+        print(f"{part}\t{count}")
+    return 0 if total else 1
+
+
+def build_parser(prog: str = None) -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog=prog, description="通訊錄命令列工具（不帶參數執行 main.py 則開啟圖形介面）")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    import_parser = subparsers.add_parser("import", help="從 CSV、JSON、JSON Lines 或 vCard 匯入聯絡人")
+    import_parser.add_argument("source", help="要匯入的檔案")
+    import_parser.add_argument("--format", choices=sorted(READERS), help="檔案格式（預設依副檔名判斷）")
+    add_storage_arguments(import_parser)
+    import_parser.set_defaults(handler=cmd_import)
+
+    query_parser = subparsers.add_parser("query", help="搜尋聯絡人")
+    query_parser.add_argument("text", help="搜尋關鍵字")
+    query_parser.add_argument("--type", choices=SEARCH_TYPES, default="全欄位", help="搜尋類型（預設全欄位）")
+    query_parser.add_argument("--format", choices=["tsv", "json"], default="tsv", help="輸出格式（預設 tsv）")
+    query_parser.add_argument("--explain", action="store_true",
+                              help="將查詢的執行計畫印到標準錯誤（--type 進階查詢 時使用）")
+    add_storage_arguments(query_parser)
+    query_parser.set_defaults(handler=cmd_query)
+
+    add_parser = subparsers.add_parser("add", help="新增聯絡人")
+    add_parser.add_argument("name")
+    add_parser.add_argument("phone")
+    add_parser.add_argument("email")
+    add_parser.add_argument("address")
+    add_storage_arguments(add_parser)
+    add_parser.set_defaults(handler=cmd_add)
+
+    delete_parser = subparsers.add_parser("delete", help="刪除聯絡人")
+    delete_parser.add_argument("name")
+    add_storage_arguments(delete_parser)
+    delete_parser.set_defaults(handler=cmd_delete)
+
+    export_parser = subparsers.add_parser("export", help="匯出為 CSV、JSON、JSON Lines 或 vCard")
+    export_parser.add_argument("destination", help="輸出檔案，- 表示標準輸出")
+    export_parser.add_argument("--format", choices=sorted(WRITERS), help="檔案格式（預設依副檔名判斷）")
+    export_parser.add_argument("--query", help="只匯出符合的聯絡人")
+    export_parser.add_argument("--type", choices=SEARCH_TYPES, default="全欄位", help="搜尋類型（預設全欄位）")
+    add_storage_arguments(export_parser)
+    export_parser.set_defaults(handler=cmd_export)
+
+    dedup_parser = subparsers.add_parser("dedup", help="找出可能重複的聯絡人（共用電話、電子郵件或地址且姓名相近）")
+    dedup_parser.add_argument("--min-score", type=float, default=DEFAULT_MIN_SCORE,
+                              help=f"列出的最低分數（0 到 1，預設 {DEFAULT_MIN_SCORE}）")
+    dedup_parser.add_argument("--format", choices=["tsv", "json"], default="tsv", help="輸出格式（預設 tsv）")
+    add_storage_arguments(dedup_parser)
+    dedup_parser.set_defaults(handler=cmd_dedup)
+
+    merge_parser = subparsers.add_parser("merge", help="將重複的聯絡人合併到 keep（其餘聯絡人刪除）")
+    merge_parser.add_argument("keep", help="要保留的聯絡人")
+    merge_parser.add_argument("others", nargs="+", help="要合併並刪除的聯絡人")
+    merge_parser.add_argument("--phone", help="同時更新保留者的電話")
+    merge_parser.add_argument("--email", help="同時更新保留者的電子郵件")
+    merge_parser.add_argument("--address", help="同時更新保留者的地址")
+    add_storage_arguments(merge_parser)
+    merge_parser.set_defaults(handler=cmd_merge)
+
+    facets_parser = subparsers.add_parser("facets", help="依縣市、鄉鎮市區、路段統計聯絡人數")
+    facets_parser.add_argument("path", nargs="*", help="上層分類，例如 台北市 大安區（省略時列出縣市）")
+    add_storage_arguments(facets_parser)
+    facets_parser.set_defaults(handler=cmd_facets)
+
+    return parser
+
+
+def main(argv=None, prog: str = None) -> int:
+    args = build_parser(prog).parse_args(argv)
+    try:
+        return args.handler(args)
+    except (OSError, ValueError) as e:
+        print(f"錯誤：{e}", file=sys.stderr)
+        return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,287 @@
+import os
+import sys
+from typing import List, Dict, Tuple, Set, Iterable, Optional
+from search_index import edit_distance
+from phone_index import normalize_phone
+
+# NumPy 為選用套件：沒有安裝時仍可使用 n-gram 索引
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+HAS_NUMPY = np is not None
+
+# 設為 numpy 時介面改用欄式掃描取代 n-gram 索引
+SEARCH_ENGINE_ENV = "ADDRESSBOOK_SEARCH_ENGINE"
+
+
+def columnar_requested() -> bool:
+    """ADDRESSBOOK_SEARCH_ENGINE=numpy 且已安裝 NumPy 時回傳 True"""
+    if os.environ.get(SEARCH_ENGINE_ENV, "").lower() != "numpy":
+        return False
+    if not HAS_NUMPY:
+        print(f"{SEARCH_ENGINE_ENV}=numpy 需要安裝 NumPy（pip install numpy），改用 n-gram 索引", file=sys.stderr)
+        return False
+    return True
+
+
+class ColumnScanner:
+    """以 NumPy 固定寬度 unicode 陣列逐欄儲存的搜尋引擎，介面與 NGramIndex 相同
+
+    Contact 限制了各欄位的長度，每個欄位都能存成 dtype 為 <U{長度} 的陣列（預先轉成小寫），
+    子字串、前綴與完全相符的比對都以 np.char 對整欄一次完成並回傳符合的列號。
+    不需要建立 posting list，建立快且記憶體固定（每位聯絡人約 400 bytes），適合大量聯絡人。
+    列號依加入順序遞增，刪除的列只做標記，累積超過一半時才壓縮。
+    """
+
+    # 初始容量，不足時加倍
+    INITIAL_CAPACITY = 1024
+
+    def __init__(self, widths: Dict[str, int]):
+        if np is None:
+            raise ImportError("ColumnScanner 需要 NumPy（pip install numpy）")
+        self.fields = list(widths)
+        self._widths = dict(widths)
+        self.clear()
+
+    def clear(self):
+        self._columns = {
+            field: np.zeros(self.INITIAL_CAPACITY, dtype=f"<U{width}")
+            for field, width in self._widths.items()
+        }
+        self._alive = np.zeros(self.INITIAL_CAPACITY, dtype=bool)
+        # 列號 -> key（已刪除的列為 None），以及 key -> 列號
+        self._keys: List[Optional[str]] = []
+        self._rows: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def get_state(self) -> tuple:
+        """回傳只由內建型別組成的內容（陣列轉成 bytes），可用 marshal 儲存"""
+        size = len(self._keys)
+        columns = {
+            field: (column.dtype.str, column[:size].tobytes())
+            for field, column in self._columns.items()
+        }
+        return self.fields, self._keys, columns, self._alive[:size].tobytes()
+
+    def set_state(self, state: tuple):
+        fields, keys, columns, alive = state
+        self.fields = list(fields)
+        self._keys = list(keys)
+        size = len(self._keys)
+        capacity = max(self.INITIAL_CAPACITY, size)
+        self._columns = {}
+        for field, (dtype, data) in columns.items():
+            column = np.zeros(capacity, dtype=dtype)
+            column[:size] = np.frombuffer(data, dtype=dtype)
+            self._columns[field] = column
+        self._alive = np.zeros(capacity, dtype=bool)
+        self._alive[:size] = np.frombuffer(alive, dtype=bool)
+        self._rows = {key: row for row, key in enumerate(self._keys) if key is not None}
+
+    def doc_id(self, key: str) -> int:
+        """回傳列號（依加入順序遞增），不存在時回傳 -1"""
+        return self._rows.get(key, -1)
+
+    def _reserve(self, size: int):
+        capacity = len(self._alive)
+        if size <= capacity:
+            return
+        while capacity < size:
+            capacity *= 2
+        for field, column in self._columns.items():
+            grown = np.zeros(capacity, dtype=column.dtype)
+            grown[:len(column)] = column
+            self._columns[field] = grown
+        alive = np.zeros(capacity, dtype=bool)
+        alive[:len(self._alive)] = self._alive
+        self._alive = alive
+
+    def _widen(self, field: str, width: int):
+        # 轉小寫後可能變長（例如 "İ"），加寬欄位避免被截斷
+        column = self._columns[field]
+        if width > column.itemsize // 4:
+            self._columns[field] = column.astype(f"<U{width}")
+
+    def add(self, key: str, values: Dict[str, str]):
+        """加入一筆文件；key 已存在時等同 update"""
+        self.add_many([(key, values)])
+
+    def add_many(self, items: Iterable[Tuple[str, Dict[str, str]]]):
+        """一次加入多筆 (key, 欄位值)，整段寫入陣列，比逐筆加入快得多"""
+        # 直接收集成各欄位的字串清單，不保留每筆的 dict（大量存活的小物件會反覆觸發垃圾回收）
+        keys = []
+        lowered = {field: [] for field in self.fields}
+        for key, values in items:
+            if key in self._rows:
+                self.update(key, values)
+                continue
+            keys.append(key)
+            for field, column in lowered.items():
+                column.append(values[field].lower())
+        if not keys:
+            return
+        start = len(self._keys)
+        end = start + len(keys)
+        self._reserve(end)
+        for field, column in lowered.items():
+            self._widen(field, max(map(len, column)))
+            self._columns[field][start:end] = column
+        self._alive[start:end] = True
+        self._rows.update(zip(keys, range(start, end)))
+        self._keys.extend(keys)
+
+    def update(self, key: str, values: Dict[str, str]):
+        """更新文件內容，保留原本的列號（順序）"""
+        row = self._rows.get(key)
+        if row is None:
+            self.add(key, values)
+            return
+        for field in self.fields:
+            value = values[field].lower()
+            self._widen(field, len(value))
+            self._columns[field][row] = value
+
+    def remove(self, key: str):
+        row = self._rows.pop(key, None)
+        if row is None:
+            return
+        self._keys[row] = None
+        self._alive[row] = False
+        for column in self._columns.values():
+            column[row] = ""
+        garbage = len(self._keys) - len(self._rows)
+        if garbage > self.INITIAL_CAPACITY and garbage * 2 > len(self._keys):
+            self._compact()
+
+    def _compact(self):
+        """移除已刪除的列，保留其餘列的相對順序"""
+        live = np.flatnonzero(self._alive[:len(self._keys)])
+        capacity = max(self.INITIAL_CAPACITY, len(live))
+        for field, column in self._columns.items():
+            compacted = np.zeros(capacity, dtype=column.dtype)
+            compacted[:len(live)] = column[live]
+            self._columns[field] = compacted
+        self._alive = np.zeros(capacity, dtype=bool)
+        self._alive[:len(live)] = True
+        self._keys = [self._keys[row] for row in live]
+        self._rows = {key: row for row, key in enumerate(self._keys)}
+
+    def _column(self, field: str):
+        return self._columns[field][:len(self._keys)]
+
+    def _live_rows(self, mask) -> "np.ndarray":
+        return np.flatnonzero(mask & self._alive[:len(self._keys)])
+
+    def contains(self, field: str, query: str) -> "np.ndarray":
+        """欄位值包含 query（不分大小寫）的列號"""
+        return self._live_rows(np.char.find(self._column(field), query.lower()) >= 0)
+
+    def prefix(self, field: str, query: str) -> "np.ndarray":
+        """欄位值以 query 開頭（不分大小寫）的列號"""
+        return self._live_rows(np.char.startswith(self._column(field), query.lower()))
+
+    def suffix(self, field: str, query: str) -> "np.ndarray":
+        """欄位值以 query 結尾（不分大小寫）的列號"""
+        return self._live_rows(np.char.endswith(self._column(field), query.lower()))
+
+    def equals(self, field: str, query: str) -> "np.ndarray":
+        """欄位值與 query 完全相同（不分大小寫）的列號"""
+        return self._live_rows(self._column(field) == query.lower())
+
+    def keys(self, rows: Iterable[int]) -> List[str]:
+        return [self._keys[row] for row in rows]
+
+    def search(self, query: str, fields: Iterable[str]) -> List[str]:
+        """回傳任一指定欄位包含 query（不分大小寫）的 key，依加入順序排列"""
+        query = query.lower()
+        if not query:
+            return []
+        mask = None
+        for field in fields:
+            matched = np.char.find(self._column(field), query) >= 0
+            mask = matched if mask is None else mask | matched
+        if mask is None:
+            return []
+        return self.keys(self._live_rows(mask))
+
+    def estimate(self, query: str, fields: Iterable[str]) -> int:
+        """欄式掃描不維護統計資料，以總筆數作為符合筆數的上限"""
+        return len(self)
+
+    def fuzzy_search(self, query: str, field: str, max_distance: int) -> List[Tuple[int, str]]:
+        """回傳欄位值與 query 的編輯距離不超過 max_distance 的 (距離, key)
+
+        篩選條件與 NGramIndex.fuzzy_search 相同（長度差與共同字元數），但以整欄向量運算完成，
+        只有通過篩選的少數候選需要計算編輯距離。結果依距離排序，距離相同時依加入順序。
+        """
+        query = query.lower()
+        if not query:
+            return []
+        column = self._column(field)
+        mask = np.abs(np.char.str_len(column) - len(query)) <= max_distance
+        chars = set(query)
+        min_shared = len(chars) - max_distance
+        if min_shared > 0:
+            shared = np.zeros(len(column), dtype=np.int32)
+            for char in chars:
+                shared += np.char.find(column, char) >= 0
+            mask &= shared >= min_shared
+
+        matches = []
+        for row in self._live_rows(mask):
+            distance = edit_distance(query, str(column[row]), max_distance)
+            if distance <= max_distance:
+                matches.append((distance, int(row)))
+        matches.sort()
+        return [(distance, self._keys[row]) for distance, row in matches]
+
+
+class PhoneColumn:
+    """PhoneIndex 的欄式版本，介面相同
+
+    正規化後的號碼存成一個固定寬度陣列，前綴與後綴比對以 np.char 對整欄完成，
+    不需要維護兩個排序陣列，建立時也不必排序。
+    """
+
+    def __init__(self, width: int):
+        self._scanner = ColumnScanner({"digits": width})
+
+    def clear(self):
+        self._scanner.clear()
+
+    def __len__(self) -> int:
+        return len(self._scanner)
+
+    def get_state(self) -> tuple:
+        return self._scanner.get_state()
+
+    def set_state(self, state: tuple):
+        self._scanner.set_state(state)
+
+    def add(self, key: str, phone: str):
+        self._scanner.add(key, {"digits": normalize_phone(phone)})
+
+    def add_many(self, items: Iterable[Tuple[str, str]]):
+        self._scanner.add_many((key, {"digits": normalize_phone(phone)}) for key, phone in items)
+
+    def update(self, key: str, phone: str):
+        self._scanner.update(key, {"digits": normalize_phone(phone)})
+
+    def remove(self, key: str):
+        self._scanner.remove(key)
+
+    def count(self, query: str) -> int:
+        """lookup(query) 筆數的上限；沒有排序陣列可供估計，以總筆數代替"""
+        return len(self)
+
+    def lookup(self, query: str) -> Set[str]:
+        """號碼以 query 開頭或結尾的 key"""
+        digits = normalize_phone(query)
+        if not digits:
+            return set()
+        rows = np.union1d(self._scanner.prefix("digits", digits), self._scanner.suffix("digits", digits))
+        return set(self._scanner.keys(rows))
@@ -0,0 +1,275 @@
+import csv
+import json
+import os
+import sys
+from itertools import islice
+from typing import Dict, Iterator, Iterable, List, Optional, TextIO
+
+FIELDS = ("name", "phone", "email", "address")
+
+# 匯出時每批格式化並寫出的聯絡人數；記憶體用量只與批次大小有關，與通訊錄大小無關
+EXPORT_CHUNK_SIZE = 1000
+
+# CSV 標題可使用英文欄位名稱或介面上的中文名稱
+CSV_HEADER_ALIASES = {
+    "name": "name", "姓名": "name",
+    "phone": "phone", "電話": "phone",
+    "email": "email", "電子郵件": "email",
+    "address": "address", "地址": "address",
+}
+
+FORMAT_EXTENSIONS = {
+    ".csv": "csv",
+    ".json": "json",
+    ".jsonl": "jsonl",
+    ".ndjson": "jsonl",
+    ".vcf": "vcard",
+    ".vcard": "vcard",
+}
+
+
+def detect_format(filename: str) -> str:
+    """依副檔名判斷檔案格式"""
+    extension = os.path.splitext(filename)[1].lower()
+    if extension not in FORMAT_EXTENSIONS:
+        raise ValueError(f"無法判斷檔案格式：{filename}")
+    return FORMAT_EXTENSIONS[extension]
+
+
+def read_csv(filename: str) -> Iterator[Dict]:
+    """讀取 CSV，第一列為標題；沒有標題時依 姓名,電話,電子郵件,地址 的順序解讀"""
+    with open(filename, 'r', encoding='utf-8-sig', newline='') as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            return
+        columns = [CSV_HEADER_ALIASES.get(column.strip().lower()) for column in header]
+        if not any(columns):
+            columns = list(FIELDS)
+            yield dict(zip(columns, header))
+        for row in reader:
+            if not any(cell.strip() for cell in row):
+                continue
+            yield {column: value for column, value in zip(columns, row) if column}
+
+
+def read_json(filename: str) -> Iterator[Dict]:
+    """讀取與 contacts.json 相同格式的 JSON 陣列"""
+    with open(filename, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    for item in data:
+        yield {field: item.get(field, "") for field in FIELDS}
+
+
+def read_jsonl(filename: str) -> Iterator[Dict]:
+    """讀取 JSON Lines（每行一位聯絡人），逐行解析，不會一次載入整個檔案"""
+    with open(filename, 'r', encoding='utf-8-sig') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            yield {field: item.get(field, "") for field in FIELDS}
+
+
+def _unescape_vcard(value: str) -> str:
+    return (value.replace("\\n", "\n").replace("\\N", "\n")
+            .replace("\\,", ",").replace("\\;", ";").replace("\\\\", "\\"))
+
+
+def _split_vcard_components(value: str):
+    """依未跳脫的分號切開結構化欄位（例如 ADR）"""
+    parts, current, escaped = [], [], False
+    for char in value:
+        if escaped:
+            current.append("\\" + char)
+            escaped = False
+        elif char == "\\":
+            escaped = True
+        elif char == ";":
+            parts.append("".join(current))
+            current = []
+        else:
+            current.append(char)
+    parts.append("".join(current))
+    return [_unescape_vcard(part) for part in parts]
+
+
+def _unfold_vcard_lines(f) -> Iterator[str]:
+    """合併以空白開頭的續行（RFC 6350 line folding）"""
+    previous: Optional[str] = None
+    for line in f:
+        line = line.rstrip("\r\n")
+        if line[:1] in (" ", "\t") and previous is not None:
+            previous += line[1:]
+            continue
+        if previous is not None:
+            yield previous
+        previous = line
+    if previous is not None:
+        yield previous
+
+
+def read_vcard(filename: str) -> Iterator[Dict]:
+    """讀取 vCard（.vcf），每張名片取 FN、第一個 TEL、EMAIL 與 ADR"""
+    with open(filename, 'r', encoding='utf-8-sig') as f:
+        card: Optional[Dict] = None
+        for line in _unfold_vcard_lines(f):
+            if ":" not in line:
+                continue
+            key, value = line.split(":", 1)
+            prop = key.split(";", 1)[0].split(".")[-1].upper()
+            if prop == "BEGIN" and value.strip().upper() == "VCARD":
+                card = {}
+            elif prop == "END" and value.strip().upper() == "VCARD":
+                if card is not None:
+                    yield {field: card.get(field, "") for field in FIELDS}
+                card = None
+            elif card is None:
+                continue
+            elif prop == "FN":
+                card.setdefault("name", _unescape_vcard(value))
+            elif prop == "TEL":
+                card.setdefault("phone", _unescape_vcard(value))
+            elif prop == "EMAIL":
+                card.setdefault("email", _unescape_vcard(value))
+            elif prop == "ADR":
+                # 郵政信箱;延伸地址;街道;城市;區域;郵遞區號;國家，中文地址由大到小排列
+                parts = _split_vcard_components(value) + [""] * 7
+                _, extended, street, locality, region, _, _ = parts[:7]
+                address = "".join(part for part in (region, locality, street, extended) if part)
+                card.setdefault("address", address)
+
+
+READERS = {
+    "csv": read_csv,
+    "json": read_json,
+    "jsonl": read_jsonl,
+    "vcard": read_vcard,
+}
+
+
+def read_contacts(filename: str, fmt: Optional[str] = None) -> Iterator[Dict]:
+    """依格式（csv、json、vcard；未指定時依副檔名判斷）逐筆讀取聯絡人"""
+    fmt = fmt or detect_format(filename)
+    if fmt not in READERS:
+        raise ValueError(f"不支援的檔案格式：{fmt}")
+    return READERS[fmt](filename)
+
+
+def _escape_vcard(value: str) -> str:
+    return (value.replace("\\", "\\\\").replace("\n", "\\n")
+            .replace(",", "\\,").replace(";", "\\;"))
+
+
+def _chunks(contacts: Iterable, size: int = EXPORT_CHUNK_SIZE) -> Iterator[List]:
+    """將聯絡人切成固定大小的批次，contacts 可以是產生器"""
+    iterator = iter(contacts)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def write_csv(contacts: Iterable, f: TextIO) -> int:
+    """寫出 CSV，標題使用介面上的中文欄位名稱（read_csv 可讀回）"""
+    writer = csv.writer(f)
+    writer.writerow(["姓名", "電話", "電子郵件", "地址"])
+    count = 0
+    for chunk in _chunks(contacts):
+        writer.writerows([contact.name, contact.phone, contact.email, contact.address] for contact in chunk)
+        count += len(chunk)
+    return count
+
+
+# 共用的編碼器；json.dumps 每次呼叫都會重新建立，而指定 indent 時會改用較慢的純 Python 實作
+_encode_json = json.JSONEncoder(ensure_ascii=False).encode
+
+
+def _json_item(contact) -> str:
+    """與 json.dump(..., indent=2) 輸出的陣列元素相同的格式"""
+    return (
+        f'  {{\n    "name": {_encode_json(contact.name)},\n    "phone": {_encode_json(contact.phone)},\n'
+        f'    "email": {_encode_json(contact.email)},\n    "address": {_encode_json(contact.address)}\n  }}'
+    )
+
+
+def write_json(contacts: Iterable, f: TextIO) -> int:
+    """寫出與 contacts.json 相同格式的 JSON 陣列（逐批寫出，不先建立整個陣列）"""
+    count = 0
+    f.write("[")
+    for chunk in _chunks(contacts):
+        f.write(("," if count else "") + "\n" + ",\n".join(_json_item(contact) for contact in chunk))
+        count += len(chunk)
+    f.write("\n]\n" if count else "]\n")
+    return count
+
+
+def write_jsonl(contacts: Iterable, f: TextIO) -> int:
+    """寫出 JSON Lines，每行一位聯絡人"""
+    count = 0
+    for chunk in _chunks(contacts):
+        f.write("".join(
+            f'{{"name": {_encode_json(contact.name)}, "phone": {_encode_json(contact.phone)}, '
+            f'"email": {_encode_json(contact.email)}, "address": {_encode_json(contact.address)}}}\n'
+            for contact in chunk
+        ))
+        count += len(chunk)
+    return count
+
+
+def _vcard(contact) -> str:
+    return (
+        "BEGIN:VCARD\r\nVERSION:3.0\r\n"
+        f"FN:{_escape_vcard(contact.name)}\r\n"
+        f"TEL:{_escape_vcard(contact.phone)}\r\n"
+        f"EMAIL:{_escape_vcard(contact.email)}\r\n"
+        f"ADR:;;{_escape_vcard(contact.address)};;;;\r\n"
+        "END:VCARD\r\n"
+    )
+
+
+def write_vcard(contacts: Iterable, f: TextIO) -> int:
+    """寫出 vCard 3.0，地址整段放在 ADR 的街道欄位"""
+    count = 0
+    for chunk in _chunks(contacts):
+        f.write("".join(_vcard(contact) for contact in chunk))
+        count += len(chunk)
+    return count
+
+
+WRITERS = {
+    "csv": write_csv,
+    "json": write_json,
+    "jsonl": write_jsonl,
+    "vcard": write_vcard,
+}
+
+
+def write_contacts(contacts: Iterable, filename: str, fmt: Optional[str] = None) -> int:
+    """依格式逐批寫出聯絡人，回傳寫出的筆數
+
+    contacts 可以是產生器（例如 AddressBook.iter_contacts()），不需先建立完整清單。
+    filename 為 "-" 時寫到標準輸出（此時未指定格式視為 csv）；寫入檔案時先寫暫存檔
+    再原子替換，匯出途中失敗或取消不會留下寫一半的檔案，也不會破壞原有的檔案。
+    """
+    if filename == "-":
+        fmt = fmt or "csv"
+    else:
+        fmt = fmt or detect_format(filename)
+    if fmt not in WRITERS:
+        raise ValueError(f"不支援的檔案格式：{fmt}")
+    writer = WRITERS[fmt]
+    if filename == "-":
+        return writer(contacts, sys.stdout)
+    from storage import write_file_atomic
+
+    count = 0
+
+    def write(f):
+        nonlocal count
+        count = writer(contacts, f)
+
+    # vCard 自行寫出 \r\n，CSV 由 csv 模組處理換行，兩者都需要關閉換行轉換
+    write_file_atomic(filename, write, newline='')
+    return count
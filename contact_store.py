@@ -0,0 +1,162 @@
+from array import array
+from typing import Dict
+
+FIELDS = ("name", "phone", "email", "address")
+
+
+class ContactStore:
+    """以欄為單位（struct of arrays）緊湊儲存聯絡人
+
+    每個欄位的所有值以 UTF-8 依序寫進同一個 bytearray，另以 array 記錄每列的
+    起始位置與長度，因此每位聯絡人不需要四個獨立的 str 物件（每個 str 光是
+    物件標頭就佔約 50 位元組）。
+
+    另外為每個欄位維護一份小寫的影子欄位供搜尋使用；小寫後內容不變時
+    （例如中文、數字）影子欄位直接指向原本的位元組，不額外佔用空間。
+
+    更新欄位時新值附加在緩衝區尾端，舊值留下的空間在 compact() 時回收。
+    刪除的列只會清空而不重複使用，避免仍持有舊 ContactView 的地方讀到別人的資料；
+    清空的列仍佔用位置陣列中的一格（每列約 40 位元組），直到重新載入通訊錄才釋放，
+    因此大量刪除後記憶體不會完全回到原本的大小。
+    """
+
+    def __init__(self):
+        self._buffers: Dict[str, bytearray] = {field: bytearray() for field in FIELDS}
+        self._starts: Dict[str, array] = {field: array('I') for field in FIELDS}
+        self._lengths: Dict[str, array] = {field: array('B') for field in FIELDS}
+        self._lowered_starts: Dict[str, array] = {field: array('I') for field in FIELDS}
+        self._lowered_lengths: Dict[str, array] = {field: array('B') for field in FIELDS}
+        self._rows = 0
+        self._released = 0
+        self._garbage = 0
+
+    def __len__(self) -> int:
+        return self._rows - self._released
+
+    def _write(self, field: str, value: str):
+        """將值寫入緩衝區尾端，回傳 (起點, 長度, 小寫起點, 小寫長度)"""
+        buffer = self._buffers[field]
+        encoded = value.encode('utf-8')
+        start = len(buffer)
+        buffer += encoded
+        lowered = value.lower()
+        if lowered == value:
+            return start, len(encoded), start, len(encoded)
+        encoded_lowered = lowered.encode('utf-8')
+        lowered_start = len(buffer)
+        buffer += encoded_lowered
+        return start, len(encoded), lowered_start, len(encoded_lowered)
+
+    def _footprint(self, row: int, field: str) -> int:
+        """回傳某一列某欄位在緩衝區中佔用的位元組數"""
+        length = self._lengths[field][row]
+        if self._lowered_starts[field][row] != self._starts[field][row]:
+            length += self._lowered_lengths[field][row]
+        return length
+
+    def append(self, name: str, phone: str, email: str, address: str) -> "ContactView":
+        for field, value in zip(FIELDS, (name, phone, email, address)):
+            start, length, lowered_start, lowered_length = self._write(field, value)
+            self._starts[field].append(start)
+            self._lengths[field].append(length)
+            self._lowered_starts[field].append(lowered_start)
+            self._lowered_lengths[field].append(lowered_length)
+        self._rows += 1
+        return ContactView(self, self._rows - 1)
+
+    def get(self, row: int, field: str) -> str:
+        start = self._starts[field][row]
+        return self._buffers[field][start:start + self._lengths[field][row]].decode('utf-8')
+
+    def get_lowered(self, row: int, field: str) -> str:
+        start = self._lowered_starts[field][row]
+        return self._buffers[field][start:start + self._lowered_lengths[field][row]].decode('utf-8')
+
+    def set(self, row: int, field: str, value: str):
+        self._garbage += self._footprint(row, field)
+        start, length, lowered_start, lowered_length = self._write(field, value)
+        self._starts[field][row] = start
+        self._lengths[field][row] = length
+        self._lowered_starts[field][row] = lowered_start
+        self._lowered_lengths[field][row] = lowered_length
+
+    def release(self, row: int):
+        """清空已刪除的列"""
+        for field in FIELDS:
+            self._garbage += self._footprint(row, field)
+            self._lengths[field][row] = 0
+            self._lowered_starts[field][row] = self._starts[field][row]
+            self._lowered_lengths[field][row] = 0
+        self._released += 1
+
+    @property
+    def garbage(self) -> int:
+        """更新與刪除後尚未回收的位元組數"""
+        return self._garbage
+
+    def nbytes(self) -> int:
+        """回傳欄位資料與位置陣列佔用的位元組數"""
+        total = 0
+        for field in FIELDS:
+            total += len(self._buffers[field])
+            for columns in (self._starts, self._lengths, self._lowered_starts, self._lowered_lengths):
+                total += columns[field].itemsize * len(columns[field])
+        return total
+
+    def compact(self):
+        """重寫緩衝區，回收更新與刪除留下的空間；列號不變"""
+        for field in FIELDS:
+            old = self._buffers[field]
+            buffer = bytearray()
+            starts, lengths = self._starts[field], self._lengths[field]
+            lowered_starts, lowered_lengths = self._lowered_starts[field], self._lowered_lengths[field]
+            for row in range(self._rows):
+                old_start, old_lowered_start = starts[row], lowered_starts[row]
+                starts[row] = len(buffer)
+                buffer += old[old_start:old_start + lengths[row]]
+                if old_lowered_start == old_start:
+                    lowered_starts[row] = starts[row]
+                else:
+                    lowered_starts[row] = len(buffer)
+                    buffer += old[old_lowered_start:old_lowered_start + lowered_lengths[row]]
+            self._buffers[field] = buffer
+        self._garbage = 0
+
+
+def _column_property(field: str):
+    def getter(self) -> str:
+        return self._store.get(self._row, field)
+
+    def setter(self, value: str):
+        self._store.set(self._row, field, value)
+
+    return property(getter, setter)
+
+
+class ContactView:
+    """ContactStore 中一列的輕量檢視，提供與 Contact 相同的屬性與方法"""
+
+    __slots__ = ("_store", "_row")
+
+    name = _column_property("name")
+    phone = _column_property("phone")
+    email = _column_property("email")
+    address = _column_property("address")
+
+    def __init__(self, store: ContactStore, row: int):
+        self._store = store
+        self._row = row
+
+    @property
+    def row(self) -> int:
+        return self._row
+
+    def lowered(self, field: str) -> str:
+        """回傳預先轉成小寫的欄位值"""
+        return self._store.get_lowered(self._row, field)
+
+    def to_dict(self) -> Dict:
+        return {field: self._store.get(self._row, field) for field in FIELDS}
+
+    def __repr__(self) -> str:
+        return f"ContactView({self.to_dict()!r})"
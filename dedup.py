@@ -0,0 +1,232 @@
+"""重複聯絡人偵測
+
+同一個人可能以不同姓名（錯字、簡稱、英文名）存了好幾筆。兩兩比較所有聯絡人是 O(n²)，
+這裡先以分組鍵（blocking key）把可能重複的聯絡人分到同一組，只在組內兩兩比較：
+
+- 電話：正規化後的數字（0912-345-678 與 +886 912 345 678 相同）
+- 電子郵件帳號：@ 之前的部分，忽略大小寫、. 與 + 之後的標籤
+- 地址：正規化後到門牌「號」為止的部分（沒有門牌時取前幾個字）
+
+組內每一對依共用的欄位與姓名相似度計分，分數達門檻的聯絡人以 union-find 合併成群組。
+成員太多的組（例如公司總機、info@ 之類的共用帳號）不比較，以免退化成 O(n²)。
+"""
+import unicodedata
+from itertools import combinations
+from typing import List, Dict, Tuple, Iterable, Optional
+from phone_index import normalize_phone
+from search_index import edit_distance
+from address_facets import normalize_address
+
+# 各項證據的分數，總分上限為 1；分數達 DEFAULT_MIN_SCORE 的兩筆視為可能重複。
+# 單獨共用電話或電子郵件即達門檻；共用地址或電子郵件帳號時，姓名也要相近才會達到門檻
+PHONE_WEIGHT = 0.5
+EMAIL_WEIGHT = 0.5
+EMAIL_LOCAL_WEIGHT = 0.3
+ADDRESS_WEIGHT = 0.25
+NAME_WEIGHT = 0.4
+DEFAULT_MIN_SCORE = 0.5
+# 姓名相似度（1 - 編輯距離 / 較長的長度）低於此值時不計分，也不列為理由
+MIN_NAME_SIMILARITY = 0.5
+
+# 分組鍵的最短長度，太短的鍵（例如只有區碼）區別力不足
+MIN_PHONE_DIGITS = 6
+MIN_EMAIL_LOCAL_LENGTH = 3
+ADDRESS_PREFIX_LENGTH = 10
+# 成員超過此數的組不比較
+MAX_BLOCK_SIZE = 50
+
+
+def normalize_name(name: str) -> str:
+    return "".join(unicodedata.normalize("NFKC", name).lower().split())
+
+
+def email_local_part(email: str) -> str:
+    """電子郵件 @ 之前的帳號，去掉 . 與 + 之後的標籤（許多信箱視為同一個收件人）"""
+    local = email.strip().lower().partition("@")[0]
+    return local.partition("+")[0].replace(".", "")
+
+
+def address_key(address: str) -> str:
+    """地址到門牌「號」為止的部分，忽略空白、全半形與「臺/台」的差異；沒有門牌時取前幾個字"""
+    address = normalize_address(address)
+    end = address.find("號")
+    return address[:end + 1] if end >= 0 else address[:ADDRESS_PREFIX_LENGTH]
+
+
+def _bounded_distance(a: str, b: str, max_distance: int) -> int:
+    """編輯距離，超過 max_distance 時回傳 max_distance + 1
+
+    短姓名通常只容許一個字的差異，此時以線性時間判斷，不必填整張動態規劃表。
+    """
+    if a == b:
+        return 0
+    if max_distance > 1:
+        return edit_distance(a, b, max_distance)
+    if max_distance < 1 or abs(len(a) - len(b)) > 1:
+        return max_distance + 1
+    if len(a) == len(b):
+        # 長度相同時，距離為 1 只可能是替換一個字
+        return 1 if sum(x != y for x, y in zip(a, b)) == 1 else 2
+    if len(a) > len(b):
+        a, b = b, a
+    # b 比 a 多一個字：略過第一個不同的字後其餘必須相同
+    position = next((i for i, (x, y) in enumerate(zip(a, b)) if x != y), len(a))
+    return 1 if a[position:] == b[position + 1:] else 2
+
+
+class _Columns:
+    """所有聯絡人正規化後的欄位，依位置（新增順序）存成清單"""
+
+    def __init__(self, contacts: List):
+        self.names = [normalize_name(contact.name) for contact in contacts]
+        # 姓名中不同字元的集合，用來快速估計編輯距離的下限
+        self.chars = [frozenset(name) for name in self.names]
+        self.digits = [normalize_phone(contact.phone) for contact in contacts]
+        self.emails = [contact.email.strip().lower() for contact in contacts]
+        self.locals = [email_local_part(contact.email) for contact in contacts]
+        self.addresses = [address_key(contact.address) for contact in contacts]
+
+    def blocks(self, max_block_size: int) -> List[List[int]]:
+        """各分組鍵（電話、電子郵件帳號、地址）成員數在 2 到 max_block_size 之間的組"""
+        blocks = []
+        for values, min_length in ((self.digits, MIN_PHONE_DIGITS),
+                                   (self.locals, MIN_EMAIL_LOCAL_LENGTH),
+                                   (self.addresses, ADDRESS_PREFIX_LENGTH)):
+            # 大多數的鍵只有一位成員，只記錄第一位；出現第二位成員時才建立清單
+            first: Dict[str, int] = {}
+            groups: Dict[str, List[int]] = {}
+            for position, value in enumerate(values):
+                if len(value) < min_length:
+                    continue
+                owner = first.setdefault(value, position)
+                if owner == position:
+                    continue
+                group = groups.get(value)
+                if group is None:
+                    groups[value] = [owner, position]
+                elif len(group) <= max_block_size:
+                    # 超過上限後不必再收集，多收一位即可判斷過大
+                    group.append(position)
+            blocks.extend(group for group in groups.values() if len(group) <= max_block_size)
+        return blocks
+
+    def score(self, a: int, b: int, min_score: float = 0.0) -> Optional[Tuple[float, List[str]]]:
+        """第 a、b 位聯絡人的 (分數, 理由)；確定達不到 min_score 時提前結束並回傳 None
+
+        大部分同組的聯絡人只共用地址或電子郵件帳號，分數取決於姓名相似度。先換算出
+        姓名至少要多相似（可容許的編輯距離），再以長度差與共同字元數排除，
+        只有少數配對需要真正計算編輯距離。
+        """
+        score = 0.0
+        reasons = []
+        if self.digits[a] and self.digits[a] == self.digits[b]:
+            score += PHONE_WEIGHT
+            reasons.append("電話相同")
+        if self.emails[a] and self.emails[a] == self.emails[b]:
+            score += EMAIL_WEIGHT
+            reasons.append("電子郵件相同")
+        elif self.locals[a] and self.locals[a] == self.locals[b]:
+            score += EMAIL_LOCAL_WEIGHT
+            reasons.append("電子郵件帳號相同")
+        if self.addresses[a] and self.addresses[a] == self.addresses[b]:
+            score += ADDRESS_WEIGHT
+            reasons.append("地址相同")
+        needed = min_score - score
+        if needed > NAME_WEIGHT:
+            return None
+        similarity = self._name_similarity(a, b, max(needed / NAME_WEIGHT, MIN_NAME_SIMILARITY))
+        if similarity:
+            score += NAME_WEIGHT * similarity
+            reasons.append(f"姓名相似（{similarity:.0%}）")
+        if score < min_score:
+            return None
+        return min(score, 1.0), reasons
+
+    def _name_similarity(self, a: int, b: int, minimum: float) -> float:
+        """姓名相似度；確定低於 minimum 時回傳 0"""
+        name_a, name_b = self.names[a], self.names[b]
+        longest = max(len(name_a), len(name_b))
+        if not longest:
+            return 0.0
+        # 換算成可容許的編輯距離；容許誤差避免浮點數把剛好達到門檻的距離算成不合格
+        max_distance = int(longest * (1 - minimum) + 1e-9)
+        if abs(len(name_a) - len(name_b)) > max_distance:
+            return 0.0
+        # 編輯距離至少是較長的長度減去可對齊的相同字元數；
+        # 可對齊的字元數不超過共同字元的種類數加上 a 中重複出現的字數
+        chars_a = self.chars[a]
+        if longest - (len(chars_a & self.chars[b]) + len(name_a) - len(chars_a)) > max_distance:
+            return 0.0
+        distance = _bounded_distance(name_a, name_b, max_distance)
+        return 1 - distance / longest if distance <= max_distance else 0.0
+
+
+class DuplicateCluster:
+    """可能是同一人的一組聯絡人：姓名（依新增順序）、最高的配對分數與各配對的理由"""
+
+    def __init__(self, names: List[str], score: float, pairs: List[Tuple[str, str, float, List[str]]]):
+        self.names = names
+        self.score = score
+        self.pairs = pairs
+
+    def to_dict(self) -> Dict:
+        return {
+            "names": self.names,
+            "score": round(self.score, 3),
+            "pairs": [
+                {"names": [a, b], "score": round(score, 3), "reasons": reasons}
+                for a, b, score, reasons in self.pairs
+            ],
+        }
+
+
+def find_duplicates(contacts: Iterable, min_score: float = DEFAULT_MIN_SCORE,
+                    max_block_size: int = MAX_BLOCK_SIZE) -> List[DuplicateCluster]:
+    """找出可能重複的聯絡人群組，依分數由高到低排列（分數相同時依新增順序）
+
+    contacts 為具有 name、phone、email、address 屬性的物件，依新增順序排列。
+    """
+    contacts = list(contacts)
+    columns = _Columns(contacts)
+    parent: Dict[int, int] = {}
+
+    def find(position: int) -> int:
+        root = position
+        while parent.get(root, root) != root:
+            root = parent[root]
+        # 路徑壓縮
+        while position != root:
+            parent[position], position = root, parent.get(position, position)
+        return root
+
+    # 同一對可能共用好幾個分組鍵，重新計分的成本不高，只需避免重複記錄
+    matched = set()
+    matches: List[Tuple[int, int, float, List[str]]] = []
+    for members in columns.blocks(max_block_size):
+        for a, b in combinations(members, 2):
+            result = columns.score(a, b, min_score)
+            if result is None or (a, b) in matched:
+                continue
+            matched.add((a, b))
+            matches.append((a, b) + result)
+            root_a, root_b = find(a), find(b)
+            if root_a != root_b:
+                parent[max(root_a, root_b)] = min(root_a, root_b)
+
+    clusters: Dict[int, Tuple[set, list]] = {}
+    for a, b, score, reasons in matches:
+        members, pairs = clusters.setdefault(find(a), (set(), []))
+        members.update((a, b))
+        pairs.append((a, b, score, reasons))
+
+    result = []
+    for root in sorted(clusters):
+        members, pairs = clusters[root]
+        pairs.sort(key=lambda pair: (-pair[2], pair[0], pair[1]))
+        result.append(DuplicateCluster(
+            [contacts[position].name for position in sorted(members)],
+            pairs[0][2],
+            [(contacts[a].name, contacts[b].name, score, reasons) for a, b, score, reasons in pairs],
+        ))
+    result.sort(key=lambda cluster: -cluster.score)
+    return result
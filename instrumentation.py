@@ -0,0 +1,173 @@
+import atexit
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import List, Dict, Optional, Callable
+
+# 設定此環境變數時，程式結束前會把統計資料寫入該檔案
+STATS_FILE_ENV = "ADDRESSBOOK_STATS_FILE"
+
+
+class LatencyHistogram:
+    """以對數間隔分桶的耗時分佈，記錄一筆只需一次二分搜尋，記憶體固定"""
+
+    # 各桶的上界（毫秒），最後一桶收容所有更慢的紀錄
+    BOUNDS_MS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+    def __init__(self):
+        self.buckets: List[int] = [0] * (len(self.BOUNDS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.min_ms = float("inf")
+        self.max_ms = 0.0
+
+    def record(self, elapsed_ms: float):
+        self.buckets[bisect_left(self.BOUNDS_MS, elapsed_ms)] += 1
+        self.count += 1
+        self.total_ms += elapsed_ms
+        self.min_ms = min(self.min_ms, elapsed_ms)
+        self.max_ms = max(self.max_ms, elapsed_ms)
+
+    def percentile(self, fraction: float) -> float:
+        """以所在桶的上界估計百分位數（最慢一桶以最大值代替）"""
+        if not self.count:
+            return 0.0
+        target = fraction * self.count
+        seen = 0
+        for index, count in enumerate(self.buckets):
+            seen += count
+            if seen >= target:
+                bound = self.BOUNDS_MS[index] if index < len(self.BOUNDS_MS) else self.max_ms
+                return min(bound, self.max_ms)
+        return self.max_ms
+
+    def to_dict(self) -> Dict:
+        return {
+            "count": self.count,
+            "mean_ms": self.total_ms / self.count if self.count else 0.0,
+            "min_ms": self.min_ms if self.count else 0.0,
+            "p50_ms": self.percentile(0.5),
+            "p95_ms": self.percentile(0.95),
+            "p99_ms": self.percentile(0.99),
+            "max_ms": self.max_ms,
+            "buckets": {
+                (f"<={bound}" if index < len(self.BOUNDS_MS) else f">{self.BOUNDS_MS[-1]}"): count
+                for index, (bound, count) in enumerate(zip(self.BOUNDS_MS + (None,), self.buckets))
+                if count
+            },
+        }
+
+
+class Metrics:
+    """各項操作的耗時分佈與計數，可在背景執行緒中記錄
+
+    用法：
+        with metrics.timer("search"):
+            ...
+        metrics.count("rows_rendered")
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms: Dict[str, LatencyHistogram] = {}
+        self._counters: Dict[str, int] = {}
+        self.started = time.time()
+
+    @contextmanager
+    def timer(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def record(self, name: str, seconds: float):
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = LatencyHistogram()
+            histogram.record(seconds * 1000)
+
+    def count(self, name: str, amount: int = 1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+            self.started = time.time()
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {
+                "histograms": {name: histogram.to_dict() for name, histogram in sorted(self._histograms.items())},
+                "counters": dict(sorted(self._counters.items())),
+            }
+
+    def report(self) -> str:
+        """可讀的文字摘要，供統計面板與命令列顯示"""
+        snapshot = self.snapshot()
+        lines = [f"{'操作':<18}{'次數':>8}{'平均':>10}{'p50':>10}{'p95':>10}{'最大':>10}  (ms)"]
+        for name, stats in snapshot["histograms"].items():
+            lines.append(
+                f"{name:<18}{stats['count']:>8}{stats['mean_ms']:>10.2f}{stats['p50_ms']:>10.2f}"
+                f"{stats['p95_ms']:>10.2f}{stats['max_ms']:>10.2f}"
+            )
+        if snapshot["counters"]:
+            lines.append("")
+            for name, value in snapshot["counters"].items():
+                lines.append(f"{name:<18}{value:>8}")
+        return "\n".join(lines)
+
+    def dump(self, filename: str, extra: Optional[Dict] = None):
+        """寫出 JSON 統計檔，附上執行環境資訊，方便回報效能問題"""
+        import platform
+        from datetime import datetime, timezone
+
+        report = {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "uptime_s": time.time() - self.started,
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        }
+        report.update(extra or {})
+        report.update(self.snapshot())
+        with open(filename, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+# 預設的統計資料，AddressBook 與介面共用
+METRICS = Metrics()
+
+
+def timed(name: str) -> Callable:
+    """方法裝飾器：以 self.metrics 記錄方法的耗時"""
+    def decorator(method: Callable) -> Callable:
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with self.metrics.timer(name):
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def dump_on_exit(metrics: Metrics = METRICS):
+    """設定了 ADDRESSBOOK_STATS_FILE 時，程式結束前寫出統計檔"""
+    filename = os.environ.get(STATS_FILE_ENV)
+    if not filename:
+        return
+
+    def dump():
+        try:
+            metrics.dump(filename)
+        except OSError as e:
+            print(f"無法寫入統計檔 {filename}：{e}", file=sys.stderr)
+
+    atexit.register(dump)
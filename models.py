@@ -1,8 +1,19 @@
-import json
-import os
-from typing import List, Dict, Tuple
+import threading
+from typing import List, Dict, Tuple, Optional, Iterable, Iterator, Callable
+from storage import Storage, JsonStorage
+from search_index import NGramIndex, edit_distance
+from phone_index import PhoneIndex, is_phone_query, phone_matches
+from query_language import parse_query, AccessPath, Term, And, Or
+from contact_store import ContactStore
+from instrumentation import Metrics, METRICS, timed
+from snapshot_cache import SnapshotCache
+from dedup import find_duplicates, DuplicateCluster, DEFAULT_MIN_SCORE
+from address_facets import AddressFacets
 
 class Contact:
+    # 不建立實例 __dict__，大量聯絡人時可明顯節省記憶體
+    __slots__ = ("name", "phone", "email", "address")
+
     MAX_NAME_LENGTH = 10
     MAX_PHONE_LENGTH = 15
     MAX_EMAIL_LENGTH = 20
@@ -22,23 +33,363 @@ class Contact:
             "address": self.address
         }
 
+    def lowered(self, field: str) -> str:
+        """回傳小寫的欄位值（ContactView 會直接回傳預先計算好的值）"""
+        return getattr(self, field).lower()
+
 class AddressBook:
-    def __init__(self, filename: str = "contacts.json"):
-        self.filename = filename
-        self.contacts: List[Contact] = []
+    # 異動事件類型，訂閱者會收到 (事件, 姓名)；重新載入時姓名為 None
+    CONTACT_ADDED = "added"
+    CONTACT_UPDATED = "updated"
+    CONTACT_REMOVED = "removed"
+    CONTACTS_RELOADED = "reloaded"
+
+    # 搜尋類型對應的欄位
+    SEARCH_FIELDS = {
+        "姓名": ["name"],
+        "電話": ["phone"],
+        "電子郵件": ["email"],
+        "地址": ["address"],
+        "全欄位": ["name", "phone", "email", "address"],
+    }
+    # 容錯搜尋：依姓名的編輯距離排序，允許打錯、漏打或多打字
+    FUZZY_SEARCH_TYPE = "模糊姓名"
+    # 最大編輯距離的上限（實際上限另依查詢長度調整），以及最多回傳幾筆
+    FUZZY_MAX_DISTANCE = 2
+    FUZZY_LIMIT = 50
+    # 多欄位查詢語法（例如 name:張 address:台北 -email:example.com），語法見 query_language.py
+    QUERY_SEARCH_TYPE = "進階查詢"
+
+    def __init__(self, filename: str = "contacts.json", journal: bool = False, storage: Optional[Storage] = None,
+                 compact: bool = False, metrics: Optional[Metrics] = None, cache: bool = False,
+                 columnar: bool = False):
+        # 未指定後端時沿用 JSON 檔案（journal=True 時使用附加式日誌）
+        self.storage = storage if storage is not None else JsonStorage(filename, journal=journal)
+        self.filename = getattr(self.storage, "filename", filename)
+        # 載入、儲存、搜尋等操作的耗時統計（預設與介面共用 instrumentation.METRICS）
+        self.metrics = metrics or METRICS
+        # 以姓名為主鍵的索引（dict 保留插入順序，同時作為聯絡人列表）
+        self._contacts: Dict[str, Contact] = {}
+        # 每位聯絡人的新增序號，表格還原預設順序時使用，不必為此建立搜尋索引
+        self._order: Dict[str, int] = {}
+        self._next_order = 0
+        # 緊湊模式：聯絡人以欄式儲存在 ContactStore，_contacts 中放的是輕量的 ContactView
+        self._store = ContactStore() if compact else None
+        # 子字串搜尋用的 n-gram 反向索引，隨新增、更新、刪除同步維護；
+        # columnar=True 時改用 NumPy 欄式掃描（需要 NumPy），建立快、記憶體固定，適合百萬筆聯絡人
+        if columnar:
+            # 只在使用時才匯入，命令列啟動時不必載入 NumPy
+            from column_scan import ColumnScanner, PhoneColumn
+
+            self._index = ColumnScanner({
+                "name": Contact.MAX_NAME_LENGTH,
+                "phone": Contact.MAX_PHONE_LENGTH,
+                "email": Contact.MAX_EMAIL_LENGTH,
+                "address": Contact.MAX_ADDRESS_LENGTH,
+            })
+            self._phones = PhoneColumn(Contact.MAX_PHONE_LENGTH)
+        else:
+            self._index = NGramIndex(["name", "phone", "email", "address"])
+            # 純數字電話的排序索引，電話搜尋以前綴或後綴比對，不受 - 或空白等格式影響
+            self._phones = PhoneIndex()
+        # 索引在第一次需要時才建立：命令列只新增、刪除或掃描一次時不必付出建立成本
+        self._indexed = False
+        # 地址分類（縣市 → 鄉鎮市區 → 路段）的前綴樹，同樣在第一次使用時才建立，之後隨異動同步維護
+        self._facets = AddressFacets()
+        self._faceted = False
+        # 啟動快取（<資料檔>.cache）：關閉時寫入解析好的聯絡人與索引，下次啟動直接載入
+        self._cache = SnapshotCache(self.filename + ".cache") if cache else None
+        # 快取目前對應的資料檔指紋，以及快取中是否包含索引；兩者都沒變時關閉時不必重寫
+        self._cache_fingerprint: Optional[str] = None
+        self._cache_indexed = False
+        # 搜尋可能在背景執行緒進行，異動與搜尋索引時需持有此鎖
+        self._lock = threading.RLock()
+        self.storage.attach(self._lock, self.metrics)
+        # 資料版本，每次載入、新增、更新、刪除都會遞增，供搜尋快取判斷是否失效
+        self.version = 0
+        self._listeners: List[Callable[[str, Optional[str]], None]] = []
         self.load_contacts()
 
+    def subscribe(self, callback: Callable[[str, Optional[str]], None]):
+        """訂閱異動事件"""
+        self._listeners.append(callback)
+
+    def unsubscribe(self, callback: Callable[[str, Optional[str]], None]):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def _notify(self, event: str, name: Optional[str] = None):
+        # 在鎖外呼叫，訂閱者可以安全地讀取通訊錄
+        for callback in list(self._listeners):
+            callback(event, name)
+
+    def insertion_order(self, name: str) -> int:
+        """回傳聯絡人在預設（新增）順序中的相對位置，可用來還原排序；不存在時回傳 -1"""
+        return self._order.get(name, -1)
+
+    def _insert(self, contact: Contact):
+        """加入聯絡人並記錄新增序號（呼叫端需持有鎖）"""
+        self._contacts[contact.name] = contact
+        self._order[contact.name] = self._next_order
+        self._next_order += 1
+
+    def _ensure_index(self):
+        if not self._indexed:
+            self._build_index()
+
+    def build_index(self):
+        """預先建立搜尋索引（平常在第一次搜尋時才建立），已建立時不做任何事"""
+        self._ensure_index()
+
+    @timed("index_build")
+    def _build_index(self):
+        """依目前的聯絡人（新增順序）建立搜尋索引"""
+        with self._lock:
+            if self._indexed:
+                return
+            self._index.add_many((contact.name, contact.to_dict()) for contact in self._contacts.values())
+            self._phones.add_many((contact.name, contact.phone) for contact in self._contacts.values())
+            self._indexed = True
+
+    def _index_add(self, contacts: List[Contact]):
+        if self._indexed:
+            self._index.add_many((contact.name, contact.to_dict()) for contact in contacts)
+            self._phones.add_many((contact.name, contact.phone) for contact in contacts)
+        if self._faceted:
+            self._facets.add_many((contact.name, contact.address) for contact in contacts)
+
+    def _index_update(self, contact: Contact):
+        if self._indexed:
+            self._index.update(contact.name, contact.to_dict())
+            self._phones.update(contact.name, contact.phone)
+        if self._faceted:
+            self._facets.update(contact.name, contact.address)
+
+    def _index_remove(self, name: str):
+        if self._indexed:
+            self._index.remove(name)
+            self._phones.remove(name)
+        if self._faceted:
+            self._facets.remove(name)
+
+    @timed("facet_build")
+    def _build_facets(self):
+        """依目前的聯絡人（新增順序）建立地址分類"""
+        with self._lock:
+            if self._faceted:
+                return
+            self._facets.add_many((contact.name, contact.address) for contact in self._contacts.values())
+            self._faceted = True
+
+    @property
+    def contacts(self) -> List[Contact]:
+        """依新增順序回傳所有聯絡人"""
+        return list(self._contacts.values())
+
+    def get_contact(self, name: str) -> Optional[Contact]:
+        """以姓名查詢聯絡人，O(1)"""
+        return self._contacts.get(name)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._contacts
+
+    def __len__(self) -> int:
+        return len(self._contacts)
+
+    def iter_contacts(self, query: str = "", search_type: str = "全欄位",
+                      chunk_size: int = 1000, facet: Tuple[str, ...] = ()) -> Iterator[Contact]:
+        """逐批產生聯絡人（有 query 時只產生搜尋結果，有 facet 時只產生該地址分類的聯絡人），
+        供匯出等走訪整個通訊錄的操作使用
+
+        只先複製姓名清單，每批再於鎖內取出當下的資料，不會另外複製一份所有聯絡人；
+        走訪期間被刪除的聯絡人會略過，可以在背景執行緒中使用。
+        """
+        if query.strip():
+            # 索引已建立時直接查索引，否則掃描一次，免得只為了匯出而建立索引
+            if self._indexed:
+                contacts = self.search_contacts(query, search_type)
+            else:
+                contacts = self.scan_contacts(query, search_type)
+            names = [contact.name for contact in self.filter_facet(contacts, facet)]
+        elif facet:
+            names = [contact.name for contact in self.facet_contacts(facet)]
+        else:
+            with self._lock:
+                names = list(self._contacts)
+        for start in range(0, len(names), chunk_size):
+            with self._lock:
+                chunk = [self._contacts.get(name) for name in names[start:start + chunk_size]]
+                chunk = [contact for contact in chunk if contact is not None]
+                if self._store is not None:
+                    # ContactView 直接讀取 ContactStore 的列，離開鎖後可能被更新改寫或因刪除而清空，先複製
+                    chunk = [Contact(c.name, c.phone, c.email, c.address) for c in chunk]
+            yield from chunk
+
+    @timed("load")
     def load_contacts(self):
-        if os.path.exists(self.filename):
-            with open(self.filename, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                self.contacts = [Contact(**contact) for contact in data]
+        if self._cache is not None and self._load_cache():
+            self._notify(self.CONTACTS_RELOADED)
+            return
+        items = self.storage.load()
+        with self._lock:
+            self._contacts = {}
+            self._order = {}
+            self._index.clear()
+            self._phones.clear()
+            self._indexed = False
+            self._facets.clear()
+            self._faceted = False
+            if self._store is not None:
+                self._store = ContactStore()
+            for item in items:
+                contact = self._new_contact(**item)
+                self._insert(contact)
+            self.version += 1
+        self._notify(self.CONTACTS_RELOADED)
+
+    def _load_cache(self) -> bool:
+        """從啟動快取載入聯絡人與索引；快取不存在或已失效時回傳 False"""
+        fingerprint = self.storage.fingerprint()
+        if fingerprint is None:
+            return False
+        state = self._cache.load(fingerprint)
+        if state is None:
+            return False
+        with self._lock:
+            self._contacts = {}
+            self._order = {}
+            self._facets.clear()
+            self._faceted = False
+            if self._store is not None:
+                self._store = ContactStore()
+            for values in state["contacts"]:
+                contact = self._new_contact(*values)
+                self._insert(contact)
+            # 快取由另一種搜尋引擎建立時只使用聯絡人，索引在需要時重新建立
+            self._indexed = state["index"] is not None and state.get("engine") == type(self._index).__name__
+            if self._indexed:
+                self._index.set_state(state["index"])
+                self._phones.set_state(state["phones"])
+            else:
+                self._index.clear()
+                self._phones.clear()
+            self.version += 1
+        self._cache_fingerprint = fingerprint
+        self._cache_indexed = self._indexed
+        return True
+
+    @timed("cache_save")
+    def save_cache(self):
+        """將目前的聯絡人與已建立的索引寫入啟動快取
+
+        記憶體與資料檔不一致（例如其他程式修改了檔案）時不寫入；
+        內容與現有快取相同時也會略過。
+        """
+        if self._cache is None:
+            return
+        # 先在鎖外等待背景寫入完成，背景執行緒需要取得 self._lock
+        self.storage.flush()
+        with self._lock:
+            fingerprint = self.storage.fingerprint()
+            if fingerprint is None:
+                return
+            if fingerprint == self._cache_fingerprint and (self._cache_indexed or not self._indexed):
+                return
+            state = {
+                "contacts": [(c.name, c.phone, c.email, c.address) for c in self._contacts.values()],
+                "engine": type(self._index).__name__,
+                "index": self._index.get_state() if self._indexed else None,
+                "phones": self._phones.get_state() if self._indexed else None,
+            }
+            self._cache.save(fingerprint, state)
+        self._cache_fingerprint = fingerprint
+        self._cache_indexed = self._indexed
+
+    @timed("refresh")
+    def refresh(self) -> bool:
+        """資料檔被其他程式修改時，只合併有變動的聯絡人
 
+        與 load_contacts 不同，不會重建整個通訊錄與索引，而是逐筆比對後
+        發出新增、更新、刪除事件，表格只需更新受影響的列。回傳是否有變動。
+        """
+        if not self.storage.changed():
+            return False
+        items = self.storage.load()
+        events: List[Tuple[str, str]] = []
+        with self._lock:
+            seen = set()
+            for item in items:
+                name = item["name"]
+                seen.add(name)
+                contact = self._contacts.get(name)
+                if contact is None:
+                    contact = self._new_contact(**item)
+                    self._insert(contact)
+                    self._index_add([contact])
+                    events.append((self.CONTACT_ADDED, contact.name))
+                    continue
+                values = Contact(**item).to_dict()
+                if values != contact.to_dict():
+                    contact.phone = values["phone"]
+                    contact.email = values["email"]
+                    contact.address = values["address"]
+                    self._index_update(contact)
+                    events.append((self.CONTACT_UPDATED, name))
+            for name in [name for name in self._contacts if name not in seen]:
+                contact = self._contacts.pop(name)
+                del self._order[name]
+                if self._store is not None:
+                    self._store.release(contact.row)
+                self._index_remove(name)
+                events.append((self.CONTACT_REMOVED, name))
+            if events:
+                self._compact_store()
+                self.version += 1
+        for event, name in events:
+            self._notify(event, name)
+        return bool(events)
+
+    def _new_contact(self, name: str, phone: str, email: str, address: str) -> Contact:
+        if self._store is None:
+            return Contact(name, phone, email, address)
+        return self._store.append(
+            name[:Contact.MAX_NAME_LENGTH],
+            phone[:Contact.MAX_PHONE_LENGTH],
+            email[:Contact.MAX_EMAIL_LENGTH],
+            address[:Contact.MAX_ADDRESS_LENGTH]
+        )
+
+    def _compact_store(self):
+        """緊湊模式下更新與刪除會在緩衝區留下舊值，超過一半時回收（需持有鎖）"""
+        if self._store is not None and self._store.garbage > self._store.nbytes() // 2:
+            self._store.compact()
+
+    @timed("save")
     def save_contacts(self):
-        with open(self.filename, 'w', encoding='utf-8') as f:
-            json.dump([contact.to_dict() for contact in self.contacts], f, ensure_ascii=False, indent=2)
+        self.storage.save_all(self._contacts.values())
 
-    def add_contact(self, name: str, phone: str, email: str, address: str) -> Tuple[bool, str]:
+    def compact(self):
+        """將目前狀態寫成完整快照（日誌模式下會清空日誌）"""
+        self.save_contacts()
+
+    @timed("flush")
+    def flush(self):
+        """等待背景寫入完成"""
+        self.storage.flush()
+
+    def close(self):
+        """寫入所有尚未儲存的異動、更新啟動快取並關閉儲存後端"""
+        try:
+            self.save_cache()
+        finally:
+            self.storage.close()
+
+    def validate_contact(self, name: str, phone: str, email: str, address: str,
+                         pending: Optional[set] = None) -> Optional[str]:
+        """檢查新聯絡人的欄位，回傳錯誤訊息；沒有問題時回傳 None
+
+        pending 為同一批次中已通過檢查的姓名，用來偵測批次內的重複。
+        """
         # 檢查所有欄位是否為空
         empty_fields = []
         if not name or len(name.strip()) == 0:
@@ -51,72 +402,384 @@ class AddressBook:
             empty_fields.append("地址")
 
         if empty_fields:
-            return False, f"以下欄位為必填：{', '.join(empty_fields)}"
+            return f"以下欄位為必填：{', '.join(empty_fields)}"
 
-        if any(contact.name == name for contact in self.contacts):
-            return False, "已存在相同姓名的聯絡人！"
+        if name in self._contacts or (pending is not None and name in pending):
+            return "已存在相同姓名的聯絡人！"
 
         if len(name) > Contact.MAX_NAME_LENGTH:
-            return False, f"姓名長度不能超過{Contact.MAX_NAME_LENGTH}個字！"
+            return f"姓名長度不能超過{Contact.MAX_NAME_LENGTH}個字！"
         if len(phone) > Contact.MAX_PHONE_LENGTH:
-            return False, f"電話長度不能超過{Contact.MAX_PHONE_LENGTH}個字！"
+            return f"電話長度不能超過{Contact.MAX_PHONE_LENGTH}個字！"
         if len(email) > Contact.MAX_EMAIL_LENGTH:
-            return False, f"電子郵件長度不能超過{Contact.MAX_EMAIL_LENGTH}個字！"
+            return f"電子郵件長度不能超過{Contact.MAX_EMAIL_LENGTH}個字！"
         if len(address) > Contact.MAX_ADDRESS_LENGTH:
-            return False, f"地址長度不能超過{Contact.MAX_ADDRESS_LENGTH}個字！"
+            return f"地址長度不能超過{Contact.MAX_ADDRESS_LENGTH}個字！"
+        return None
 
-        contact = Contact(name, phone, email, address)
-        self.contacts.append(contact)
-        self.save_contacts()
+    def add_contact(self, name: str, phone: str, email: str, address: str) -> Tuple[bool, str]:
+        error = self.validate_contact(name, phone, email, address)
+        if error:
+            return False, error
+
+        with self._lock:
+            contact = self._new_contact(name, phone, email, address)
+            self._insert(contact)
+            self._index_add([contact])
+            self.version += 1
+            with self.metrics.timer("save"):
+                self.storage.put(contact, self._contacts.values())
+        self._notify(self.CONTACT_ADDED, contact.name)
         return True, "聯絡人新增成功！"
 
+    def bulk_add(self, rows: Iterable[Dict]) -> Tuple[int, List[Tuple[int, str]]]:
+        """一次新增多位聯絡人
+
+        每一列是含有 name、phone、email、address 的 dict。所有列先以與
+        add_contact 相同的規則檢查（包含批次內重複的姓名），通過的聯絡人
+        一次加入並只寫入儲存後端一次。
+        回傳 (成功筆數, [(列號, 錯誤訊息), ...])，列號從 1 開始。
+        """
+        accepted = []
+        errors: List[Tuple[int, str]] = []
+        pending = set()
+        for row_number, row in enumerate(rows, start=1):
+            values = [str(row.get(field) or "").strip() for field in ("name", "phone", "email", "address")]
+            error = self.validate_contact(*values, pending=pending)
+            if error:
+                errors.append((row_number, error))
+                continue
+            pending.add(values[0])
+            accepted.append(values)
+
+        if accepted:
+            with self._lock:
+                added = []
+                for values in accepted:
+                    contact = self._new_contact(*values)
+                    self._insert(contact)
+                    added.append(contact)
+                self._index_add(added)
+                self.version += 1
+                with self.metrics.timer("save"):
+                    self.storage.put_many(added, self._contacts.values())
+            for contact in added:
+                self._notify(self.CONTACT_ADDED, contact.name)
+        return len(accepted), errors
+
     def update_contact(self, name: str, phone: str = None, email: str = None, address: str = None) -> Tuple[bool, str]:
-        for contact in self.contacts:
-            if contact.name == name:
-                if phone is not None:
-                    contact.phone = phone[:Contact.MAX_PHONE_LENGTH]
-                if email is not None:
-                    contact.email = email[:Contact.MAX_EMAIL_LENGTH]
-                if address is not None:
-                    contact.address = address[:Contact.MAX_ADDRESS_LENGTH]
-                self.save_contacts()
-                return True, "聯絡人更新成功！"
-        return False, f"找不到名為 {name} 的聯絡人！"
+        contact = self._contacts.get(name)
+        if contact is None:
+            return False, f"找不到名為 {name} 的聯絡人！"
+
+        with self._lock:
+            if phone is not None:
+                contact.phone = phone[:Contact.MAX_PHONE_LENGTH]
+            if email is not None:
+                contact.email = email[:Contact.MAX_EMAIL_LENGTH]
+            if address is not None:
+                contact.address = address[:Contact.MAX_ADDRESS_LENGTH]
+            self._index_update(contact)
+            self.version += 1
+            self._compact_store()
+            with self.metrics.timer("save"):
+                self.storage.put(contact, self._contacts.values())
+        self._notify(self.CONTACT_UPDATED, name)
+        return True, "聯絡人更新成功！"
 
     def delete_contact(self, name: str) -> Tuple[bool, str]:
         # 確保name是字串類型
         name = str(name).strip()
-        # 使用列表推導式找出要刪除的聯絡人索引
-        indices = [i for i, contact in enumerate(self.contacts) if str(contact.name).strip() == name]
+        # 透過主鍵索引直接刪除
+        with self._lock:
+            contact = self._contacts.pop(name, None)
+            if contact is None:
+                return False, f"找不到名為 {name} 的聯絡人！"
+            del self._order[name]
+            if self._store is not None:
+                self._store.release(contact.row)
+                self._compact_store()
+            self._index_remove(name)
+            self.version += 1
+            with self.metrics.timer("save"):
+                self.storage.delete(name, self._contacts.values())
+        self._notify(self.CONTACT_REMOVED, name)
+        return True, "聯絡人刪除成功！"
+
+    @timed("dedup")
+    def find_duplicates(self, min_score: float = DEFAULT_MIN_SCORE) -> List[DuplicateCluster]:
+        """找出可能是同一人的聯絡人群組（共用電話、電子郵件、地址且姓名相近），依分數由高到低
+
+        以分組鍵限制比較範圍，不會兩兩比較所有聯絡人，詳見 dedup.py。
+        """
+        with self._lock:
+            return find_duplicates(self._contacts.values(), min_score)
 
-        if indices:
-            del self.contacts[indices[0]]
-            self.save_contacts()
-            return True, "聯絡人刪除成功！"
-        return False, f"找不到名為 {name} 的聯絡人！"
+    def merge_contacts(self, keep: str, others: Iterable[str], phone: str = None, email: str = None,
+                       address: str = None) -> Tuple[bool, str]:
+        """將重複的聯絡人合併到 keep：可一併更新 keep 的欄位，others 中的聯絡人則刪除"""
+        others = [name for name in dict.fromkeys(others) if name != keep]
+        with self._lock:
+            if keep not in self._contacts:
+                return False, f"找不到名為 {keep} 的聯絡人！"
+            missing = [name for name in others if name not in self._contacts]
+            if missing:
+                return False, f"找不到名為 {'、'.join(missing)} 的聯絡人！"
+            if not others:
+                return False, "沒有要合併的聯絡人！"
+        # 逐筆更新與刪除（各自發出異動事件，事件在鎖外發送）
+        if any(value is not None for value in (phone, email, address)):
+            success, message = self.update_contact(keep, phone, email, address)
+            if not success:
+                return False, message
+        for name in others:
+            self.delete_contact(name)
+        return True, f"已將 {len(others)} 位聯絡人合併到 {keep}！"
 
+    def address_facets(self, path: Tuple[str, ...] = ()) -> List[Tuple[str, int]]:
+        """地址分類 path 的下一層分類與人數，例如 () → [("台北市", 120), ...]、("台北市",) → [("大安區", 30), ...]
+
+        path 依序為縣市、鄉鎮市區、路段，分類方式見 address_facets.py。
+        """
+        if not self._faceted:
+            self._build_facets()
+        with self._lock:
+            return self._facets.children(path)
+
+    def facet_count(self, path: Tuple[str, ...] = ()) -> int:
+        """地址分類 path 中的聯絡人數，不需掃描聯絡人"""
+        if not self._faceted:
+            self._build_facets()
+        with self._lock:
+            return self._facets.count(path)
+
+    def facet_contacts(self, path: Tuple[str, ...] = ()) -> List[Contact]:
+        """地址分類 path 中的聯絡人，依新增順序"""
+        if not self._faceted:
+            self._build_facets()
+        with self._lock:
+            return [self._contacts[name] for name in self._facets.keys(path)]
+
+    def filter_facet(self, contacts: List[Contact], path: Tuple[str, ...]) -> List[Contact]:
+        """從 contacts（例如搜尋結果）中篩選出屬於地址分類 path 的聯絡人"""
+        if not path:
+            return contacts
+        if not self._faceted:
+            self._build_facets()
+        with self._lock:
+            return [contact for contact in contacts if self._facets.contains(contact.name, path)]
+
+    def fuzzy_max_distance(self, query: str) -> int:
+        """依查詢長度決定可容許的編輯距離：短的姓名只容許錯一個字，單一字元不容錯"""
+        return min(len(query) - 1, max(1, min(self.FUZZY_MAX_DISTANCE, len(query) // 3)))
+
+    def fuzzy_search(self, query: str, max_distance: Optional[int] = None,
+                     limit: Optional[int] = None) -> List[Contact]:
+        """容錯的姓名搜尋，依編輯距離由近到遠排序，距離相同時依新增順序
+
+        以搜尋索引（n-gram 或欄式掃描）篩選候選，只有少數姓名需要計算編輯距離。
+        max_distance 與 limit 未指定時使用 fuzzy_max_distance() 與 FUZZY_LIMIT。
+        """
+        query = query.strip()
+        if not query:
+            return []
+        if max_distance is None:
+            max_distance = self.fuzzy_max_distance(query)
+        if limit is None:
+            limit = self.FUZZY_LIMIT
+        self._ensure_index()
+        with self._lock:
+            matches = self._index.fuzzy_search(query, "name", max_distance)
+            return [self._contacts[name] for _, name in matches[:limit]]
+
+    def search_phone(self, query: str) -> List[Contact]:
+        """電話號碼以 query 的數字開頭或結尾的聯絡人，依新增順序排列
+
+        「0912」、「0912-345」與「+886 912」視為相同；末四碼等後綴也能查詢。
+        """
+        self._ensure_index()
+        with self._lock:
+            names = sorted(self._phones.lookup(query), key=self._index.doc_id)
+            return [self._contacts[name] for name in names]
+
+    def _access_path(self, node, use_index: bool) -> Optional[AccessPath]:
+        """單一條件（或 OR、AND 子樹）可使用的存取路徑；沒有可用的索引時回傳 None"""
+        if isinstance(node, Term):
+            if node.exact and node.field == "name":
+                # 姓名是主鍵，完全相同的查詢直接查 dict
+                found = [node.value] if node.value in self._contacts else []
+                return AccessPath("主鍵", node, len(found), True, lambda: found)
+            if not (use_index and self._indexed):
+                return None
+            if node.is_phone:
+                return AccessPath("電話索引", node, self._phones.count(node.value), True,
+                                  lambda: self._phones.lookup(node.value))
+            # 完全相同的條件以子字串搜尋取得候選，之後仍需逐筆確認
+            name = "欄式掃描" if type(self._index).__name__ == "ColumnScanner" else "n-gram 索引"
+            return AccessPath(name, node, self._index.estimate(node.value, node.fields), not node.exact,
+                              lambda: self._index.search(node.value, node.fields))
+        if isinstance(node, Or):
+            paths = [self._access_path(child, use_index) for child in node.children]
+            if any(path is None for path in paths):
+                return None
+            return AccessPath(
+                "聯集", node, min(sum(path.estimate for path in paths), len(self._contacts)),
+                all(path.exact for path in paths),
+                lambda: set().union(*(path.fetch() for path in paths)), paths
+            )
+        if isinstance(node, And):
+            path, _ = self._choose_path(node.children, use_index)
+            if path is not None:
+                # 只滿足其中一個條件，其餘條件仍需逐筆確認
+                return AccessPath(path.name, path.condition, path.estimate, False, path.fetch, path.children)
+        return None
+
+    def _choose_path(self, conditions: List, use_index: bool) -> Tuple[Optional[AccessPath], List]:
+        """從 AND 的各條件中挑出估計筆數最少的存取路徑，回傳 (路徑, 剩餘條件)"""
+        best, driver = None, None
+        for condition in conditions:
+            path = self._access_path(condition, use_index)
+            if path is not None and (best is None or path.estimate < best.estimate):
+                best, driver = path, condition
+        if best is None:
+            return None, list(conditions)
+        return best, [condition for condition in conditions if condition is not driver or not best.exact]
+
+    def _plan(self, text: str, use_index: bool) -> Tuple:
+        """解析查詢並挑選存取路徑，回傳 (條件樹, 路徑或 None 表示全表掃描, 剩餘條件)"""
+        node = parse_query(text)
+        if use_index:
+            self._ensure_index()
+        conditions = node.children if isinstance(node, And) else [node]
+        path, residual = self._choose_path(conditions, use_index)
+        return node, path, residual
+
+    @timed("query")
+    def query(self, text: str, use_index: bool = True) -> List[Contact]:
+        """以查詢語法搜尋（例如 name:張 address:台北 -email:example.com），依新增順序回傳
+
+        先以估計筆數最少的存取路徑（主鍵、電話索引、n-gram 索引）取得候選，
+        再以其餘條件逐筆篩選；沒有可用的路徑時掃描所有聯絡人。
+        use_index 為 False 時不建立索引（只查詢一次時較快）。語法錯誤時引發 ValueError。
+        """
+        with self._lock:
+            _, path, residual = self._plan(text, use_index)
+            if path is None:
+                candidates = self._contacts.values()
+            else:
+                names = path.fetch()
+                if self._indexed:
+                    candidates = [self._contacts[name] for name in sorted(names, key=self._index.doc_id)]
+                else:
+                    # 沒有索引時只會有主鍵路徑，依 dict 的順序排列
+                    names = set(names)
+                    candidates = [contact for name, contact in self._contacts.items() if name in names] \
+                        if len(names) > 1 else [self._contacts[name] for name in names]
+            return [contact for contact in candidates if all(condition.matches(contact) for condition in residual)]
+
+    def explain(self, text: str, use_index: bool = True) -> str:
+        """說明 query() 會如何執行這個查詢：解析結果、選擇的存取路徑與需要逐筆檢查的條件"""
+        with self._lock:
+            node, path, residual = self._plan(text, use_index)
+            conditions = node.children if isinstance(node, And) else [node]
+            lines = [f"查詢：{node}"]
+            if path is None:
+                lines.append(f"存取路徑：全表掃描（{len(self._contacts)} 筆）")
+            else:
+                lines.append("存取路徑：")
+                lines.extend(path.describe("  "))
+                others = [self._access_path(condition, use_index) for condition in conditions]
+                others = [other for other in others if other is not None and other.condition is not path.condition]
+                if others:
+                    lines.append("未採用的路徑：")
+                    for other in others:
+                        lines.extend(other.describe("  "))
+            if residual:
+                lines.append("逐筆篩選：" + "、".join(str(condition) for condition in residual))
+            return "\n".join(lines)
+
+    def is_refinable(self, search_type: str, query: str) -> bool:
+        """查詢加長時結果是否只會縮小，可以從較短查詢的結果中篩選
+
+        模糊搜尋與電話號碼的前後綴比對不符合這個性質（例如後綴「5678」
+        符合的號碼不一定以「567」結尾）；查詢語法可能包含 OR 與 NOT，也不符合。
+        """
+        if search_type in (self.FUZZY_SEARCH_TYPE, self.QUERY_SEARCH_TYPE):
+            return False
+        return not (search_type == "電話" and is_phone_query(query))
+
+    @timed("search")
     def search_contacts(self, query: str, search_type: str) -> List[Contact]:
         if not query:
             return []
+        if search_type == self.FUZZY_SEARCH_TYPE:
+            return self.fuzzy_search(query)
+        if search_type == self.QUERY_SEARCH_TYPE:
+            try:
+                return self.query(query)
+            except ValueError:
+                # 輸入到一半的查詢（例如引號還沒輸入完）視為沒有結果
+                return []
+        if search_type == "電話" and is_phone_query(query):
+            return self.search_phone(query)
+
+        # 透過搜尋索引（n-gram 反向索引或欄式掃描）取得符合的姓名
+        fields = self.SEARCH_FIELDS.get(search_type)
+        if fields is None:
+            return []
+        if self.storage.search_pushdown:
+            return self._storage_search(query, search_type)
+        self._ensure_index()
+        with self._lock:
+            return [self._contacts[name] for name in self._index.search(query, fields)]
 
+    def _storage_search(self, query: str, search_type: str) -> List[Contact]:
+        """由後端搜尋（SQLite 的 SQL 查詢或分片儲存的平行掃描），結果已依新增順序排列"""
+        with self._lock:
+            names = self.storage.search(query, search_type)
+            contacts = [self._contacts.get(name) for name in names]
+            return [contact for contact in contacts if contact is not None]
+
+    @timed("scan")
+    def scan_contacts(self, query: str, search_type: str) -> List[Contact]:
+        """不使用索引逐一比對所有聯絡人，結果與 search_contacts 相同
+
+        只查詢一次時（例如命令列），掃描一次比先建立索引快得多。
+        查詢語法有錯誤時引發 ValueError。
+        """
+        if search_type == self.QUERY_SEARCH_TYPE:
+            return self.query(query, use_index=False)
+        if self.storage.search_pushdown and search_type in self.SEARCH_FIELDS and query \
+                and not (search_type == "電話" and is_phone_query(query)):
+            return self._storage_search(query, search_type)
+        contacts = self.filter_contacts(self.contacts, query, search_type)
+        if search_type == self.FUZZY_SEARCH_TYPE:
+            # 與 fuzzy_search 相同：依距離排序（穩定排序保留新增順序）並限制筆數
+            query = query.strip().lower()
+            contacts.sort(key=lambda contact: edit_distance(query, contact.lowered("name")))
+            contacts = contacts[:self.FUZZY_LIMIT]
+        return contacts
+
+    def filter_contacts(self, contacts: List[Contact], query: str, search_type: str) -> List[Contact]:
+        """從給定的聯絡人中篩選出符合條件者（用於在既有結果上縮小範圍）"""
+        if search_type == self.FUZZY_SEARCH_TYPE and query.strip():
+            query = query.strip().lower()
+            max_distance = self.fuzzy_max_distance(query)
+            return [contact for contact in contacts
+                    if edit_distance(query, contact.lowered("name"), max_distance) <= max_distance]
+        if search_type == self.QUERY_SEARCH_TYPE:
+            try:
+                node = parse_query(query)
+            except ValueError:
+                return []
+            return [contact for contact in contacts if node.matches(contact)]
+        if search_type == "電話" and is_phone_query(query):
+            return [contact for contact in contacts if phone_matches(contact.phone, query)]
+        fields = self.SEARCH_FIELDS.get(search_type)
+        if not query or fields is None:
+            return []
         query = query.lower()
-        found_contacts = []
-
-        for contact in self.contacts:
-            if search_type == "姓名" and query in contact.name.lower():
-                found_contacts.append(contact)
-            elif search_type == "電話" and query in contact.phone.lower():
-                found_contacts.append(contact)
-            elif search_type == "電子郵件" and query in contact.email.lower():
-                found_contacts.append(contact)
-            elif search_type == "地址" and query in contact.address.lower():
-                found_contacts.append(contact)
-            elif search_type == "全欄位" and (
-                query in contact.name.lower() or
-                query in contact.phone.lower() or
-                query in contact.email.lower() or
-                query in contact.address.lower()
-            ):
-                found_contacts.append(contact)
-
-        return found_contacts
\ No newline at end of file
+        return [
+            contact for contact in contacts
+            if any(query in contact.lowered(field) for field in fields)
+        ]
@@ -0,0 +1,143 @@
+import unicodedata
+from bisect import bisect_left, insort
+from typing import List, Dict, Tuple, Set, Iterable
+
+# 電話號碼中可忽略的分隔符號，查詢只由數字與這些符號組成時視為號碼查詢
+PHONE_SEPARATORS = set(" -()+.#/")
+
+
+# 刪除所有非數字 ASCII 字元的轉換表（str.translate 用）
+_ASCII_NON_DIGITS = {code: None for code in range(128) if not 48 <= code <= 57}
+
+
+def normalize_phone(phone: str) -> str:
+    """只保留數字（全形數字一併轉換），+886 開頭的國際格式轉成 0 開頭"""
+    if phone.isascii():
+        # 絕大多數號碼只有 ASCII，NFKC 不會改變內容，以 translate 一次刪除非數字
+        phone = phone.strip()
+        digits = phone.translate(_ASCII_NON_DIGITS)
+    else:
+        phone = unicodedata.normalize("NFKC", phone).strip()
+        digits = "".join(char for char in phone if "0" <= char <= "9")
+    if phone.startswith("+886") and digits.startswith("886"):
+        digits = "0" + digits[3:]
+    return digits
+
+
+def is_phone_query(query: str) -> bool:
+    """查詢是否為電話號碼（至少一個數字，其餘只有分隔符號）"""
+    query = unicodedata.normalize("NFKC", query)
+    return any("0" <= char <= "9" for char in query) and all(
+        "0" <= char <= "9" or char in PHONE_SEPARATORS for char in query
+    )
+
+
+def phone_matches(phone: str, query: str) -> bool:
+    """單一電話是否以 query 的數字開頭或結尾（與 PhoneIndex.lookup 的條件相同）"""
+    digits, query = normalize_phone(phone), normalize_phone(query)
+    return bool(query) and (digits.startswith(query) or digits.endswith(query))
+
+
+class PhoneIndex:
+    """以正規化後的純數字電話建立的排序陣列，支援前綴與後綴查詢
+
+    正向陣列依號碼排序，前綴相同的號碼會排在一起，以二分搜尋找出範圍；
+    反向陣列存放倒轉後的號碼，後綴查詢（例如末四碼）也就變成前綴查詢。
+    兩者查詢皆為 O(log n + 符合筆數)，與電話原本用什麼格式輸入無關。
+    """
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self._forward: List[Tuple[str, str]] = []
+        self._backward: List[Tuple[str, str]] = []
+        self._digits: Dict[str, str] = {}
+
+    def __len__(self) -> int:
+        return len(self._digits)
+
+    def get_state(self) -> tuple:
+        """回傳只由內建型別組成的索引內容，可用 marshal 儲存"""
+        return self._forward, self._backward, self._digits
+
+    def set_state(self, state: tuple):
+        self._forward, self._backward, self._digits = state
+
+    def add(self, key: str, phone: str):
+        """加入或更新一筆電話；沒有任何數字的電話不建立索引"""
+        self.remove(key)
+        digits = normalize_phone(phone)
+        if not digits:
+            return
+        self._digits[key] = digits
+        insort(self._forward, (digits, key))
+        insort(self._backward, (digits[::-1], key))
+
+    def add_many(self, items: Iterable[Tuple[str, str]]):
+        """一次加入多筆 (key, 電話)，筆數多時最後才排序，避免逐筆插入時反覆搬移陣列"""
+        # 同一個 key 出現多次時以最後一筆為準
+        items = dict(items)
+        if len(items) * 8 < len(self._digits):
+            for key, phone in items.items():
+                self.add(key, phone)
+            return
+        # 陣列在附加期間不再有序，無法以二分搜尋移除，先一次濾掉要更新的舊紀錄
+        stale = {key for key in items if self._digits.pop(key, None) is not None}
+        if stale:
+            self._forward = [entry for entry in self._forward if entry[1] not in stale]
+            self._backward = [entry for entry in self._backward if entry[1] not in stale]
+        for key, phone in items.items():
+            digits = normalize_phone(phone)
+            if not digits:
+                continue
+            self._digits[key] = digits
+            self._forward.append((digits, key))
+            self._backward.append((digits[::-1], key))
+        self._forward.sort()
+        self._backward.sort()
+
+    def update(self, key: str, phone: str):
+        if self._digits.get(key) != normalize_phone(phone):
+            self.add(key, phone)
+
+    def remove(self, key: str):
+        digits = self._digits.pop(key, None)
+        if digits is None:
+            return
+        for entries, value in ((self._forward, digits), (self._backward, digits[::-1])):
+            del entries[bisect_left(entries, (value, key))]
+
+    @staticmethod
+    def _bounds(entries: List[Tuple[str, str]], prefix: str) -> Tuple[int, int]:
+        # 號碼只含數字，":" 的字元碼緊接在 "9" 之後，可作為前綴範圍的上界
+        start = bisect_left(entries, (prefix,))
+        return start, bisect_left(entries, (prefix + ":",), start)
+
+    def _range(self, entries: List[Tuple[str, str]], prefix: str) -> List[str]:
+        start, end = self._bounds(entries, prefix)
+        return [key for _, key in entries[start:end]]
+
+    def count(self, query: str) -> int:
+        """lookup(query) 筆數的上限（前綴與後綴筆數相加），只需二分搜尋，不建立結果"""
+        digits = normalize_phone(query)
+        if not digits:
+            return 0
+        start, end = self._bounds(self._forward, digits)
+        count = end - start
+        start, end = self._bounds(self._backward, digits[::-1])
+        return count + end - start
+
+    def prefix(self, query: str) -> List[str]:
+        """號碼以 query 開頭的 key"""
+        digits = normalize_phone(query)
+        return self._range(self._forward, digits) if digits else []
+
+    def suffix(self, query: str) -> List[str]:
+        """號碼以 query 結尾的 key"""
+        digits = normalize_phone(query)
+        return self._range(self._backward, digits[::-1]) if digits else []
+
+    def lookup(self, query: str) -> Set[str]:
+        """號碼以 query 開頭或結尾的 key"""
+        return set(self.prefix(query)) | set(self.suffix(query))
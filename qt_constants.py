@@ -12,6 +12,19 @@ COLORS = {
     'border': '#2A475E',      # 邊框顏色
 }
 
+# 即時搜尋：停止輸入多久（毫秒）後才開始搜尋，以及每批回傳給表格的筆數
+SEARCH_DEBOUNCE_MS = 150
+SEARCH_CHUNK_SIZE = 500
+
+# 檢查資料檔是否被其他程式修改的間隔（毫秒）
+FILE_POLL_INTERVAL_MS = 2000
+
+# 效能統計面板顯示時的更新間隔（毫秒）
+STATS_REFRESH_MS = 1000
+
+# 聯絡人異動後，地址分類面板延遲多久（毫秒）重新整理
+FACET_REFRESH_MS = 500
+
 # 樣式表
 STYLESHEET = """
 QMainWindow {
@@ -36,7 +49,7 @@ QPushButton:hover {
     background-color: """ + COLORS['accent'] + """;
 }
 
-QTableWidget {
+QTableView {
     background-color: """ + COLORS['bg_dark'] + """;
     color: """ + COLORS['text'] + """;
     gridline-color: """ + COLORS['bg_medium'] + """;
@@ -45,12 +58,12 @@ QTableWidget {
     selection-color: """ + COLORS['text'] + """;
 }
 
-QTableWidget::item {
+QTableView::item {
     padding: 5px;
     border: none;
 }
 
-QTableWidget::item:selected {
+QTableView::item:selected {
     background-color: """ + COLORS['bg_dark'] + """;
     color: """ + COLORS['text'] + """;
 }
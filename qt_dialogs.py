@@ -1,5 +1,5 @@
 from PyQt6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel,
-                           QLineEdit, QPushButton, QMessageBox)
+                           QLineEdit, QPushButton, QMessageBox, QTreeWidget, QTreeWidgetItem)
 from qt_constants import COLORS
 
 class ContactDialog(QDialog):
@@ -139,4 +139,113 @@ class ContactDialog(QDialog):
 
     def accept(self):
         if self.validate_inputs():
-            super().accept()
\ No newline at end of file
+            super().accept()
+
+
+class DuplicatesDialog(QDialog):
+    """列出可能重複的聯絡人群組，選擇要保留的聯絡人後合併該群組"""
+
+    def __init__(self, address_book, clusters, parent=None):
+        super().__init__(parent)
+        self.address_book = address_book
+        self.clusters = clusters
+        self.init_ui()
+
+    def init_ui(self):
+        self.setWindowTitle("重複聯絡人")
+        self.resize(800, 500)
+        self.setStyleSheet(f"""
+            QDialog {{
+                background-color: {COLORS['bg_dark']};
+            }}
+            QLabel {{
+                color: {COLORS['text']};
+            }}
+            QTreeWidget {{
+                background-color: {COLORS['bg_medium']};
+                color: {COLORS['text']};
+                border: none;
+                border-radius: 5px;
+            }}
+            QHeaderView::section {{
+                background-color: {COLORS['bg_light']};
+                color: {COLORS['text']};
+                border: none;
+                padding: 5px;
+            }}
+            QPushButton {{
+                background-color: {COLORS['bg_light']};
+                color: {COLORS['text']};
+                border: none;
+                border-radius: 5px;
+                padding: 8px 15px;
+                margin: 5px;
+            }}
+            QPushButton:hover {{
+                background-color: {COLORS['accent']};
+            }}
+        """)
+
+        layout = QVBoxLayout(self)
+        layout.setSpacing(10)
+        layout.setContentsMargins(20, 20, 20, 20)
+
+        self.summary_label = QLabel()
+        layout.addWidget(self.summary_label)
+
+        # 每個群組一個項目（分數與理由），展開後是群組中的聯絡人
+        self.tree = QTreeWidget()
+        self.tree.setHeaderLabels(["姓名", "電話", "電子郵件", "地址"])
+        self.tree.setColumnWidth(0, 220)
+        for cluster in self.clusters:
+            _, _, _, reasons = cluster.pairs[0]
+            group = QTreeWidgetItem([f"{cluster.score:.2f}  {'、'.join(reasons)}"])
+            group.setFirstColumnSpanned(True)
+            for name in cluster.names:
+                contact = self.address_book.get_contact(name)
+                if contact is not None:
+                    group.addChild(QTreeWidgetItem([contact.name, contact.phone, contact.email, contact.address]))
+            self.tree.addTopLevelItem(group)
+            group.setExpanded(True)
+        layout.addWidget(self.tree)
+        self.update_summary()
+
+        # 按鈕
+        button_layout = QHBoxLayout()
+        merge_button = QPushButton("保留所選聯絡人並合併群組")
+        merge_button.clicked.connect(self.merge_selected)
+        close_button = QPushButton("關閉")
+        close_button.clicked.connect(self.accept)
+
+        button_layout.addWidget(merge_button)
+        button_layout.addWidget(close_button)
+        layout.addLayout(button_layout)
+
+    def update_summary(self):
+        self.summary_label.setText(f"找到 {self.tree.topLevelItemCount()} 組可能重複的聯絡人，"
+                                   f"選擇要保留的聯絡人後按「合併」，群組中的其他聯絡人會被刪除")
+
+    def merge_selected(self):
+        item = self.tree.currentItem()
+        if item is None or item.parent() is None:
+            QMessageBox.warning(self, "警告", "請先在群組中選擇要保留的聯絡人！")
+            return
+        group = item.parent()
+        keep = item.text(0)
+        others = [group.child(i).text(0) for i in range(group.childCount()) if group.child(i) is not item]
+
+        reply = QMessageBox.question(
+            self,
+            "確認合併",
+            f"確定要保留 {keep} 並刪除 {'、'.join(others)} 嗎？",
+            QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
+        )
+        if reply != QMessageBox.StandardButton.Yes:
+            return
+
+        success, message = self.address_book.merge_contacts(keep, others)
+        if not success:
+            QMessageBox.warning(self, "錯誤", message)
+            return
+        self.tree.takeTopLevelItem(self.tree.indexOfTopLevelItem(group))
+        self.update_summary()
@@ -0,0 +1,62 @@
+import threading
+from typing import Iterable, Iterator, Optional
+from PyQt6.QtCore import QObject, QRunnable, pyqtSignal
+from contact_io import write_contacts, EXPORT_CHUNK_SIZE
+
+# 存檔對話框的篩選器與對應的匯出格式（檔名沒有副檔名時使用）
+EXPORT_FILTERS = {
+    "CSV (*.csv)": "csv",
+    "vCard (*.vcf)": "vcard",
+    "JSON (*.json)": "json",
+    "JSON Lines (*.jsonl)": "jsonl",
+}
+
+
+class ExportCancelled(Exception):
+    """使用者取消匯出"""
+
+
+class ExportSignals(QObject):
+    """背景匯出工作回報進度用的訊號（QRunnable 本身不能發送訊號）"""
+    progress = pyqtSignal(int)          # 已寫出的筆數
+    finished = pyqtSignal(bool, str)    # 是否成功, 結果訊息
+
+
+class ExportTask(QRunnable):
+    """在執行緒池中逐批寫出聯絡人，介面不會因為匯出大量資料而停止回應
+
+    contacts 應為產生器（例如 AddressBook.iter_contacts()），搜尋與讀取都在背景執行緒進行。
+    取消時寫到一半的暫存檔會被刪除，目標檔保持原樣。
+    """
+
+    def __init__(self, contacts: Iterable, filename: str, fmt: Optional[str] = None):
+        super().__init__()
+        self.contacts = contacts
+        self.filename = filename
+        self.fmt = fmt
+        self.signals = ExportSignals()
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def _watch(self) -> Iterator:
+        """逐筆轉交聯絡人，每批回報一次進度並檢查是否已取消"""
+        count = 0
+        for contact in self.contacts:
+            if self._cancelled.is_set():
+                raise ExportCancelled()
+            yield contact
+            count += 1
+            if count % EXPORT_CHUNK_SIZE == 0:
+                self.signals.progress.emit(count)
+
+    def run(self):
+        try:
+            count = write_contacts(self._watch(), self.filename, self.fmt)
+        except ExportCancelled:
+            self.signals.finished.emit(False, "已取消匯出")
+        except (OSError, ValueError) as e:
+            self.signals.finished.emit(False, f"匯出失敗：{e}")
+        else:
+            self.signals.finished.emit(True, f"已匯出 {count} 位聯絡人到 {self.filename}")
@@ -0,0 +1,116 @@
+from typing import Tuple
+from PyQt6.QtWidgets import QDockWidget, QTreeWidget, QTreeWidgetItem
+from PyQt6.QtCore import Qt, QTimer, pyqtSignal
+from qt_constants import FACET_REFRESH_MS
+from models import AddressBook
+
+
+class FacetDock(QDockWidget):
+    """地址分類面板：縣市 → 鄉鎮市區 → 路段，每個分類顯示人數，點選後只顯示該分類的聯絡人
+
+    下一層在展開時才建立，聯絡人異動後延遲一段時間重新整理；面板隱藏時不更新。
+    """
+
+    # 選取的分類路徑，() 表示全部
+    facet_selected = pyqtSignal(tuple)
+
+    def __init__(self, address_book: AddressBook, parent=None):
+        super().__init__("地址分類", parent)
+        self.address_book = address_book
+        self.setObjectName("facet_dock")
+        self.setAllowedAreas(Qt.DockWidgetArea.LeftDockWidgetArea | Qt.DockWidgetArea.RightDockWidgetArea)
+
+        self.tree = QTreeWidget()
+        self.tree.setHeaderHidden(True)
+        self.tree.itemExpanded.connect(self.populate)
+        self.tree.currentItemChanged.connect(self.on_current_changed)
+        self.setWidget(self.tree)
+
+        # 大量異動（例如匯入）只重新整理一次
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(FACET_REFRESH_MS)
+        self.timer.timeout.connect(self.rebuild)
+        self._dirty = True
+        self.address_book.subscribe(self.on_contacts_changed)
+        self.visibilityChanged.connect(self.on_visibility_changed)
+
+    def on_visibility_changed(self, visible: bool):
+        if visible:
+            if self._dirty:
+                self.rebuild()
+        else:
+            # 面板隱藏後看不到篩選條件，改回顯示全部
+            self.clear_selection()
+
+    def on_contacts_changed(self, event, name):
+        self._dirty = True
+        if self.isVisible():
+            self.timer.start()
+
+    @staticmethod
+    def path_of(item: QTreeWidgetItem) -> Tuple[str, ...]:
+        return item.data(0, Qt.ItemDataRole.UserRole)
+
+    def _add_item(self, parent, path: Tuple[str, ...], label: str, count: int) -> QTreeWidgetItem:
+        item = QTreeWidgetItem(parent, [f"{label}（{count}）"])
+        item.setData(0, Qt.ItemDataRole.UserRole, path)
+        if len(path) < 3:
+            # 先顯示展開箭頭，展開時才建立下一層（沒有下一層時箭頭會消失）
+            item.setChildIndicatorPolicy(QTreeWidgetItem.ChildIndicatorPolicy.ShowIndicator)
+        return item
+
+    def populate(self, item: QTreeWidgetItem):
+        """建立 item 的下一層分類（已建立過則略過）"""
+        if item.childCount():
+            return
+        path = self.path_of(item)
+        for part, count in self.address_book.address_facets(path):
+            self._add_item(item, path + (part,), part, count)
+        item.setChildIndicatorPolicy(QTreeWidgetItem.ChildIndicatorPolicy.DontShowIndicatorWhenChildless)
+
+    def rebuild(self):
+        """依目前的聯絡人重建分類樹，保留展開的分類與選取"""
+        self._dirty = False
+        expanded = set()
+        selected = ()
+        if self.tree.topLevelItemCount():
+            stack = [self.tree.topLevelItem(0)]
+            while stack:
+                item = stack.pop()
+                if item.isExpanded():
+                    expanded.add(self.path_of(item))
+                    stack.extend(item.child(i) for i in range(item.childCount()))
+            if self.tree.currentItem() is not None:
+                selected = self.path_of(self.tree.currentItem())
+
+        self.tree.blockSignals(True)
+        self.tree.clear()
+        root = self._add_item(self.tree, (), "全部", self.address_book.facet_count())
+        # 選取的分類所在的上層即使已收合，也要建立才能找回選取
+        needed = expanded | {selected[:depth] for depth in range(len(selected))}
+        current = root
+        stack = [root]
+        while stack:
+            item = stack.pop()
+            path = self.path_of(item)
+            if path == selected:
+                current = item
+            if not path or path in needed:
+                self.populate(item)
+                item.setExpanded(not path or path in expanded)
+                stack.extend(item.child(i) for i in range(item.childCount()))
+        self.tree.setCurrentItem(current)
+        self.tree.blockSignals(False)
+        if self.path_of(current) != selected:
+            # 選取的分類已沒有聯絡人，改為顯示全部
+            self.facet_selected.emit(())
+
+    def on_current_changed(self, current, previous):
+        if current is not None:
+            self.facet_selected.emit(self.path_of(current))
+
+    def clear_selection(self):
+        """回到「全部」"""
+        if self.tree.topLevelItemCount():
+            self.tree.setCurrentItem(self.tree.topLevelItem(0))
@@ -1,16 +1,55 @@
+import os
 from PyQt6.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
-                           QPushButton, QTableWidget, QLineEdit, QComboBox,
-                           QLabel, QTableWidgetItem, QMenu, QMessageBox)
-from PyQt6.QtGui import QColor
-from PyQt6.QtCore import Qt, pyqtSlot
-from qt_constants import STYLESHEET, COLORS
-from qt_dialogs import ContactDialog
+                           QPushButton, QTableView, QLineEdit, QComboBox,
+                           QLabel, QMenu, QMessageBox, QAbstractItemView,
+                           QFileDialog, QProgressDialog, QApplication)
+from PyQt6.QtCore import Qt, pyqtSlot, QTimer, QThreadPool
+from qt_constants import STYLESHEET, COLORS, FILE_POLL_INTERVAL_MS
+from qt_dialogs import ContactDialog, DuplicatesDialog
+from qt_models import ContactTableModel
+from qt_search import SearchController
+from qt_stats import StatsDock
+from qt_facets import FacetDock
+from qt_export import ExportTask, EXPORT_FILTERS
+from contact_io import FORMAT_EXTENSIONS
 from models import AddressBook, Contact
+from storage import create_storage
+from column_scan import columnar_requested
+
+# 進階查詢的語法說明（搜尋框的提示）
+QUERY_SYNTAX_HELP = (
+    "以空白分隔的條件須同時符合，OR 表示任一符合，NOT 或 - 表示排除，可用括號分組\n"
+    "欄位：name/姓名、phone/電話、email/電子郵件、address/地址（省略時比對所有欄位）\n"
+    "欄位:值 為包含，欄位:=值 為完全相同，含空白的值以雙引號包住\n"
+    "例如：(name:陳 OR name:林) address:台北 -email:example.com"
+)
 
 class AddressBookQt(QMainWindow):
     def __init__(self):
         super().__init__()
-        self.address_book = AddressBook()
+        # 儲存後端由 ADDRESSBOOK_BACKEND / ADDRESSBOOK_FILE 環境變數決定，預設為 contacts.json；
+        # 啟動快取讓下次開啟時不必重新解析 JSON 與建立搜尋索引；
+        # ADDRESSBOOK_SEARCH_ENGINE=numpy 時以 NumPy 欄式掃描取代 n-gram 索引
+        self.address_book = AddressBook(storage=create_storage(), cache=True, columnar=columnar_requested())
+        self.model = ContactTableModel(self.address_book, self)
+        # 即時搜尋在背景執行緒進行，結果分批送回表格
+        self.search_controller = SearchController(self.address_book, parent=self)
+        self.search_controller.first_chunk.connect(self.on_first_results)
+        self.search_controller.more_chunk.connect(self.on_more_results)
+        # 地址分類面板選取的分類（() 表示全部），與搜尋條件同時套用
+        self.facet_path = ()
+        # 通訊錄異動時只更新受影響的列
+        self.address_book.subscribe(self.on_contacts_changed)
+        # 定期檢查資料檔是否被其他程式修改，只合併有變動的聯絡人
+        self.poll_timer = QTimer(self)
+        self.poll_timer.setInterval(FILE_POLL_INTERVAL_MS)
+        self.poll_timer.timeout.connect(self.check_external_changes)
+        self.poll_timer.start()
+        # 匯出在背景執行緒逐批寫檔，同一時間只進行一項匯出
+        self.export_pool = QThreadPool(self)
+        self.export_pool.setMaxThreadCount(1)
+        self.export_task = None
+        self.export_progress = None
         self.current_sort_column = None
         self.sort_order = Qt.SortOrder.AscendingOrder
         self.init_ui()
@@ -55,6 +94,17 @@ class AddressBookQt(QMainWindow):
 
         main_layout.addLayout(content_layout)
 
+        # 效能統計面板（預設隱藏，由左側按鈕開關）
+        self.stats_dock = StatsDock(self.address_book.metrics, self)
+        self.addDockWidget(Qt.DockWidgetArea.RightDockWidgetArea, self.stats_dock)
+        self.stats_dock.hide()
+
+        # 地址分類面板（預設隱藏，由左側按鈕開關；第一次開啟時才建立分類）
+        self.facet_dock = FacetDock(self.address_book, self)
+        self.facet_dock.facet_selected.connect(self.on_facet_selected)
+        self.addDockWidget(Qt.DockWidgetArea.LeftDockWidgetArea, self.facet_dock)
+        self.facet_dock.hide()
+
     def create_left_panel(self):
         panel = QWidget()
         layout = QVBoxLayout(panel)
@@ -80,7 +130,9 @@ class AddressBookQt(QMainWindow):
         search_type_label.setAlignment(Qt.AlignmentFlag.AlignLeft)  # 文字靠左對齊
         self.search_type = QComboBox()
         self.search_type.setFixedWidth(200)
-        self.search_type.addItems(["姓名", "電話", "電子郵件", "地址", "全欄位"])
+        self.search_type.addItems(["姓名", "電話", "電子郵件", "地址", "全欄位",
+                                   AddressBook.FUZZY_SEARCH_TYPE, AddressBook.QUERY_SEARCH_TYPE])
+        self.search_type.currentTextChanged.connect(self.on_search_type_changed)
 
         # 搜尋輸入框
         search_input_label = QLabel("搜尋關鍵字：")
@@ -102,10 +154,35 @@ class AddressBookQt(QMainWindow):
         reset_sort_button.setMinimumHeight(40)
         reset_sort_button.clicked.connect(self.reset_sort)
 
+        # 匯出按鈕（有搜尋條件時只匯出搜尋結果）
+        self.export_button = QPushButton("匯出聯絡人")
+        self.export_button.setFixedWidth(200)
+        self.export_button.setMinimumHeight(40)
+        self.export_button.clicked.connect(self.export_contacts)
+
+        # 重複聯絡人按鈕
+        duplicates_button = QPushButton("重複聯絡人")
+        duplicates_button.setFixedWidth(200)
+        duplicates_button.setMinimumHeight(40)
+        duplicates_button.clicked.connect(self.show_duplicates_dialog)
+
+        # 地址分類按鈕
+        facets_button = QPushButton("地址分類")
+        facets_button.setFixedWidth(200)
+        facets_button.setMinimumHeight(40)
+        facets_button.clicked.connect(self.toggle_facets)
+
+        # 效能統計按鈕
+        stats_button = QPushButton("效能統計")
+        stats_button.setFixedWidth(200)
+        stats_button.setMinimumHeight(40)
+        stats_button.clicked.connect(self.toggle_stats)
+
         # 添加所有元件到搜尋區域
         for widget in [search_type_label, self.search_type,
                       search_input_label, self.search_input,
-                      self.sort_status_label, reset_sort_button]:
+                      self.sort_status_label, reset_sort_button, self.export_button,
+                      duplicates_button, facets_button, stats_button]:
             search_layout.addWidget(widget, 0, Qt.AlignmentFlag.AlignHCenter)  # 每個元件都水平置中
 
         layout.addWidget(search_frame)
@@ -114,9 +191,10 @@ class AddressBookQt(QMainWindow):
         return panel
 
     def create_table(self):
-        table = QTableWidget()
-        table.setColumnCount(4)
-        table.setHorizontalHeaderLabels(["姓名", "電話", "電子郵件", "地址"])
+        table = QTableView()
+        table.setModel(self.model)
+        table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        table.setSelectionMode(QAbstractItemView.SelectionMode.SingleSelection)
 
         # 設定表格列寬
         header = table.horizontalHeader()
@@ -137,33 +215,32 @@ class AddressBookQt(QMainWindow):
             success, message = self.address_book.add_contact(**contact_data)
 
             if success:
-                self.refresh_contact_list()
                 QMessageBox.information(self, "成功", message)
             else:
                 QMessageBox.warning(self, "錯誤", message)
 
+    def selected_contact(self):
+        """回傳目前選取的聯絡人，沒有選取時回傳 None"""
+        indexes = self.table.selectionModel().selectedIndexes()
+        if not indexes:
+            return None
+        return self.model.contact_at(indexes[0].row())
+
     def show_edit_contact_dialog(self):
-        selected_items = self.table.selectedItems()
-        if not selected_items:
+        contact = self.selected_contact()
+        if contact is None:
             QMessageBox.warning(self, "警告", "請先選擇要編輯的聯絡人！")
             return
 
-        row = selected_items[0].row()
-        name = self.table.item(row, 0).text()
-
-        # 找到對應的聯絡人
-        contact = next((c for c in self.address_book.contacts if c.name == name), None)
-        if contact:
-            dialog = ContactDialog(self, contact)
-            if dialog.exec() == ContactDialog.DialogCode.Accepted:
-                contact_data = dialog.get_contact_data()
-                success, message = self.address_book.update_contact(**contact_data)
+        dialog = ContactDialog(self, contact)
+        if dialog.exec() == ContactDialog.DialogCode.Accepted:
+            contact_data = dialog.get_contact_data()
+            success, message = self.address_book.update_contact(**contact_data)
 
-                if success:
-                    self.refresh_contact_list()
-                    QMessageBox.information(self, "成功", message)
-                else:
-                    QMessageBox.warning(self, "錯誤", message)
+            if success:
+                QMessageBox.information(self, "成功", message)
+            else:
+                QMessageBox.warning(self, "錯誤", message)
 
     def setup_context_menu(self):
         """設定右鍵選單"""
@@ -188,19 +265,37 @@ class AddressBookQt(QMainWindow):
         """處理搜尋"""
         search_type = self.search_type.currentText()
 
-        # 清空表格
-        self.table.setRowCount(0)
-
         if not text:
+            self.search_controller.cancel()
             self.refresh_contact_list()
             return
 
-        # 搜尋聯絡人
-        found_contacts = self.address_book.search_contacts(text, search_type)
+        # 交給背景搜尋，輸入中的舊查詢會自動取消
+        self.search_controller.request(text, search_type)
 
-        # 顯示搜尋結果
-        for contact in found_contacts:
-            self.add_contact_to_table(contact)
+    def on_first_results(self, contacts):
+        self.model.set_contacts(self.address_book.filter_facet(contacts, self.facet_path))
+
+    def on_more_results(self, contacts):
+        self.model.append_contacts(self.address_book.filter_facet(contacts, self.facet_path))
+
+    def on_facet_selected(self, path):
+        """切換地址分類時，以新的分類重新顯示（有搜尋條件時重新搜尋）"""
+        if path == self.facet_path:
+            return
+        self.facet_path = path
+        self.on_search(self.search_input.text())
+
+    def on_search_type_changed(self, search_type):
+        """切換搜尋類型時更新提示文字，並以新的類型重新搜尋"""
+        if search_type == AddressBook.QUERY_SEARCH_TYPE:
+            self.search_input.setPlaceholderText("例如 name:張 address:台北 -email:example.com")
+            self.search_input.setToolTip(QUERY_SYNTAX_HELP)
+        else:
+            self.search_input.setPlaceholderText("請輸入搜尋關鍵字...")
+            self.search_input.setToolTip("")
+        if self.search_input.text():
+            self.on_search(self.search_input.text())
 
     def on_header_clicked(self, logical_index):
         """處理表格標題點擊排序"""
@@ -212,10 +307,10 @@ class AddressBookQt(QMainWindow):
             self.sort_order = Qt.SortOrder.AscendingOrder
 
         # 執行排序
-        self.table.sortItems(logical_index, self.sort_order)
+        self.model.sort(logical_index, self.sort_order)
 
         # 更新排序狀態顯示
-        column_name = self.table.horizontalHeaderItem(logical_index).text()
+        column_name = self.model.headerData(logical_index, Qt.Orientation.Horizontal)
         direction = "降序" if self.sort_order == Qt.SortOrder.DescendingOrder else "升序"
         self.sort_status_label.setText(f"目前排序方式：{column_name} ({direction})")
 
@@ -224,46 +319,130 @@ class AddressBookQt(QMainWindow):
         self.current_sort_column = None
         self.sort_order = Qt.SortOrder.AscendingOrder
         self.sort_status_label.setText("目前排序方式：預設")
-        self.refresh_contact_list()
+        self.model.reset_order()
+
+    def matches_current_filter(self, contact) -> bool:
+        """判斷聯絡人是否符合目前的搜尋條件與地址分類（沒有條件時一律符合）"""
+        if not self.address_book.filter_facet([contact], self.facet_path):
+            return False
+        text = self.search_input.text()
+        if not text:
+            return True
+        return bool(self.address_book.filter_contacts([contact], text, self.search_type.currentText()))
+
+    def on_contacts_changed(self, event, name):
+        """依異動事件只修補表格中受影響的列，保留排序與搜尋條件"""
+        if event == AddressBook.CONTACTS_RELOADED:
+            self.on_search(self.search_input.text())
+            return
+        if event == AddressBook.CONTACT_REMOVED:
+            self.model.remove_contact(name)
+            return
+
+        contact = self.address_book.get_contact(name)
+        if contact is None:
+            return
+        shown = self.model.row_of(name) >= 0
+        if not self.matches_current_filter(contact):
+            if shown:
+                self.model.remove_contact(name)
+        elif shown:
+            self.model.contact_changed(name)
+        else:
+            self.model.insert_contact(contact)
+
+    def export_contacts(self):
+        """在背景匯出聯絡人，有搜尋條件或選取地址分類時只匯出符合的聯絡人"""
+        if self.export_task is not None:
+            return
+        filename, selected_filter = QFileDialog.getSaveFileName(
+            self, "匯出聯絡人", "contacts.csv", ";;".join(EXPORT_FILTERS))
+        if not filename:
+            return
+        # 副檔名優先，沒有可辨識的副檔名時依選擇的篩選器決定格式
+        extension = os.path.splitext(filename)[1].lower()
+        fmt = FORMAT_EXTENSIONS.get(extension) or EXPORT_FILTERS.get(selected_filter, "csv")
+
+        query = self.search_input.text()
+        contacts = self.address_book.iter_contacts(query, self.search_type.currentText(), facet=self.facet_path)
+        # 有搜尋條件時無法事先得知筆數，進度列改為忙碌指示
+        if query.strip():
+            total = 0
+        else:
+            total = self.address_book.facet_count(self.facet_path) if self.facet_path else len(self.address_book)
+        self.export_progress = QProgressDialog("正在匯出聯絡人...", "取消", 0, total, self)
+        self.export_progress.setWindowTitle("匯出")
+        self.export_progress.setWindowModality(Qt.WindowModality.WindowModal)
+        self.export_progress.setAutoReset(False)
+        self.export_progress.setMinimumDuration(500)
+
+        self.export_task = ExportTask(contacts, filename, fmt)
+        self.export_task.signals.progress.connect(self.export_progress.setValue)
+        self.export_task.signals.finished.connect(self.on_export_finished)
+        self.export_progress.canceled.connect(self.export_task.cancel)
+        self.export_button.setEnabled(False)
+        self.export_pool.start(self.export_task)
+
+    def on_export_finished(self, success: bool, message: str):
+        self.export_task = None
+        self.export_progress.close()
+        self.export_progress = None
+        self.export_button.setEnabled(True)
+        if success:
+            QMessageBox.information(self, "結果", message)
+        else:
+            QMessageBox.warning(self, "匯出", message)
+
+    def show_duplicates_dialog(self):
+        """找出可能重複的聯絡人並開啟合併對話框（合併後表格會透過異動事件更新）"""
+        QApplication.setOverrideCursor(Qt.CursorShape.WaitCursor)
+        try:
+            clusters = self.address_book.find_duplicates()
+        finally:
+            QApplication.restoreOverrideCursor()
+        if not clusters:
+            QMessageBox.information(self, "重複聯絡人", "沒有找到可能重複的聯絡人")
+            return
+        DuplicatesDialog(self.address_book, clusters, self).exec()
+
+    def toggle_facets(self):
+        self.facet_dock.setVisible(not self.facet_dock.isVisible())
+
+    def toggle_stats(self):
+        self.stats_dock.setVisible(not self.stats_dock.isVisible())
+
+    def check_external_changes(self):
+        try:
+            self.address_book.refresh()
+        except (OSError, ValueError) as e:
+            # 其他程式寫入途中或網路磁碟暫時無法存取，下次再試；訊息保留到下一次檢查之後
+            self.statusBar().showMessage(f"重新載入聯絡人失敗：{e}", FILE_POLL_INTERVAL_MS * 2)
+
+    def closeEvent(self, event):
+        self.poll_timer.stop()
+        self.search_controller.shutdown()
+        if self.export_task is not None:
+            # 視窗即將關閉，不再顯示取消結果
+            self.export_task.signals.finished.disconnect()
+            self.export_task.cancel()
+        self.export_pool.waitForDone()
+        super().closeEvent(event)
 
     def refresh_contact_list(self):
-        """刷新聯絡人列表"""
-        self.table.setRowCount(0)
-        for contact in self.address_book.contacts:
-            self.add_contact_to_table(contact)
-
-    def add_contact_to_table(self, contact):
-        """將聯絡人添加到表格中"""
-        row = self.table.rowCount()
-        self.table.insertRow(row)
-
-        # 設定每個欄位的值
-        items = [
-            QTableWidgetItem(contact.name),
-            QTableWidgetItem(contact.phone),
-            QTableWidgetItem(contact.email),
-            QTableWidgetItem(contact.address)
-        ]
-
-        # 設定項目對齊方式和顏色
-        for col, item in enumerate(items):
-            item.setTextAlignment(Qt.AlignmentFlag.AlignVCenter | Qt.AlignmentFlag.AlignLeft)
-            self.table.setItem(row, col, item)
-
-        # 設定交替行顏色
-        if row % 2:
-            for col in range(self.table.columnCount()):
-                self.table.item(row, col).setBackground(QColor(COLORS['bg_medium']))
+        """刷新聯絡人列表（選取地址分類時只顯示該分類）"""
+        if self.facet_path:
+            self.model.set_contacts(self.address_book.facet_contacts(self.facet_path))
+        else:
+            self.model.set_contacts(self.address_book.contacts)
 
     def delete_contact(self):
         """刪除聯絡人"""
-        selected_items = self.table.selectedItems()
-        if not selected_items:
+        contact = self.selected_contact()
+        if contact is None:
             QMessageBox.warning(self, "警告", "請先選擇要刪除的聯絡人！")
             return
 
-        row = selected_items[0].row()
-        name = self.table.item(row, 0).text()
+        name = contact.name
 
         reply = QMessageBox.question(
             self,
@@ -275,7 +454,6 @@ class AddressBookQt(QMainWindow):
         if reply == QMessageBox.StandardButton.Yes:
             success, message = self.address_book.delete_contact(name)
             if success:
-                self.refresh_contact_list()
                 QMessageBox.information(self, "成功", message)
             else:
                 QMessageBox.warning(self, "錯誤", message)
\ No newline at end of file
@@ -0,0 +1,197 @@
+from typing import List, Dict, Optional
+from PyQt6.QtCore import Qt, QAbstractTableModel, QModelIndex
+from PyQt6.QtGui import QColor
+from qt_constants import COLORS
+from models import AddressBook, Contact
+from instrumentation import timed
+
+class ContactTableModel(QAbstractTableModel):
+    """直接以 AddressBook 的聯絡人物件作為資料來源的表格模型
+
+    模型只保存目前顯示中的聯絡人參照（不複製資料、不建立 QTableWidgetItem），
+    檢視元件只會對可見的列呼叫 data()。
+    """
+
+    HEADERS = ["姓名", "電話", "電子郵件", "地址"]
+    FIELDS = ["name", "phone", "email", "address"]
+
+    def __init__(self, address_book: AddressBook, parent=None):
+        super().__init__(parent)
+        self.address_book = address_book
+        self.metrics = address_book.metrics
+        self._rows: List[Contact] = []
+        # 姓名對應的列號，插入、刪除、移動時只更新位置有變動的列
+        self._row_of: Dict[str, int] = {}
+        # 目前的排序欄位（None 表示依新增順序）與方向，新增或更新時用來決定列的位置
+        self._sort_column: Optional[int] = None
+        self._sort_order = Qt.SortOrder.AscendingOrder
+        self._alternate_brush = QColor(COLORS['bg_medium'])
+        self._alignment = Qt.AlignmentFlag.AlignVCenter | Qt.AlignmentFlag.AlignLeft
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.FIELDS)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        if role == Qt.ItemDataRole.DisplayRole:
+            if index.column() == 0:
+                # 每列第一格被繪製時計數一次，可看出捲動或重繪實際處理了多少列
+                self.metrics.count("rows_rendered")
+            return getattr(self._rows[index.row()], self.FIELDS[index.column()])
+        if role == Qt.ItemDataRole.TextAlignmentRole:
+            return self._alignment
+        if role == Qt.ItemDataRole.BackgroundRole and index.row() % 2:
+            # 交替行顏色
+            return self._alternate_brush
+        return None
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role != Qt.ItemDataRole.DisplayRole:
+            return None
+        if orientation == Qt.Orientation.Horizontal:
+            return self.HEADERS[section]
+        return section + 1
+
+    def contact_at(self, row: int) -> Optional[Contact]:
+        if 0 <= row < len(self._rows):
+            return self._rows[row]
+        return None
+
+    def row_of(self, name: str) -> int:
+        """回傳聯絡人所在的列，找不到時回傳 -1"""
+        return self._row_of.get(name, -1)
+
+    def _reindex(self, first: int = 0, last: Optional[int] = None):
+        """更新第 first 到 last 列（預設到最後一列）的姓名對應"""
+        last = len(self._rows) - 1 if last is None else last
+        rows = self._rows
+        for row in range(first, last + 1):
+            self._row_of[rows[row].name] = row
+
+    @timed("table_reset")
+    def set_contacts(self, contacts: List[Contact]):
+        """替換整份顯示清單（重新整理、搜尋結果），並套用目前的排序"""
+        self.beginResetModel()
+        self._rows = list(contacts)
+        if self._sort_column is not None:
+            self._rows.sort(key=self._sort_key, reverse=self._sort_order == Qt.SortOrder.DescendingOrder)
+        self._row_of = {}
+        self._reindex()
+        self.endResetModel()
+
+    def append_contacts(self, contacts: List[Contact]):
+        """附加一批聯絡人（分批顯示搜尋結果）；有排序時逐一插入正確位置"""
+        if not contacts:
+            return
+        if self._sort_column is not None:
+            for contact in contacts:
+                self.insert_contact(contact)
+            return
+        first = len(self._rows)
+        self.beginInsertRows(QModelIndex(), first, first + len(contacts) - 1)
+        self._rows.extend(contacts)
+        self._reindex(first)
+        self.endInsertRows()
+
+    def _sort_key(self, contact: Contact):
+        if self._sort_column is None:
+            return self.address_book.insertion_order(contact.name)
+        return getattr(contact, self.FIELDS[self._sort_column])
+
+    def _sorted_position(self, contact: Contact) -> int:
+        """以二分搜尋找出聯絡人在目前排序下應插入的位置（排在相同鍵值之後）"""
+        key = self._sort_key(contact)
+        descending = self._sort_order == Qt.SortOrder.DescendingOrder and self._sort_column is not None
+        low, high = 0, len(self._rows)
+        while low < high:
+            middle = (low + high) // 2
+            other = self._sort_key(self._rows[middle])
+            if (other >= key) if descending else (other <= key):
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def insert_contact(self, contact: Contact):
+        """依目前的排序把聯絡人插入正確的位置"""
+        row = self._sorted_position(contact)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self._rows.insert(row, contact)
+        self._reindex(row)
+        self.endInsertRows()
+        # 插入點之後的列奇偶互換，背景顏色需要重畫
+        self._background_changed(row + 1)
+
+    def remove_contact(self, name: str) -> bool:
+        row = self.row_of(name)
+        if row < 0:
+            return False
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del self._rows[row]
+        del self._row_of[name]
+        self._reindex(row)
+        self.endRemoveRows()
+        self._background_changed(row)
+        return True
+
+    def contact_changed(self, name: str) -> bool:
+        """通知檢視某位聯絡人的欄位已更新；排序鍵值改變時把該列移到新位置"""
+        row = self.row_of(name)
+        if row < 0:
+            return False
+        contact = self._rows.pop(row)
+        target = self._sorted_position(contact)
+        self._rows.insert(row, contact)
+        if target != row:
+            # beginMoveRows 的目的地以移動前的索引表示
+            destination = target + 1 if target > row else target
+            self.beginMoveRows(QModelIndex(), row, row, QModelIndex(), destination)
+            self._rows.insert(target, self._rows.pop(row))
+            first, last = min(row, target), max(row, target)
+            self._reindex(first, last)
+            self.endMoveRows()
+            self.dataChanged.emit(self.index(first, 0), self.index(last, len(self.FIELDS) - 1))
+        else:
+            self.dataChanged.emit(self.index(row, 0), self.index(row, len(self.FIELDS) - 1))
+        return True
+
+    def _background_changed(self, first_row: int):
+        if first_row < len(self._rows):
+            self.dataChanged.emit(
+                self.index(first_row, 0),
+                self.index(len(self._rows) - 1, len(self.FIELDS) - 1),
+                [Qt.ItemDataRole.BackgroundRole]
+            )
+
+    @timed("sort")
+    def sort(self, column, order=Qt.SortOrder.AscendingOrder):
+        self._sort_column = column
+        self._sort_order = order
+        self._resort()
+
+    @timed("sort")
+    def reset_order(self):
+        """還原為新增順序（保留目前顯示的聯絡人，例如搜尋結果）"""
+        self._sort_column = None
+        self._sort_order = Qt.SortOrder.AscendingOrder
+        self._resort()
+
+    def _resort(self):
+        self.layoutAboutToBeChanged.emit()
+        # 記住選取狀態等持久索引對應的聯絡人，排序後移到新位置
+        persistent = self.persistentIndexList()
+        tracked = [(self._rows[index.row()], index.column()) for index in persistent]
+        self._rows.sort(
+            key=self._sort_key,
+            reverse=self._sort_column is not None and self._sort_order == Qt.SortOrder.DescendingOrder
+        )
+        self._reindex()
+        self.changePersistentIndexList(
+            persistent,
+            [self.index(self._row_of[contact.name], column) for contact, column in tracked]
+        )
+        self.layoutChanged.emit()
@@ -0,0 +1,116 @@
+from typing import Callable, List
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, QTimer, pyqtSignal
+from qt_constants import SEARCH_DEBOUNCE_MS, SEARCH_CHUNK_SIZE
+from search_session import SearchSession
+
+class SearchSignals(QObject):
+    """背景搜尋工作回報結果用的訊號（QRunnable 本身不能發送訊號）"""
+    chunk = pyqtSignal(int, list)   # 搜尋編號, 一批結果
+    finished = pyqtSignal(int)      # 搜尋編號
+
+class SearchTask(QRunnable):
+    """在執行緒池中執行一次搜尋，並分批回傳結果
+
+    每批送出前都會檢查搜尋編號是否仍是最新的，過時的搜尋會直接放棄。
+    """
+
+    def __init__(self, generation: int, search: Callable[[], List], is_current: Callable[[int], bool],
+                 chunk_size: int = SEARCH_CHUNK_SIZE):
+        super().__init__()
+        self.generation = generation
+        self.search = search
+        self.is_current = is_current
+        self.chunk_size = chunk_size
+        self.signals = SearchSignals()
+
+    def run(self):
+        if not self.is_current(self.generation):
+            return
+        results = self.search()
+        for start in range(0, len(results), self.chunk_size):
+            if not self.is_current(self.generation):
+                return
+            self.signals.chunk.emit(self.generation, results[start:start + self.chunk_size])
+        if self.is_current(self.generation):
+            self.signals.finished.emit(self.generation)
+
+class SearchController(QObject):
+    """即時搜尋控制器：延遲觸發（debounce）、背景執行、取消過時的搜尋
+
+    first_chunk 表示新一輪搜尋的第一批結果（應取代表格內容），
+    more_chunk 為同一輪後續的結果（附加在表格後面）。
+    """
+
+    first_chunk = pyqtSignal(list)
+    more_chunk = pyqtSignal(list)
+    finished = pyqtSignal()
+
+    def __init__(self, address_book, debounce_ms: int = SEARCH_DEBOUNCE_MS, parent=None):
+        super().__init__(parent)
+        self.address_book = address_book
+        # 搜尋結果快取與漸進縮小範圍；執行緒池只有一條執行緒，不會同時存取
+        self.session = SearchSession(address_book)
+        self._generation = 0
+        self._pending = None
+        self._received_first = False
+        self._pool = QThreadPool(self)
+        self._pool.setMaxThreadCount(1)
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self._start)
+        self.set_debounce_interval(debounce_ms)
+
+    def set_debounce_interval(self, milliseconds: int):
+        self._timer.setInterval(max(0, milliseconds))
+
+    def request(self, query: str, search_type: str):
+        """安排一次搜尋；在延遲時間內再次呼叫會取代前一次"""
+        self._generation += 1
+        self._pending = (query, search_type)
+        self._timer.start()
+
+    def cancel(self):
+        """取消尚未開始與執行中的搜尋"""
+        self._generation += 1
+        self._pending = None
+        self._timer.stop()
+
+    def _is_current(self, generation: int) -> bool:
+        return generation == self._generation
+
+    def _start(self):
+        if self._pending is None:
+            return
+        query, search_type = self._pending
+        self._pending = None
+        self._received_first = False
+        task = SearchTask(
+            self._generation,
+            lambda: self.session.search(query, search_type),
+            self._is_current
+        )
+        task.signals.chunk.connect(self._on_chunk)
+        task.signals.finished.connect(self._on_finished)
+        self._pool.start(task)
+
+    def _on_chunk(self, generation: int, contacts: list):
+        if generation != self._generation:
+            return
+        if self._received_first:
+            self.more_chunk.emit(contacts)
+        else:
+            self._received_first = True
+            self.first_chunk.emit(contacts)
+
+    def _on_finished(self, generation: int):
+        if generation != self._generation:
+            return
+        if not self._received_first:
+            # 沒有任何結果時也要清空表格
+            self._received_first = True
+            self.first_chunk.emit([])
+        self.finished.emit()
+
+    def shutdown(self):
+        self.cancel()
+        self._pool.waitForDone()
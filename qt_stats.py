@@ -0,0 +1,72 @@
+from PyQt6.QtWidgets import (QDockWidget, QWidget, QVBoxLayout, QHBoxLayout, QPlainTextEdit,
+                             QPushButton, QFileDialog, QMessageBox)
+from PyQt6.QtCore import Qt, QTimer
+from PyQt6.QtGui import QFontDatabase
+from qt_constants import COLORS, STATS_REFRESH_MS
+from instrumentation import Metrics
+
+
+class StatsDock(QDockWidget):
+    """效能統計面板：顯示各項操作的耗時分佈與計數，可匯出成 JSON 檔
+
+    面板隱藏時不更新，不會影響介面效能。
+    """
+
+    def __init__(self, metrics: Metrics, parent=None):
+        super().__init__("效能統計", parent)
+        self.metrics = metrics
+        self.setObjectName("stats_dock")
+        self.setAllowedAreas(Qt.DockWidgetArea.RightDockWidgetArea | Qt.DockWidgetArea.BottomDockWidgetArea)
+
+        container = QWidget()
+        layout = QVBoxLayout(container)
+
+        self.text = QPlainTextEdit()
+        self.text.setReadOnly(True)
+        self.text.setFont(QFontDatabase.systemFont(QFontDatabase.SystemFont.FixedFont))
+        self.text.setStyleSheet(f"""
+            background-color: {COLORS['bg_medium']};
+            color: {COLORS['text']};
+            border: 1px solid {COLORS['border']};
+        """)
+        layout.addWidget(self.text)
+
+        buttons = QHBoxLayout()
+        reset_button = QPushButton("重設")
+        reset_button.clicked.connect(self.reset)
+        export_button = QPushButton("匯出統計...")
+        export_button.clicked.connect(self.export)
+        buttons.addWidget(reset_button)
+        buttons.addWidget(export_button)
+        layout.addLayout(buttons)
+        self.setWidget(container)
+
+        self.timer = QTimer(self)
+        self.timer.setInterval(STATS_REFRESH_MS)
+        self.timer.timeout.connect(self.update_report)
+        self.visibilityChanged.connect(self.on_visibility_changed)
+
+    def on_visibility_changed(self, visible: bool):
+        if visible:
+            self.update_report()
+            self.timer.start()
+        else:
+            self.timer.stop()
+
+    def update_report(self):
+        self.text.setPlainText(self.metrics.report())
+
+    def reset(self):
+        self.metrics.reset()
+        self.update_report()
+
+    def export(self):
+        filename, _ = QFileDialog.getSaveFileName(self, "匯出統計", "addressbook_stats.json", "JSON (*.json)")
+        if not filename:
+            return
+        try:
+            self.metrics.dump(filename)
+        except OSError as e:
+            QMessageBox.warning(self, "錯誤", f"無法寫入統計檔：{e}")
+            return
+        QMessageBox.information(self, "結果", f"統計已匯出到 {filename}")
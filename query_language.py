@@ -0,0 +1,221 @@
+"""多欄位查詢語法
+
+    name:張 address:台北 -email:example.com
+    (name:陳 OR name:林) phone:0912
+    name:=王小明
+    address:"台北市 信義區" NOT email:gmail
+
+- 以空白分隔的條件為 AND（也可寫出 AND），OR 的優先順序較低，可用括號分組
+- NOT 或前置 - 表示排除
+- 欄位可用英文或中文名稱（name/姓名、phone/電話、email/電子郵件、address/地址），
+  省略欄位時比對所有欄位
+- field:值 為不分大小寫的子字串比對；電話欄位輸入號碼時比對開頭或結尾的數字（與「電話」搜尋相同）
+- field:=值 為完全相同（區分大小寫），name:=值 可直接以姓名查詢
+- 含空白或括號的值以雙引號包住
+"""
+from typing import List, Optional
+from phone_index import is_phone_query, phone_matches
+
+FIELD_ALIASES = {
+    "name": "name", "姓名": "name",
+    "phone": "phone", "電話": "phone", "tel": "phone",
+    "email": "email", "電子郵件": "email", "mail": "email",
+    "address": "address", "地址": "address", "addr": "address",
+}
+ALL_FIELDS = ("name", "phone", "email", "address")
+
+
+class Term:
+    """單一條件：欄位（None 表示所有欄位）包含或等於某個值"""
+
+    def __init__(self, field: Optional[str], value: str, exact: bool = False):
+        self.field = field
+        self.value = value
+        self.exact = exact
+        self.lowered = value.lower()
+
+    @property
+    def fields(self) -> tuple:
+        return (self.field,) if self.field else ALL_FIELDS
+
+    @property
+    def is_phone(self) -> bool:
+        """電話欄位的號碼查詢改以數字的開頭或結尾比對"""
+        return self.field == "phone" and not self.exact and is_phone_query(self.value)
+
+    def matches(self, contact) -> bool:
+        if self.exact:
+            return any(getattr(contact, field) == self.value for field in self.fields)
+        if self.is_phone:
+            return phone_matches(contact.phone, self.value)
+        return any(self.lowered in contact.lowered(field) for field in self.fields)
+
+    def __str__(self) -> str:
+        value = f'"{self.value}"' if any(char.isspace() or char in '()"' for char in self.value) else self.value
+        return f"{self.field or '*'}:{'=' if self.exact else ''}{value}"
+
+
+class Not:
+    def __init__(self, child):
+        self.child = child
+
+    def matches(self, contact) -> bool:
+        return not self.child.matches(contact)
+
+    def __str__(self) -> str:
+        return f"NOT ({self.child})" if isinstance(self.child, (And, Or)) else f"NOT {self.child}"
+
+
+class And:
+    def __init__(self, children: List):
+        self.children = children
+
+    def matches(self, contact) -> bool:
+        return all(child.matches(contact) for child in self.children)
+
+    def __str__(self) -> str:
+        return " ".join(f"({child})" if isinstance(child, Or) else str(child) for child in self.children)
+
+
+class Or:
+    def __init__(self, children: List):
+        self.children = children
+
+    def matches(self, contact) -> bool:
+        return any(child.matches(contact) for child in self.children)
+
+    def __str__(self) -> str:
+        return " OR ".join(str(child) for child in self.children)
+
+
+def tokenize(text: str) -> List[str]:
+    """切出括號與以空白分隔的詞；雙引號中的空白與括號屬於同一個詞（保留引號）"""
+    tokens = []
+    i = 0
+    while i < len(text):
+        char = text[i]
+        if char.isspace():
+            i += 1
+        elif char in "()":
+            tokens.append(char)
+            i += 1
+        else:
+            start = i
+            while i < len(text) and not text[i].isspace() and text[i] not in "()":
+                if text[i] == '"':
+                    end = text.find('"', i + 1)
+                    if end < 0:
+                        raise ValueError("引號沒有結束")
+                    i = end
+                i += 1
+            tokens.append(text[start:i])
+    return tokens
+
+
+def _unquote(value: str) -> str:
+    return value.replace('"', "")
+
+
+def parse_term(token: str):
+    """解析單一條件：[-][欄位:][=]值"""
+    negated = token.startswith("-") and len(token) > 1
+    if negated:
+        token = token[1:]
+    field = None
+    head, separator, rest = token.partition(":")
+    if separator and '"' not in head and head.lower() in FIELD_ALIASES:
+        field = FIELD_ALIASES[head.lower()]
+        token = rest
+    exact = token.startswith("=")
+    if exact:
+        token = token[1:]
+    value = _unquote(token)
+    if not value:
+        raise ValueError(f"條件缺少要比對的值：{field or token}")
+    term = Term(field, value, exact)
+    return Not(term) if negated else term
+
+
+class _Parser:
+    def __init__(self, tokens: List[str]):
+        self.tokens = tokens
+        self.position = 0
+
+    def peek(self) -> Optional[str]:
+        return self.tokens[self.position] if self.position < len(self.tokens) else None
+
+    def take(self) -> str:
+        token = self.tokens[self.position]
+        self.position += 1
+        return token
+
+    def parse_or(self):
+        children = [self.parse_and()]
+        while self.peek() == "OR":
+            self.take()
+            children.append(self.parse_and())
+        return children[0] if len(children) == 1 else Or(children)
+
+    def parse_and(self):
+        children = []
+        while self.peek() not in (None, "OR", ")"):
+            if self.peek() == "AND":
+                self.take()
+                continue
+            children.append(self.parse_unary())
+        if not children:
+            raise ValueError("AND 或 OR 前後缺少條件")
+        # 攤平巢狀的 AND，規劃時可以從所有條件中挑選存取路徑
+        flattened = []
+        for child in children:
+            flattened.extend(child.children if isinstance(child, And) else [child])
+        return flattened[0] if len(flattened) == 1 else And(flattened)
+
+    def parse_unary(self):
+        token = self.take()
+        if token in ("NOT", "-"):
+            if self.peek() is None:
+                raise ValueError("NOT 後缺少條件")
+            return Not(self.parse_unary())
+        if token == "(":
+            node = self.parse_or()
+            if self.peek() != ")":
+                raise ValueError("括號沒有結束")
+            self.take()
+            return node
+        if token == ")":
+            raise ValueError("多出的右括號")
+        return parse_term(token)
+
+
+def parse_query(text: str):
+    """將查詢字串解析成條件樹（Term、Not、And、Or），語法錯誤時引發 ValueError"""
+    tokens = tokenize(text)
+    if not tokens:
+        raise ValueError("查詢是空的")
+    parser = _Parser(tokens)
+    node = parser.parse_or()
+    if parser.peek() is not None:
+        raise ValueError("多出的右括號")
+    return node
+
+
+class AccessPath:
+    """取得候選聯絡人的方式：名稱、對應的條件、估計筆數（上限）與實際取得候選的函式
+
+    exact 為 True 時取得的候選恰好就是符合該條件的聯絡人，該條件不必再逐筆檢查。
+    """
+
+    def __init__(self, name: str, condition, estimate: int, exact: bool, fetch, children: List = ()):
+        self.name = name
+        self.condition = condition
+        self.estimate = estimate
+        self.exact = exact
+        self.fetch = fetch
+        self.children = list(children)
+
+    def describe(self, indent: str = "") -> List[str]:
+        lines = [f"{indent}{self.name} {self.condition}（估計 ≤ {self.estimate} 筆）"]
+        for child in self.children:
+            lines.extend(child.describe(indent + "  "))
+        return lines
@@ -0,0 +1,225 @@
+from typing import List, Dict, Set, Iterable, Tuple, Optional
+
+
+def ngrams(text: str) -> Set[str]:
+    """回傳文字中的所有單字元與雙字元片段
+
+    中文姓名與地址沒有空白分詞，以字元 bigram 作為索引單位；
+    單字元片段用於只輸入一個字的查詢（例如「張」）。
+    """
+    grams = set(text)
+    grams.update(text[i:i + 2] for i in range(len(text) - 1))
+    return grams
+
+
+def edit_distance(a: str, b: str, max_distance: Optional[int] = None) -> int:
+    """Levenshtein 編輯距離（插入、刪除、替換各算 1）
+
+    指定 max_distance 時，一旦確定超過上限就提前結束並回傳 max_distance + 1。
+    """
+    if len(a) < len(b):
+        a, b = b, a
+    if max_distance is not None and len(a) - len(b) > max_distance:
+        return max_distance + 1
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, start=1):
+        current = [i]
+        for j, char_b in enumerate(b, start=1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (char_a != char_b),
+            ))
+        if max_distance is not None and min(current) > max_distance:
+            return max_distance + 1
+        previous = current
+    return previous[-1]
+
+
+class NGramIndex:
+    """多欄位的字元 n-gram 反向索引，用於子字串搜尋
+
+    每個欄位各自維護 gram -> 文件編號 的 posting list。查詢時先取查詢字串
+    所有 bigram 的 posting list 交集，再對少數候選逐一驗證子字串。
+    文件編號依加入順序遞增，因此結果會保持聯絡人的新增順序。
+    """
+
+    def __init__(self, fields: Iterable[str]):
+        self.fields = list(fields)
+        self.clear()
+
+    def clear(self):
+        self._postings: Dict[str, Dict[str, Set[int]]] = {field: {} for field in self.fields}
+        # 預先轉成小寫的欄位值，驗證候選與移除時使用
+        self._values: Dict[str, Dict[int, str]] = {field: {} for field in self.fields}
+        self._doc_ids: Dict[str, int] = {}
+        self._keys: Dict[int, str] = {}
+        self._next_id = 0
+
+    def __len__(self) -> int:
+        return len(self._doc_ids)
+
+    def get_state(self) -> tuple:
+        """回傳只由內建型別組成的索引內容，可用 marshal 儲存
+
+        posting 以 list 儲存：marshal 寫出 set 時會先排序元素，大型索引慢上數十倍。
+        """
+        postings = {
+            field: {gram: list(docs) for gram, docs in grams.items()}
+            for field, grams in self._postings.items()
+        }
+        return self.fields, postings, self._values, self._doc_ids, self._next_id
+
+    def set_state(self, state: tuple):
+        fields, postings, self._values, self._doc_ids, self._next_id = state
+        self.fields = list(fields)
+        self._postings = {
+            field: {gram: set(docs) for gram, docs in grams.items()}
+            for field, grams in postings.items()
+        }
+        self._keys = {doc_id: key for key, doc_id in self._doc_ids.items()}
+
+    def doc_id(self, key: str) -> int:
+        """回傳文件編號（依加入順序遞增），不存在時回傳 -1"""
+        return self._doc_ids.get(key, -1)
+
+    def add(self, key: str, values: Dict[str, str]):
+        """加入一筆文件；key 已存在時等同 update"""
+        if key in self._doc_ids:
+            self.update(key, values)
+            return
+        doc_id = self._next_id
+        self._next_id += 1
+        self._doc_ids[key] = doc_id
+        self._keys[doc_id] = key
+        for field in self.fields:
+            self._index_value(field, doc_id, values[field])
+
+    def add_many(self, items: Iterable[Tuple[str, Dict[str, str]]]):
+        """一次加入多筆 (key, 欄位值)"""
+        for key, values in items:
+            self.add(key, values)
+
+    def update(self, key: str, values: Dict[str, str]):
+        """更新文件內容，只重建有變動的欄位，保留原本的順序"""
+        doc_id = self._doc_ids.get(key)
+        if doc_id is None:
+            self.add(key, values)
+            return
+        for field in self.fields:
+            if values[field].lower() != self._values[field][doc_id]:
+                self._unindex_value(field, doc_id)
+                self._index_value(field, doc_id, values[field])
+
+    def remove(self, key: str):
+        doc_id = self._doc_ids.pop(key, None)
+        if doc_id is None:
+            return
+        del self._keys[doc_id]
+        for field in self.fields:
+            self._unindex_value(field, doc_id)
+
+    def _index_value(self, field: str, doc_id: int, value: str):
+        value = value.lower()
+        self._values[field][doc_id] = value
+        postings = self._postings[field]
+        for gram in ngrams(value):
+            # 不使用 setdefault(gram, set())：它每次都會先建立一個空 set，建立大量索引時明顯變慢
+            docs = postings.get(gram)
+            if docs is None:
+                postings[gram] = {doc_id}
+            else:
+                docs.add(doc_id)
+
+    def _unindex_value(self, field: str, doc_id: int):
+        value = self._values[field].pop(doc_id)
+        postings = self._postings[field]
+        for gram in ngrams(value):
+            docs = postings[gram]
+            docs.discard(doc_id)
+            if not docs:
+                del postings[gram]
+
+    def _search_field(self, query: str, field: str) -> Set[int]:
+        postings = self._postings[field]
+        if len(query) == 1:
+            # 單字元 posting list 本身就是精確結果
+            return set(postings.get(query, ()))
+
+        grams = [query[i:i + 2] for i in range(len(query) - 1)]
+        lists = []
+        for gram in set(grams):
+            docs = postings.get(gram)
+            if not docs:
+                return set()
+            lists.append(docs)
+        lists.sort(key=len)
+        candidates = set(lists[0])
+        for docs in lists[1:]:
+            candidates &= docs
+            if not candidates:
+                return candidates
+
+        if len(grams) == 1:
+            return candidates
+        # bigram 全部出現不代表順序正確，逐一驗證候選
+        values = self._values[field]
+        return {doc_id for doc_id in candidates if query in values[doc_id]}
+
+    def estimate(self, query: str, fields: Iterable[str]) -> int:
+        """符合筆數的上限：各欄位中最短 posting list 的長度總和，不需要實際取交集"""
+        query = query.lower()
+        if not query:
+            return 0
+        grams = [query] if len(query) == 1 else [query[i:i + 2] for i in range(len(query) - 1)]
+        total = 0
+        for field in fields:
+            postings = self._postings[field]
+            total += min(len(postings.get(gram, ())) for gram in grams)
+        return min(total, len(self))
+
+    def fuzzy_search(self, query: str, field: str, max_distance: int) -> List[Tuple[int, str]]:
+        """回傳欄位值與 query 的編輯距離不超過 max_distance 的 (距離, key)
+
+        以單字元 posting list 篩選候選：經過 k 次編輯後，query 中不同的字元
+        至少還有 (字元數 - k) 個出現在結果中，長度差也不會超過 k。
+        只有通過這兩個條件的少數候選需要計算編輯距離。
+        結果依距離排序，距離相同時依加入順序。
+        """
+        query = query.lower()
+        if not query:
+            return []
+        values = self._values[field]
+        chars = set(query)
+        min_shared = len(chars) - max_distance
+        if min_shared <= 0:
+            # 查詢太短，任何值都可能符合，只能逐一比對
+            candidates = values.keys()
+        else:
+            postings = self._postings[field]
+            counts: Dict[int, int] = {}
+            for char in chars:
+                for doc_id in postings.get(char, ()):
+                    counts[doc_id] = counts.get(doc_id, 0) + 1
+            candidates = [doc_id for doc_id, count in counts.items() if count >= min_shared]
+
+        matches = []
+        for doc_id in candidates:
+            value = values[doc_id]
+            if abs(len(value) - len(query)) > max_distance:
+                continue
+            distance = edit_distance(query, value, max_distance)
+            if distance <= max_distance:
+                matches.append((distance, doc_id))
+        matches.sort()
+        return [(distance, self._keys[doc_id]) for distance, doc_id in matches]
+
+    def search(self, query: str, fields: Iterable[str]) -> List[str]:
+        """回傳任一指定欄位包含 query（不分大小寫）的 key，依加入順序排列"""
+        query = query.lower()
+        if not query:
+            return []
+        matched: Set[int] = set()
+        for field in fields:
+            matched |= self._search_field(query, field)
+        return [self._keys[doc_id] for doc_id in sorted(matched)]
@@ -0,0 +1,75 @@
+from collections import OrderedDict
+from typing import List, Tuple, Optional
+from models import AddressBook, Contact
+
+class SearchSession:
+    """在 AddressBook.search_contacts 之上的搜尋工作階段
+
+    - 查詢加長時（例如「台」→「台北」），結果只會縮小，直接從較短查詢的結果中篩選
+    - 以 (搜尋類型, 查詢字串) 為鍵的 LRU 快取，倒退再重新輸入幾乎不需要成本（進階查詢區分大小寫）
+    - AddressBook.version 改變（新增、更新、刪除）時整個快取失效
+    """
+
+    def __init__(self, address_book: AddressBook, cache_size: int = 128):
+        self.address_book = address_book
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[Tuple[str, str], List[Contact]]" = OrderedDict()
+        self._version = address_book.version
+        self._last: Optional[Tuple[str, str]] = None
+
+    def clear(self):
+        self._cache.clear()
+        self._last = None
+
+    def search(self, query: str, search_type: str) -> List[Contact]:
+        """回傳符合的聯絡人；回傳的列表由快取共用，請勿直接修改"""
+        if not query:
+            return []
+
+        version = self.address_book.version
+        if version != self._version:
+            self.clear()
+            self._version = version
+
+        # 進階查詢區分大小寫（OR/AND/NOT 只有大寫是運算子、欄位:=值 為完全相同），以原字串為鍵
+        key = (search_type, query if search_type == AddressBook.QUERY_SEARCH_TYPE else query.lower())
+        cached = self._cache.get(key)
+        if cached is not None:
+            self._cache.move_to_end(key)
+            self._last = key
+            return cached
+
+        base = self._find_base(key)
+        if base is not None:
+            results = self.address_book.filter_contacts(base, query, search_type)
+        else:
+            results = self.address_book.search_contacts(query, search_type)
+
+        # 搜尋期間資料若有異動，結果可能已過時，不放進快取
+        if self.address_book.version == version:
+            self._store(key, results)
+        return results
+
+    def _find_base(self, key: Tuple[str, str]) -> Optional[List[Contact]]:
+        """找出可以拿來縮小範圍的既有結果（查詢字串是新查詢的子字串）"""
+        search_type, query = key
+        # 模糊搜尋與電話前後綴比對的結果不隨查詢變長而縮小，不能沿用
+        if not self.address_book.is_refinable(search_type, query):
+            return None
+        if self._last is not None and self._last[0] == search_type and self._last[1] in query:
+            base = self._cache.get(self._last)
+            if base is not None:
+                return base
+        # 依序嘗試較短的前綴，例如倒退後重新輸入
+        for length in range(len(query) - 1, 0, -1):
+            base = self._cache.get((search_type, query[:length]))
+            if base is not None:
+                return base
+        return None
+
+    def _store(self, key: Tuple[str, str], results: List[Contact]):
+        self._cache[key] = results
+        self._cache.move_to_end(key)
+        self._last = key
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
@@ -0,0 +1,340 @@
+import json
+import marshal
+import multiprocessing
+import os
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
+from typing import List, Dict, Tuple, Iterable, Optional
+from storage import Storage, JsonStorage, FileLock, read_json_contacts, write_file_atomic
+
+# 建立新的分片目錄時使用的分片數（既有目錄以 manifest.json 記錄的為準）
+SHARDS_ENV = "ADDRESSBOOK_SHARDS"
+DEFAULT_SHARDS = 8
+
+# 工作程序保存的欄位（與 Contact 的欄位順序相同）
+FIELDS = ("name", "phone", "email", "address")
+
+
+def shard_of(name: str, count: int) -> int:
+    """依姓名決定分片；CRC32 不像內建 hash 會隨程序改變，每次執行與每個程序都相同"""
+    return zlib.crc32(name.encode("utf-8")) % count
+
+
+class _ShardRows:
+    """工作程序中的一個分片：各欄位轉成小寫後依列號存成清單，供子字串比對"""
+
+    def __init__(self, rows: List[Tuple]):
+        # rows 為 (序號, 姓名, 電話, 電子郵件, 地址)，姓名不重複；逐欄一次建立比逐筆 put 快
+        self.seqs: List[int] = [row[0] for row in rows]
+        self.names: List[Optional[str]] = [row[1] for row in rows]
+        self.columns: Dict[str, List[str]] = {
+            field: [row[position].lower() for row in rows] for position, field in enumerate(FIELDS, 1)
+        }
+        self.rows: Dict[str, int] = {name: row for row, name in enumerate(self.names)}
+
+    def put(self, seq: int, values: List[str]):
+        name = values[0]
+        row = self.rows.get(name)
+        if row is None:
+            self.rows[name] = len(self.names)
+            self.names.append(name)
+            self.seqs.append(seq)
+            for field, value in zip(FIELDS, values):
+                self.columns[field].append(value.lower())
+            return
+        self.seqs[row] = seq
+        for field, value in zip(FIELDS, values):
+            self.columns[field][row] = value.lower()
+
+    def delete(self, name: str):
+        row = self.rows.pop(name, None)
+        if row is None:
+            return
+        # 清空的欄位不會符合任何非空的查詢
+        self.names[row] = None
+        for column in self.columns.values():
+            column[row] = ""
+
+    def search(self, query: str, fields: Iterable[str]) -> List[Tuple[int, str]]:
+        rows = set()
+        for field in fields:
+            rows.update(row for row, value in enumerate(self.columns[field]) if query in value)
+        return [(self.seqs[row], self.names[row]) for row in rows]
+
+
+# 以下函式在工作程序中執行；每個工作程序負責固定的幾個分片，資料保存在 _worker_shards
+_worker_shards: Dict[int, _ShardRows] = {}
+
+
+def _load_shards(shards: List[Tuple[int, str, str]]) -> bytes:
+    """讀取並解析分片檔，保留一份供之後搜尋
+
+    回傳以 marshal 編碼的 [(分片編號, [(序號, 姓名, 電話, 電子郵件, 地址), ...]), ...]，
+    比 pickle 逐筆編碼快得多。
+    """
+    result = []
+    for index, filename, journal_filename in shards:
+        rows = [
+            (item["seq"], item["name"], item["phone"], item["email"], item["address"])
+            for item in read_json_contacts(filename, journal_filename).values()
+        ]
+        _worker_shards[index] = _ShardRows(rows)
+        result.append((index, rows))
+    return marshal.dumps(result)
+
+
+def _reset_shard(index: int, rows: List[Tuple]):
+    _worker_shards[index] = _ShardRows(rows)
+
+
+def _put_rows(index: int, rows: List[Tuple]):
+    shard = _worker_shards[index]
+    for seq, *values in rows:
+        shard.put(seq, values)
+
+
+def _delete_row(index: int, name: str):
+    _worker_shards[index].delete(name)
+
+
+def _search_shards(indexes: List[int], query: str, fields: List[str]) -> List[Tuple[int, str]]:
+    matches = []
+    for index in indexes:
+        matches.extend(_worker_shards[index].search(query, fields))
+    # 先在工作程序中排序，主程序合併時只需合併幾段已排序的結果
+    matches.sort()
+    return matches
+
+
+class _Sequenced:
+    """寫入分片檔時附上序號的聯絡人：分片打散了新增順序，載入時依序號還原"""
+    __slots__ = ("contact", "seq")
+
+    def __init__(self, contact, seq: int):
+        self.contact = contact
+        self.seq = seq
+
+    @property
+    def name(self) -> str:
+        return self.contact.name
+
+    def to_dict(self) -> Dict:
+        values = self.contact.to_dict()
+        values["seq"] = self.seq
+        return values
+
+
+class _ShardView:
+    """AddressBook 聯絡人中屬於某個分片的部分（背景寫入時才走訪，每次都反映最新內容）
+
+    contacts 通常是 AddressBook 的 dict.values()，此時只走訪分片的成員並以姓名查出聯絡人，
+    寫入一個分片的成本與該分片的大小成正比，而不是整個通訊錄；其他可迭代物件則逐一篩選。
+    """
+
+    def __init__(self, contacts: Iterable, members: Dict[str, int]):
+        self._contacts = contacts
+        self._members = members
+
+    def __iter__(self):
+        members = self._members
+        lookup = getattr(self._contacts, "mapping", None)
+        if lookup is not None:
+            for name, seq in list(members.items()):
+                contact = lookup.get(name)
+                if contact is not None:
+                    yield _Sequenced(contact, seq)
+            return
+        for contact in self._contacts:
+            seq = members.get(contact.name)
+            if seq is not None:
+                yield _Sequenced(contact, seq)
+
+
+class ShardedStorage(Storage):
+    """把聯絡人依姓名的雜湊分散到多個 JSON 檔的後端，載入與搜尋由多個程序平行處理
+
+    目錄中有 manifest.json（分片數）與 shard-000.json 等分片檔，每個分片都是一個
+    JsonStorage，鎖、合併其他程式的修改與背景寫入都與 JSON 後端相同，但異動時只需重寫
+    該姓名所在的分片。每個工作程序負責固定的幾個分片：載入時各自解析分片檔，並保留一份
+    轉成小寫的欄位，之後的子字串搜尋分送到所有工作程序同時掃描再合併。
+    分片檔中的每位聯絡人另外記錄序號，載入與搜尋結果都依序號還原新增順序。
+    """
+
+    MANIFEST = "manifest.json"
+    search_pushdown = True
+
+    # 搜尋類型對應的欄位
+    SEARCH_FIELDS = {
+        "姓名": ["name"],
+        "電話": ["phone"],
+        "電子郵件": ["email"],
+        "地址": ["address"],
+        "全欄位": ["name", "phone", "email", "address"],
+    }
+
+    def __init__(self, directory: str = "contacts.shards", shards: Optional[int] = None,
+                 workers: Optional[int] = None, write_behind: bool = False):
+        self.filename = directory
+        os.makedirs(directory, exist_ok=True)
+        self.count = self._read_manifest(shards)
+        self._shards = [
+            JsonStorage(os.path.join(directory, f"shard-{index:03d}.json"), write_behind=write_behind)
+            for index in range(self.count)
+        ]
+        # 每個工作程序只有一個行程，送給它的工作依序執行，搜尋一定看得到先前送出的異動；
+        # 使用 spawn 而非 fork，避免複製圖形介面或背景寫入執行緒的狀態
+        workers = max(1, min(workers or os.cpu_count() or 1, self.count))
+        context = multiprocessing.get_context("spawn")
+        self._workers = [ProcessPoolExecutor(max_workers=1, mp_context=context) for _ in range(workers)]
+        # 各分片目前的聯絡人：姓名 -> 序號
+        self._members: List[Dict[str, int]] = [{} for _ in range(self.count)]
+        self._next_seq = 0
+
+    def _read_manifest(self, shards: Optional[int]) -> int:
+        """讀取分片數；新的目錄依 shards 或 ADDRESSBOOK_SHARDS 建立"""
+        manifest = os.path.join(self.filename, self.MANIFEST)
+        requested = shards or int(os.environ.get(SHARDS_ENV) or 0) or None
+        lock = FileLock(manifest + ".lock")
+        try:
+            with lock:
+                if os.path.exists(manifest):
+                    with open(manifest, 'r', encoding='utf-8') as f:
+                        count = json.load(f)["shards"]
+                    if requested is not None and requested != count:
+                        raise ValueError(f"{self.filename} 已分成 {count} 個分片，"
+                                         f"要改變分片數請轉換到新的目錄（python storage.py 舊目錄 新目錄）")
+                    return count
+                count = requested or DEFAULT_SHARDS
+                if count < 1:
+                    raise ValueError("分片數至少為 1")
+                write_file_atomic(manifest, lambda f: json.dump({"shards": count}, f))
+                return count
+        finally:
+            lock.close()
+
+    def _worker(self, index: int) -> ProcessPoolExecutor:
+        return self._workers[index % len(self._workers)]
+
+    def _assign(self, index: int, name: str) -> int:
+        """回傳聯絡人的序號，新的姓名取下一個序號"""
+        members = self._members[index]
+        seq = members.get(name)
+        if seq is None:
+            seq = members[name] = self._next_seq
+            self._next_seq += 1
+        return seq
+
+    @staticmethod
+    def _row(contact, seq: int) -> Tuple:
+        return (seq, contact.name, contact.phone, contact.email, contact.address)
+
+    def attach(self, lock, metrics=None):
+        super().attach(lock, metrics)
+        for shard in self._shards:
+            shard.attach(lock, metrics)
+
+    def load(self) -> List[Dict]:
+        for shard in self._shards:
+            shard.flush()
+        with ExitStack() as stack:
+            # 依分片編號取得所有檔案鎖（固定順序不會互相等待），由工作程序讀取
+            for shard in self._shards:
+                stack.enter_context(shard.exclusive())
+            futures = [
+                worker.submit(_load_shards, [
+                    (index, shard.filename, shard.journal_filename)
+                    for index, shard in enumerate(self._shards) if self._worker(index) is worker
+                ])
+                for worker in self._workers
+            ]
+            rows = []
+            self._members = [{} for _ in range(self.count)]
+            for future in futures:
+                for index, shard_rows in marshal.loads(future.result()):
+                    self._members[index] = {name: seq for seq, name, *_ in shard_rows}
+                    rows.extend(shard_rows)
+            for shard in self._shards:
+                shard.mark_synced()
+        rows.sort()
+        self._next_seq = rows[-1][0] + 1 if rows else 0
+        return [
+            {"name": name, "phone": phone, "email": email, "address": address}
+            for _, name, phone, email, address in rows
+        ]
+
+    def put(self, contact, contacts: Iterable):
+        index = shard_of(contact.name, self.count)
+        seq = self._assign(index, contact.name)
+        self._shards[index].put(_Sequenced(contact, seq), _ShardView(contacts, self._members[index]))
+        self._worker(index).submit(_put_rows, index, [self._row(contact, seq)])
+
+    def put_many(self, added: Iterable, contacts: Iterable):
+        groups: Dict[int, List[_Sequenced]] = {}
+        for contact in added:
+            index = shard_of(contact.name, self.count)
+            groups.setdefault(index, []).append(_Sequenced(contact, self._assign(index, contact.name)))
+        for index, items in groups.items():
+            self._shards[index].put_many(items, _ShardView(contacts, self._members[index]))
+            self._worker(index).submit(_put_rows, index, [self._row(item.contact, item.seq) for item in items])
+
+    def delete(self, name: str, contacts: Iterable):
+        index = shard_of(name, self.count)
+        self._members[index].pop(name, None)
+        self._shards[index].delete(name, _ShardView(contacts, self._members[index]))
+        self._worker(index).submit(_delete_row, index, name)
+
+    def save_all(self, contacts: Iterable):
+        """重寫所有分片，序號依目前順序重新編排"""
+        groups: List[List[_Sequenced]] = [[] for _ in range(self.count)]
+        members: List[Dict[str, int]] = [{} for _ in range(self.count)]
+        seq = -1
+        for seq, contact in enumerate(contacts):
+            index = shard_of(contact.name, self.count)
+            groups[index].append(_Sequenced(contact, seq))
+            members[index][contact.name] = seq
+        self._members = members
+        self._next_seq = seq + 1
+        for index, items in enumerate(groups):
+            self._shards[index].save_all(items)
+            self._worker(index).submit(_reset_shard, index, [self._row(item.contact, item.seq) for item in items])
+
+    def search(self, query: str, search_type: str) -> Optional[List[str]]:
+        """分送到所有工作程序平行掃描，回傳依新增順序排列的姓名"""
+        fields = self.SEARCH_FIELDS.get(search_type)
+        if fields is None:
+            return None
+        query = query.lower()
+        if not query:
+            return []
+        futures = [
+            worker.submit(_search_shards, [
+                index for index in range(self.count) if self._worker(index) is worker
+            ], query, fields)
+            for worker in self._workers
+        ]
+        matches = []
+        for future in futures:
+            matches.extend(future.result())
+        # 各段已依序號排序，合併排序只需線性時間
+        matches.sort()
+        return [name for _, name in matches]
+
+    def changed(self) -> bool:
+        return any(shard.changed() for shard in self._shards)
+
+    def fingerprint(self) -> Optional[str]:
+        # 啟動快取不會經過 load()，工作程序就沒有搜尋用的資料，因此不使用快取
+        return None
+
+    def flush(self):
+        for shard in self._shards:
+            shard.flush()
+
+    def close(self):
+        try:
+            for shard in self._shards:
+                shard.close()
+        finally:
+            for worker in self._workers:
+                worker.shutdown()
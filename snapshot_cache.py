@@ -0,0 +1,83 @@
+import gc
+import hashlib
+import marshal
+import os
+import sys
+from typing import Dict, Iterable, Optional
+
+from storage import write_file_atomic
+
+
+def file_fingerprint(filenames: Iterable[str]) -> str:
+    """以修改時間、大小與內容雜湊計算多個檔案的指紋（不存在的檔案也計入）"""
+    digest = hashlib.blake2b(digest_size=16)
+    for filename in filenames:
+        try:
+            with open(filename, 'rb') as f:
+                stat = os.fstat(f.fileno())
+                digest.update(f"{stat.st_mtime_ns}:{stat.st_size}\n".encode("ascii"))
+                for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                    digest.update(chunk)
+        except FileNotFoundError:
+            digest.update(b"missing\n")
+    return digest.hexdigest()
+
+
+class SnapshotCache:
+    """啟動快取：解析好的聯絡人與建好的搜尋索引
+
+    以 marshal 儲存（只包含 dict、list、set、str、int 等內建型別），載入時不需要
+    解析 JSON 或重建索引，也不會像 pickle 一樣在載入時執行任意程式碼。
+    marshal 格式隨 Python 版本改變，因此版本不同時視為失效。
+    快取以資料檔的指紋為鍵，資料檔被修改後自動失效，下次關閉時重新寫入。
+    """
+
+    MAGIC = b"ABKC"
+    FORMAT_VERSION = 1
+
+    def __init__(self, filename: str):
+        self.filename = filename
+
+    def load(self, fingerprint: str) -> Optional[Dict]:
+        """回傳快取內容；不存在、損壞或指紋不符時回傳 None"""
+        try:
+            with open(self.filename, 'rb') as f:
+                data = f.read()
+        except OSError:
+            return None
+        if not data.startswith(self.MAGIC):
+            return None
+        # marshal.load 直接讀檔案物件時會逐段呼叫 read，比一次讀入後 loads 慢數倍；
+        # 載入期間暫停垃圾回收，避免建立大量 set 與 tuple 時反覆觸發
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            state = marshal.loads(memoryview(data)[len(self.MAGIC):])
+        except (EOFError, ValueError, TypeError):
+            return None
+        finally:
+            if gc_enabled:
+                gc.enable()
+        if (not isinstance(state, dict)
+                or state.get("format") != self.FORMAT_VERSION
+                or state.get("python") != sys.version
+                or state.get("fingerprint") != fingerprint):
+            return None
+        return state
+
+    def save(self, fingerprint: str, state: Dict):
+        state = dict(state, format=self.FORMAT_VERSION, python=sys.version, fingerprint=fingerprint)
+
+        data = marshal.dumps(state)
+
+        def write(f):
+            f.write(self.MAGIC)
+            f.write(data)
+
+        write_file_atomic(self.filename, write, binary=True)
+
+    def remove(self):
+        try:
+            os.remove(self.filename)
+        except FileNotFoundError:
+            pass
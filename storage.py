@@ -0,0 +1,912 @@
+import atexit
+import json
+import mmap
+import os
+import stat
+import struct
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import List, Dict, Iterable, Optional, Callable, Tuple
+
+# 跨程序的建議式檔案鎖：POSIX 使用 fcntl.lockf（在 NFS 等網路磁碟上也有效），Windows 使用 msvcrt
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+try:
+    import msvcrt
+except ImportError:
+    msvcrt = None
+
+# 環境變數：不修改程式碼即可切換儲存後端
+BACKEND_ENV = "ADDRESSBOOK_BACKEND"
+FILE_ENV = "ADDRESSBOOK_FILE"
+
+# 新檔案的權限：與一般 open() 建立的檔案相同（0666 扣除 umask），共用目錄中其他使用者才能讀寫。
+# os.umask 只能以「設定後還原」的方式讀取，在匯入時（尚未啟動其他執行緒）讀一次
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+NEW_FILE_MODE = 0o666 & ~_UMASK
+
+
+class Storage:
+    """儲存後端介面
+
+    AddressBook 在記憶體中維護聯絡人，後端只負責持久化。
+    contacts 參數為目前所有聯絡人（具有 to_dict() 的物件），
+    只需要寫入單筆資料的後端可以忽略它。
+    """
+
+    # 由 attach() 設定的耗時統計（instrumentation.Metrics），未設定時不記錄
+    metrics = None
+    # 後端能自行執行子字串搜尋時為 True（SqliteStorage 以 SQL 查詢、ShardedStorage 以多個程序平行掃描），
+    # AddressBook 的子字串搜尋會直接交給後端，不必建立搜尋索引
+    search_pushdown = False
+
+    def load(self) -> List[Dict]:
+        raise NotImplementedError
+
+    def put(self, contact, contacts: Iterable):
+        """新增或更新一位聯絡人"""
+        raise NotImplementedError
+
+    def put_many(self, added: Iterable, contacts: Iterable):
+        """新增或更新多位聯絡人，預設直接寫入完整快照"""
+        self.save_all(contacts)
+
+    def delete(self, name: str, contacts: Iterable):
+        """刪除一位聯絡人"""
+        raise NotImplementedError
+
+    def save_all(self, contacts: Iterable):
+        """寫入完整快照"""
+        raise NotImplementedError
+
+    def search(self, query: str, search_type: str) -> Optional[List[str]]:
+        """由後端執行搜尋並回傳符合的姓名；不支援時回傳 None"""
+        return None
+
+    def attach(self, lock, metrics=None):
+        """AddressBook 建立時呼叫，傳入保護聯絡人資料的鎖（背景寫入時需要）與耗時統計"""
+        self.lock = lock
+        self.metrics = metrics
+
+    def changed(self) -> bool:
+        """資料是否在上次載入後被其他程式修改；不支援偵測的後端一律回傳 False"""
+        return False
+
+    def fingerprint(self) -> Optional[str]:
+        """資料檔內容的指紋，供啟動快取判斷是否仍然有效
+
+        只有記憶體中的聯絡人與檔案內容一致時才回傳；不支援或不一致時回傳 None。
+        """
+        return None
+
+    def flush(self):
+        """等待尚未寫入的異動完成"""
+        pass
+
+    def close(self):
+        pass
+
+
+class FileLock:
+    """以 <資料檔>.lock 實作的跨程序建議式鎖，同一程序內可重入
+
+    鎖檔的內容是世代編號，每次寫入資料檔後遞增。網路磁碟上的修改時間精度
+    可能只有數秒，搭配世代編號才能可靠地判斷檔案是否被其他程式改過。
+    """
+
+    # Windows 鎖定的位元組位置，與存放世代編號的檔頭分開，讀取編號時不受鎖影響
+    WINDOWS_LOCK_OFFSET = 1 << 20
+
+    def __init__(self, filename: str):
+        self.filename = filename
+        # 整個生命週期只開啟一次：POSIX 鎖在程序關閉該檔案的任何一個描述子時就會釋放。
+        # 以 0666 建立（再扣除 umask），共用磁碟上其他使用者才能以讀寫模式開啟並取得鎖
+        self._fd = os.open(filename, os.O_RDWR | os.O_CREAT, 0o666)
+        self._thread_lock = threading.RLock()
+        self._depth = 0
+
+    def acquire(self):
+        self._thread_lock.acquire()
+        if self._depth == 0:
+            try:
+                if fcntl is not None:
+                    fcntl.lockf(self._fd, fcntl.LOCK_EX)
+                elif msvcrt is not None:
+                    os.lseek(self._fd, self.WINDOWS_LOCK_OFFSET, os.SEEK_SET)
+                    while True:
+                        try:
+                            msvcrt.locking(self._fd, msvcrt.LK_LOCK, 1)
+                            break
+                        except OSError:
+                            # LK_LOCK 重試約 10 秒後放棄，其他程式仍在寫入時繼續等待
+                            continue
+            except BaseException:
+                self._thread_lock.release()
+                raise
+        self._depth += 1
+
+    def release(self):
+        self._depth -= 1
+        if self._depth == 0:
+            if fcntl is not None:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN)
+            elif msvcrt is not None:
+                os.lseek(self._fd, self.WINDOWS_LOCK_OFFSET, os.SEEK_SET)
+                msvcrt.locking(self._fd, msvcrt.LK_UNLCK, 1)
+        self._thread_lock.release()
+
+    def __enter__(self) -> "FileLock":
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+
+    def generation(self) -> int:
+        with self._thread_lock:
+            os.lseek(self._fd, 0, os.SEEK_SET)
+            content = os.read(self._fd, 32)
+        try:
+            return int(content.split(b"\n", 1)[0])
+        except ValueError:
+            return 0
+
+    def next_generation(self) -> int:
+        """遞增世代編號（需持有鎖）"""
+        with self._thread_lock:
+            generation = self.generation() + 1
+            os.lseek(self._fd, 0, os.SEEK_SET)
+            os.write(self._fd, f"{generation}\n".encode("ascii").ljust(32))
+        return generation
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
+def write_file_atomic(filename: str, write: Callable, binary: bool = False, newline: Optional[str] = None):
+    """先寫入同目錄的暫存檔並 fsync，再以 os.replace 原子性地取代目標檔
+
+    寫入途中當機時原本的檔案保持完整，不會出現只寫一半的內容。
+    binary 為 True 時 write 收到的是二進位檔案物件；newline 與 open() 的參數相同。
+    """
+    import tempfile
+
+    directory = os.path.dirname(os.path.abspath(filename))
+    fd, temp_filename = tempfile.mkstemp(prefix=os.path.basename(filename) + ".", suffix=".tmp", dir=directory)
+    try:
+        # mkstemp 建立的暫存檔權限為 0600，os.replace 會沿用；改成原本檔案的權限，新檔案則依 umask
+        if hasattr(os, "fchmod"):
+            try:
+                mode = stat.S_IMODE(os.stat(filename).st_mode)
+            except FileNotFoundError:
+                mode = NEW_FILE_MODE
+            os.fchmod(fd, mode)
+        with (os.fdopen(fd, 'wb') if binary else os.fdopen(fd, 'w', encoding='utf-8', newline=newline)) as f:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_filename, filename)
+    except BaseException:
+        if os.path.exists(temp_filename):
+            os.remove(temp_filename)
+        raise
+    # 目錄本身也要 fsync，rename 才算真正寫入磁碟（Windows 不支援開啟目錄）
+    if hasattr(os, "O_DIRECTORY"):
+        dir_fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+
+class WriteBehindWriter:
+    """背景寫入執行緒：合併短時間內的多次異動，只寫一次
+
+    schedule() 只標記資料已變更並立即返回；執行緒等待 delay 秒讓連續的異動
+    累積後才呼叫 write()。flush() 會等到目前所有異動都寫入為止。
+    寫入失敗時異動仍保留，等待一段時間（每次失敗加倍）後重試。
+    """
+
+    # 寫入失敗後第一次重試前等待的秒數，之後每次加倍，最多 MAX_RETRY_DELAY 秒
+    RETRY_DELAY = 1.0
+    MAX_RETRY_DELAY = 60.0
+
+    def __init__(self, write: Callable[[], None], delay: float = 0.3):
+        self._write = write
+        self._delay = delay
+        self._condition = threading.Condition()
+        self._dirty = False
+        self._writing = False
+        self._flush_requested = False
+        self._closed = False
+        self._error: Optional[BaseException] = None
+        self._thread = threading.Thread(target=self._run, name="contacts-writer", daemon=True)
+        self._thread.start()
+        # 程式結束前確保資料寫入（main.main 也會在關閉視窗時明確呼叫 close）
+        atexit.register(self.close)
+
+    def schedule(self):
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("背景寫入已關閉")
+            self._dirty = True
+            self._condition.notify_all()
+
+    def _run(self):
+        retry_delay = 0.0
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._dirty or self._closed)
+                if not self._dirty:
+                    return
+                # 合併視窗（上次失敗時為重試前的等待）：等待更多異動，flush 或關閉時提前結束
+                self._condition.wait_for(lambda: self._flush_requested or self._closed,
+                                         timeout=retry_delay or self._delay)
+                self._dirty = False
+                self._writing = True
+            error = None
+            try:
+                self._write()
+                retry_delay = 0.0
+            except Exception as e:
+                error = e
+                retry_delay = min(max(retry_delay * 2, self.RETRY_DELAY), self.MAX_RETRY_DELAY)
+                print(f"寫入聯絡人資料失敗，{retry_delay:g} 秒後重試：{e}", file=sys.stderr)
+            finally:
+                with self._condition:
+                    self._writing = False
+                    self._error = error
+                    if error is not None:
+                        # 保留異動等待重試；正在等待的 flush 會收到這個錯誤
+                        self._dirty = True
+                        self._flush_requested = False
+                    elif not self._dirty:
+                        self._flush_requested = False
+                    self._condition.notify_all()
+                    if error is not None and self._closed:
+                        # 關閉時的最後一次嘗試仍失敗，放棄
+                        return
+
+    def flush(self):
+        """等待所有已排程的寫入完成；寫入失敗時拋出該錯誤（異動仍保留，之後會再重試）"""
+        with self._condition:
+            if (self._dirty or self._writing) and not self._closed:
+                # 忽略先前失敗的結果，立即重試並等待這次的結果
+                self._error = None
+                self._flush_requested = True
+                self._condition.notify_all()
+                self._condition.wait_for(
+                    lambda: (not self._dirty and not self._writing) or self._error is not None)
+            error, self._error = self._error, None
+        if error is not None:
+            raise error
+
+    def close(self):
+        if self._closed:
+            return
+        try:
+            self.flush()
+        finally:
+            with self._condition:
+                self._closed = True
+                self._condition.notify_all()
+            self._thread.join()
+            atexit.unregister(self.close)
+
+
+def read_json_contacts(filename: str, journal_filename: str) -> Dict[str, Dict]:
+    """讀取 JSON 快照並重播日誌，回傳 姓名 -> 聯絡人資料；呼叫端應持有檔案鎖"""
+    contacts: Dict[str, Dict] = {}
+    if os.path.exists(filename):
+        with open(filename, 'r', encoding='utf-8') as f:
+            for item in json.load(f):
+                contacts[item["name"]] = item
+    # 在快照之上重播日誌（日誌模式關閉時也重播，避免遺失尚未壓縮的異動）
+    _replay_journal(journal_filename, contacts)
+    return contacts
+
+
+def _replay_journal(journal_filename: str, contacts: Dict[str, Dict]):
+    """將日誌中的異動依序套用到快照上"""
+    if not os.path.exists(journal_filename):
+        return
+    with open(journal_filename, 'r+', encoding='utf-8', newline='') as f:
+        content = f.read()
+        # 最後一筆可能在寫入途中中斷，截掉不完整的尾端，避免與下一筆紀錄黏在一起
+        if content and not content.endswith("\n"):
+            content = content[:content.rfind("\n") + 1]
+            f.seek(0)
+            f.write(content)
+            f.truncate()
+    for line in content.splitlines():
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError:
+            continue
+        if record.get("op") == "put":
+            contacts[record["contact"]["name"]] = record["contact"]
+        elif record.get("op") == "delete":
+            contacts.pop(record["name"], None)
+
+
+class JsonStorage(Storage):
+    """JSON 檔案後端，可選擇附加式日誌模式或背景寫入模式
+
+    快照一律以暫存檔加 os.replace 原子性地寫入。多個程式共用同一個檔案時，
+    寫入前後會持有 <filename>.lock；若檔案在上次載入後已被其他程式修改，
+    只把自己異動過的聯絡人合併進檔案中的最新內容，不會覆蓋別人的修改。
+    """
+
+    # 日誌檔超過此大小（位元組）時自動壓縮回 JSON 快照
+    JOURNAL_COMPACT_THRESHOLD = 1024 * 1024
+
+    def __init__(self, filename: str = "contacts.json", journal: bool = False,
+                 write_behind: bool = False, write_delay: float = 0.3):
+        self.filename = filename
+        # 日誌模式：每次異動只附加一筆紀錄到 <filename>.journal，而不是重寫整個檔案
+        self.journal = journal
+        self.journal_filename = filename + ".journal"
+        self.lock = threading.RLock()
+        # 同時只允許一個執行緒寫入快照
+        self._write_lock = threading.Lock()
+        # 背景寫入模式：異動時只排程，由背景執行緒合併後寫入快照（日誌模式本身已夠快，不使用）
+        self._contacts_view: Iterable = ()
+        self._file_lock = FileLock(filename + ".lock")
+        # 上次載入或寫入後的檔案狀態；None 表示記憶體中缺少其他程式的修改，下次寫入時需要合併
+        self._signature: Optional[Tuple] = self.signature()
+        # 尚未寫入快照的異動：姓名 -> True（新增或更新）/ False（刪除），合併時使用
+        self._pending: Dict[str, bool] = {}
+        self._writer = WriteBehindWriter(self._write_scheduled, write_delay) if write_behind and not journal else None
+
+    def signature(self) -> Tuple:
+        """以 (修改時間, 大小) 與鎖檔中的世代編號描述目前的檔案狀態"""
+        parts = []
+        for filename in (self.filename, self.journal_filename):
+            try:
+                stat = os.stat(filename)
+                parts.append((stat.st_mtime_ns, stat.st_size))
+            except FileNotFoundError:
+                parts.append(None)
+        return tuple(parts) + (self._file_lock.generation(),)
+
+    def changed(self) -> bool:
+        # 自己正在寫入時檔案狀態暫時不一致，留到下次再檢查
+        if not self._write_lock.acquire(blocking=False):
+            return False
+        try:
+            return self._signature is None or self.signature() != self._signature
+        finally:
+            self._write_lock.release()
+
+    def fingerprint(self) -> Optional[str]:
+        from snapshot_cache import file_fingerprint
+
+        self.flush()
+        with self._write_lock, self._file_lock:
+            if self._signature is None or self.signature() != self._signature:
+                return None
+            return file_fingerprint([self.filename, self.journal_filename])
+
+    def load(self) -> List[Dict]:
+        self.flush()
+        with self.exclusive():
+            contacts = self._read_contacts()
+            self.mark_synced()
+        return list(contacts.values())
+
+    @contextmanager
+    def exclusive(self):
+        """持有寫入鎖與檔案鎖，期間本程式的其他執行緒與其他程式都不會寫入這個檔案"""
+        with self._write_lock, self._file_lock:
+            yield
+
+    def mark_synced(self):
+        """記錄目前的檔案狀態：呼叫端已在 exclusive() 中讀取了完整內容（例如由其他程序讀取）"""
+        self._signature = self.signature()
+
+    def _read_contacts(self) -> Dict[str, Dict]:
+        return read_json_contacts(self.filename, self.journal_filename)
+
+    def _append_journal(self, record: Dict, contacts: Iterable):
+        """附加一筆異動紀錄，日誌過大時壓縮"""
+        with self._write_lock, self._file_lock:
+            unchanged = self.signature() == self._signature
+            with open(self.journal_filename, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                size = f.tell()
+            self._file_lock.next_generation()
+            # 其他程式的日誌紀錄也在檔案中，只有原本就同步時才視為已同步
+            if unchanged:
+                self._signature = self.signature()
+        if size > self.JOURNAL_COMPACT_THRESHOLD:
+            self.save_all(contacts)
+
+    def _snapshot_changed(self, contacts: Iterable):
+        if self._writer is None:
+            self.save_all(contacts)
+        else:
+            # contacts 是 AddressBook 的即時檢視，背景執行緒會在鎖內複製
+            self._contacts_view = contacts
+            self._writer.schedule()
+
+    def _take_pending(self) -> Dict[str, bool]:
+        pending, self._pending = self._pending, {}
+        return pending
+
+    def _write_scheduled(self):
+        start = time.perf_counter()
+        with self.lock:
+            items = [contact.to_dict() for contact in self._contacts_view]
+            pending = self._take_pending()
+        self._write_snapshot(items, pending)
+        # 背景寫入不會計入呼叫端的 save，另外記錄
+        if self.metrics is not None:
+            self.metrics.record("background_write", time.perf_counter() - start)
+
+    def put(self, contact, contacts: Iterable):
+        if self.journal:
+            self._append_journal({"op": "put", "contact": contact.to_dict()}, contacts)
+        else:
+            self._pending[contact.name] = True
+            self._snapshot_changed(contacts)
+
+    def put_many(self, added: Iterable, contacts: Iterable):
+        for contact in added:
+            self._pending[contact.name] = True
+        if self.journal:
+            self.save_all(contacts)
+        else:
+            self._snapshot_changed(contacts)
+
+    def delete(self, name: str, contacts: Iterable):
+        if self.journal:
+            self._append_journal({"op": "delete", "name": name}, contacts)
+        else:
+            self._pending[name] = False
+            self._snapshot_changed(contacts)
+
+    def save_all(self, contacts: Iterable):
+        self._write_snapshot([contact.to_dict() for contact in contacts], self._take_pending())
+
+    def _write_snapshot(self, items: List[Dict], pending: Dict[str, bool]):
+        try:
+            with self._write_lock, self._file_lock:
+                merged = self._signature is None or self.signature() != self._signature
+                if merged:
+                    items = self._merge(items, pending)
+                write_file_atomic(self.filename, lambda f: json.dump(items, f, ensure_ascii=False, indent=2))
+                # 快照已包含所有異動，清空日誌
+                if os.path.exists(self.journal_filename):
+                    open(self.journal_filename, 'w', encoding='utf-8').close()
+                self._file_lock.next_generation()
+                # 合併後記憶體仍缺少其他程式的修改，直到 AddressBook.refresh() 重新載入
+                self._signature = None if merged else self.signature()
+        except BaseException:
+            # 寫入失敗時保留這些異動，下次寫入仍會合併
+            with self.lock:
+                for name, present in pending.items():
+                    self._pending.setdefault(name, present)
+            raise
+
+    def _merge(self, items: List[Dict], pending: Dict[str, bool]) -> List[Dict]:
+        """以檔案中的最新內容為基礎，只套用自己異動過的聯絡人"""
+        contacts = self._read_contacts()
+        ours = {item["name"]: item for item in items}
+        for name, present in pending.items():
+            if present and name in ours:
+                contacts[name] = ours[name]
+            else:
+                contacts.pop(name, None)
+        return list(contacts.values())
+
+    def flush(self):
+        if self._writer is not None:
+            self._writer.flush()
+
+    def close(self):
+        try:
+            if self._writer is not None:
+                self._writer.close()
+        finally:
+            self._file_lock.close()
+
+
+class SqliteStorage(Storage):
+    """SQLite 後端：WAL 模式、姓名唯一索引、電話與電子郵件次要索引，子字串搜尋直接在 SQL 中執行"""
+
+    search_pushdown = True
+
+    # 搜尋類型對應的欄位
+    SEARCH_COLUMNS = {
+        "姓名": ["name"],
+        "電話": ["phone"],
+        "電子郵件": ["email"],
+        "地址": ["address"],
+        "全欄位": ["name", "phone", "email", "address"],
+    }
+
+    def __init__(self, filename: str = "contacts.db"):
+        # sqlite3 只在使用此後端時才匯入，縮短命令列模式的啟動時間
+        import sqlite3
+
+        self.filename = filename
+        # 介面的即時搜尋在背景執行緒呼叫 search()；sqlite3 模組為 serialized 模式（threadsafety 3），
+        # 連線可跨執行緒使用，AddressBook 搜尋與寫入時也都持有同一把鎖
+        self.conn = sqlite3.connect(filename, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        # 使用 Python 的 str.lower，讓大小寫規則與記憶體搜尋一致（SQLite 的 lower 只處理 ASCII）
+        self.conn.create_function("py_lower", 1, str.lower, deterministic=True)
+        with self.conn:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS contacts (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    name TEXT NOT NULL,
+                    phone TEXT NOT NULL,
+                    email TEXT NOT NULL,
+                    address TEXT NOT NULL
+                )
+            """)
+            self.conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_contacts_name ON contacts(name)")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_contacts_phone ON contacts(phone)")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_contacts_email ON contacts(email)")
+        self._loaded_version = self._data_version()
+
+    def _data_version(self) -> int:
+        # 其他連線（包含其他程式）提交交易後，data_version 就會改變
+        return self.conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def changed(self) -> bool:
+        return self._data_version() != self._loaded_version
+
+    def load(self) -> List[Dict]:
+        self._loaded_version = self._data_version()
+        rows = self.conn.execute("SELECT name, phone, email, address FROM contacts ORDER BY id")
+        return [
+            {"name": name, "phone": phone, "email": email, "address": address}
+            for name, phone, email, address in rows
+        ]
+
+    def put(self, contact, contacts: Iterable = ()):
+        with self.conn:
+            self.conn.execute("""
+                INSERT INTO contacts (name, phone, email, address) VALUES (?, ?, ?, ?)
+                ON CONFLICT(name) DO UPDATE SET
+                    phone = excluded.phone, email = excluded.email, address = excluded.address
+            """, (contact.name, contact.phone, contact.email, contact.address))
+
+    def put_many(self, added: Iterable, contacts: Iterable = ()):
+        with self.conn:
+            self.conn.executemany("""
+                INSERT INTO contacts (name, phone, email, address) VALUES (?, ?, ?, ?)
+                ON CONFLICT(name) DO UPDATE SET
+                    phone = excluded.phone, email = excluded.email, address = excluded.address
+            """, ((c.name, c.phone, c.email, c.address) for c in added))
+
+    def delete(self, name: str, contacts: Iterable = ()):
+        with self.conn:
+            self.conn.execute("DELETE FROM contacts WHERE name = ?", (name,))
+
+    def save_all(self, contacts: Iterable):
+        with self.conn:
+            self.conn.execute("DELETE FROM contacts")
+            self.conn.executemany(
+                "INSERT INTO contacts (name, phone, email, address) VALUES (?, ?, ?, ?)",
+                ((c.name, c.phone, c.email, c.address) for c in contacts)
+            )
+
+    def search(self, query: str, search_type: str) -> Optional[List[str]]:
+        """不分大小寫的子字串搜尋，回傳依新增順序（id）排列的姓名"""
+        columns = self.SEARCH_COLUMNS.get(search_type)
+        if columns is None:
+            return None
+        query = query.lower()
+        if not query:
+            return []
+        where = " OR ".join(f"instr(py_lower({column}), ?) > 0" for column in columns)
+        rows = self.conn.execute(
+            f"SELECT name FROM contacts WHERE {where} ORDER BY id",
+            [query] * len(columns)
+        )
+        return [name for (name,) in rows]
+
+    def close(self):
+        self.conn.close()
+
+
+class BinaryStorage(Storage):
+    """固定長度紀錄的二進位檔案，以 mmap 存取
+
+    Contact 的每個欄位都有字數上限，因此每位聯絡人可以放進固定大小的槽位：
+    1 位元組旗標，接著每個欄位是 1 位元組的 UTF-8 長度加上固定寬度的資料區
+    （字數上限 × 4 位元組）。第 i 個槽位的位置可以直接算出，隨機讀取為 O(1)，
+    更新只會覆寫該槽位；刪除的槽位會標記為空並在之後新增時重複使用。
+
+    載入時仍會解碼所有槽位（AddressBook 需要完整的聯絡人與索引），開啟時間與筆數成正比。
+    多個程式共用同一個檔案時，寫入期間持有 <filename>.lock；檔案在上次載入後被其他程式
+    修改過時，先重新開啟並重建槽位對照表再寫入，不會兩個程式搶用同一個空槽位。
+    """
+
+    MAGIC = b"ABK1"
+    HEADER = struct.Struct("<4sHHI")    # magic, 格式版本, 紀錄大小, 已使用的槽位數
+    HEADER_SIZE = 64
+    # 欄位名稱與字數上限（與 Contact.MAX_*_LENGTH 相同）
+    FIELD_LIMITS = (("name", 10), ("phone", 15), ("email", 20), ("address", 50))
+    FLAG_EMPTY = 0
+    FLAG_USED = 1
+    # 檔案空間不足時一次擴充的槽位數
+    GROW_SLOTS = 1024
+
+    def __init__(self, filename: str = "contacts.bin"):
+        self.filename = filename
+        self._layout = []
+        offset = 1
+        for field, limit in self.FIELD_LIMITS:
+            width = limit * 4
+            self._layout.append((field, offset, width))
+            offset += 1 + width
+        self.record_size = offset
+        self._slots: Dict[str, int] = {}
+        self._free: List[int] = []
+        self._count = 0
+        self._file = None
+        self._mm = None
+        self._file_lock = FileLock(filename + ".lock")
+        try:
+            with self._file_lock:
+                self._open()
+                # 上次載入或寫入後的世代編號；None 表示記憶體中缺少其他程式的修改
+                self._generation: Optional[int] = self._file_lock.generation()
+        except BaseException:
+            self._file_lock.close()
+            raise
+
+    def _open(self):
+        if not os.path.exists(self.filename) or os.path.getsize(self.filename) < self.HEADER_SIZE:
+            with open(self.filename, 'wb') as f:
+                f.write(self._header(0))
+        self._file = open(self.filename, 'r+b')
+        self._mm = mmap.mmap(self._file.fileno(), 0)
+        magic, version, record_size, count = self.HEADER.unpack_from(self._mm, 0)
+        if magic != self.MAGIC or record_size != self.record_size:
+            self._close_file()
+            raise ValueError(f"不是有效的聯絡人二進位檔：{self.filename}")
+        self._count = count
+
+    def _header(self, count: int) -> bytes:
+        return self.HEADER.pack(self.MAGIC, 1, self.record_size, count).ljust(self.HEADER_SIZE, b"\0")
+
+    def _offset(self, slot: int) -> int:
+        return self.HEADER_SIZE + slot * self.record_size
+
+    def slot_count(self) -> int:
+        """已使用的槽位數（包含已刪除的空槽位）"""
+        return self._count
+
+    def read_slot(self, slot: int) -> Optional[Dict]:
+        """直接讀取第 slot 個槽位，空槽位回傳 None"""
+        offset = self._offset(slot)
+        if self._mm[offset] != self.FLAG_USED:
+            return None
+        record = {}
+        for field, field_offset, _ in self._layout:
+            start = offset + field_offset
+            length = self._mm[start]
+            record[field] = self._mm[start + 1:start + 1 + length].decode('utf-8')
+        return record
+
+    def _encode(self, contact) -> bytes:
+        record = bytearray(self.record_size)
+        record[0] = self.FLAG_USED
+        for field, field_offset, width in self._layout:
+            encoded = getattr(contact, field).encode('utf-8')
+            if len(encoded) > width:
+                raise ValueError(f"欄位 {field} 超過固定長度")
+            record[field_offset] = len(encoded)
+            record[field_offset + 1:field_offset + 1 + len(encoded)] = encoded
+        return bytes(record)
+
+    def _ensure_capacity(self, slots: int):
+        needed = self._offset(slots)
+        if needed <= len(self._mm):
+            return
+        # 重新對應較大的檔案（mmap.resize 在部分平台不可用）
+        new_size = self._offset(slots + self.GROW_SLOTS)
+        self._mm.close()
+        self._file.truncate(new_size)
+        self._mm = mmap.mmap(self._file.fileno(), 0)
+
+    def _set_count(self, count: int):
+        self._count = count
+        self.HEADER.pack_into(self._mm, 0, self.MAGIC, 1, self.record_size, count)
+
+    def changed(self) -> bool:
+        return self._generation is None or self._file_lock.generation() != self._generation
+
+    def load(self) -> List[Dict]:
+        with self._file_lock:
+            if self._file_lock.generation() != self._generation:
+                self._reopen()
+            records = self._scan()
+            self._generation = self._file_lock.generation()
+        return records
+
+    def _reopen(self):
+        """重新開啟檔案：其他程式可能擴充了檔案，或以 save_all 換成了新檔案"""
+        self._close_file()
+        self._open()
+
+    def _scan(self) -> List[Dict]:
+        """讀取所有槽位，重建 姓名 -> 槽位 與空槽位清單（需持有檔案鎖）"""
+        self._slots = {}
+        self._free = []
+        records = []
+        for slot in range(self._count):
+            record = self.read_slot(slot)
+            if record is None:
+                self._free.append(slot)
+            else:
+                self._slots[record["name"]] = slot
+                records.append(record)
+        # 從前面的空槽位開始重複使用
+        self._free.reverse()
+        return records
+
+    @contextmanager
+    def _writing(self):
+        """持有檔案鎖寫入；檔案被其他程式修改過時先重新同步槽位，寫入後遞增世代編號"""
+        with self._file_lock:
+            stale = self._file_lock.generation() != self._generation
+            if stale:
+                self._reopen()
+                self._scan()
+            yield
+            self._mm.flush()
+            generation = self._file_lock.next_generation()
+            # 記憶體仍缺少其他程式的修改，直到 AddressBook.refresh() 重新載入
+            self._generation = None if stale else generation
+
+    def _write_record(self, contact):
+        """將聯絡人寫入原本的槽位，新聯絡人使用空槽位或附加在最後"""
+        slot = self._slots.get(contact.name)
+        if slot is None:
+            if self._free:
+                slot = self._free.pop()
+            else:
+                slot = self._count
+                self._ensure_capacity(slot + 1)
+                self._set_count(slot + 1)
+            self._slots[contact.name] = slot
+        offset = self._offset(slot)
+        self._mm[offset:offset + self.record_size] = self._encode(contact)
+
+    def put(self, contact, contacts: Iterable = ()):
+        with self._writing():
+            self._write_record(contact)
+
+    def put_many(self, added: Iterable, contacts: Iterable = ()):
+        with self._writing():
+            for contact in added:
+                self._write_record(contact)
+
+    def delete(self, name: str, contacts: Iterable = ()):
+        with self._writing():
+            slot = self._slots.pop(name, None)
+            if slot is None:
+                return
+            self._mm[self._offset(slot)] = self.FLAG_EMPTY
+            self._free.append(slot)
+
+    def save_all(self, contacts: Iterable):
+        """重寫整個檔案（同時清除空槽位），寫入暫存檔後再取代"""
+        slots: Dict[str, int] = {}
+
+        def write(f):
+            f.write(self._header(0))
+            for contact in contacts:
+                slots[contact.name] = len(slots)
+                f.write(self._encode(contact))
+            f.seek(0)
+            f.write(self._header(len(slots)))
+
+        with self._file_lock:
+            # Windows 無法取代仍在 mmap 中的檔案，先關閉
+            self._close_file()
+            try:
+                write_file_atomic(self.filename, write, binary=True)
+            finally:
+                self._open()
+            self._slots = slots
+            self._free = []
+            self._generation = self._file_lock.next_generation()
+
+    def close(self):
+        try:
+            self._close_file()
+        finally:
+            self._file_lock.close()
+
+    def _close_file(self):
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def create_storage(backend: Optional[str] = None, filename: Optional[str] = None) -> Storage:
+    """依名稱建立儲存後端，未指定時讀取 ADDRESSBOOK_BACKEND / ADDRESSBOOK_FILE 環境變數
+
+    backend 可為 json（預設）、journal、sqlite、binary 或 sharded（分片 JSON 目錄）。
+    """
+    backend = (backend or os.environ.get(BACKEND_ENV) or "json").lower()
+    filename = filename or os.environ.get(FILE_ENV)
+    if backend == "json":
+        # 應用程式使用背景寫入，介面不會因為寫檔而停頓
+        return JsonStorage(filename or "contacts.json", write_behind=True)
+    if backend == "journal":
+        return JsonStorage(filename or "contacts.json", journal=True)
+    if backend == "sqlite":
+        return SqliteStorage(filename or "contacts.db")
+    if backend == "binary":
+        return BinaryStorage(filename or "contacts.bin")
+    if backend == "sharded":
+        from shard_storage import ShardedStorage
+
+        return ShardedStorage(filename or "contacts.shards", write_behind=True)
+    raise ValueError(f"未知的儲存後端：{backend}")
+
+
+# 依副檔名判斷轉換時使用的後端
+EXTENSION_BACKENDS = {
+    ".json": "json",
+    ".db": "sqlite",
+    ".sqlite": "sqlite",
+    ".bin": "binary",
+    ".shards": "sharded",
+}
+
+
+def open_storage_for(filename: str) -> Storage:
+    extension = os.path.splitext(filename)[1].lower()
+    if extension not in EXTENSION_BACKENDS:
+        raise ValueError(f"無法依副檔名判斷儲存格式：{filename}")
+    return create_storage(EXTENSION_BACKENDS[extension], filename)
+
+
+def convert_storage(source_filename: str, target_filename: str) -> int:
+    """在 JSON、SQLite、二進位檔、分片目錄之間轉換（依副檔名判斷），回傳轉換筆數"""
+    from models import Contact
+
+    source = open_storage_for(source_filename)
+    try:
+        contacts = [Contact(**item) for item in source.load()]
+    finally:
+        source.close()
+    target = open_storage_for(target_filename)
+    try:
+        target.save_all(contacts)
+    finally:
+        target.close()
+    return len(contacts)
+
+
+def migrate_json_to_sqlite(json_filename: str = "contacts.json", db_filename: str = "contacts.db") -> int:
+    """將 contacts.json（含未壓縮的日誌）一次匯入 SQLite，回傳匯入筆數"""
+    return convert_storage(json_filename, db_filename)
+
+
+if __name__ == "__main__":
+    # 用法：python storage.py [來源檔] [目標檔]，例如 contacts.json contacts.bin
+    source = sys.argv[1] if len(sys.argv) > 1 else "contacts.json"
+    target = sys.argv[2] if len(sys.argv) > 2 else "contacts.db"
+    count = convert_storage(source, target)
+    print(f"已轉換 {count} 位聯絡人")
@@ -0,0 +1,39 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import AddressBook
+from search_session import SearchSession
+from storage import create_storage
+
+
+def make_address_book(tmp_path) -> AddressBook:
+    address_book = AddressBook(storage=create_storage("json", str(tmp_path / "contacts.json")))
+    address_book.add_contact("A", "0912345678", "a@mail.tw", "台北市")
+    address_book.add_contact("B", "0922345678", "b@mail.tw", "台中市")
+    return address_book
+
+
+def test_query_search_type_is_cached_case_sensitively(tmp_path):
+    address_book = make_address_book(tmp_path)
+    try:
+        session = SearchSession(address_book)
+        query = AddressBook.QUERY_SEARCH_TYPE
+        # 小寫的 or 不是運算子，三個條件都要符合
+        assert session.search("name:A or name:B", query) == []
+        assert [c.name for c in session.search("name:A OR name:B", query)] == ["A", "B"]
+        assert [c.name for c in session.search("name:=A", query)] == ["A"]
+        assert session.search("name:=a", query) == []
+    finally:
+        address_book.close()
+
+
+def test_plain_search_ignores_case(tmp_path):
+    address_book = make_address_book(tmp_path)
+    try:
+        session = SearchSession(address_book)
+        assert [c.name for c in session.search("A@MAIL", "電子郵件")] == ["A"]
+        assert [c.name for c in session.search("a@mail", "電子郵件")] == ["A"]
+    finally:
+        address_book.close()